@@ -1,4 +1,4 @@
-from typing import Any, Dict, Optional
+from typing import TYPE_CHECKING, Any, Dict, Optional
 
 import asyncio
 import json
@@ -6,6 +6,8 @@ import re
 import os
 import shutil
 import logging
+import time
+from contextlib import asynccontextmanager
 from datetime import datetime, timedelta
 from pathlib import Path
 import jwt
@@ -17,17 +19,15 @@ from fastapi.middleware.cors import CORSMiddleware
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from pydantic import BaseModel
 
-from autogen_agentchat.agents import UserProxyAgent
-from autogen_agentchat.teams import RoundRobinGroupChat
-from autogen_agentchat.conditions import TextMentionTermination, MaxMessageTermination
-from autogen_agentchat.ui import Console
-
-from src.agents.orchestrating_agent import get_orchestrating_agent
-from src.teams.student_info_team import create_student_info_team
-from src.teams.school_rec_teams import create_school_rec_team
-from src.teams.hybrid_qa_team import create_hybrid_qa_team
+from src.teams.team_pool import get_team_pool
+from src.settings import settings
 from src.utils.session_manager import init_session
+from src.utils.cancellation import CancellationToken, cancellation_scope, record_cancellation, get_cancellation_stats
 from src.domain.students_pg import StudentDocument
+from src.infrastructure.db.postgres_async import async_postgres_connector
+
+if TYPE_CHECKING:
+    from autogen_agentchat.base import TaskResult
 
 
 def keyword_based_routing(message: str) -> str:
@@ -119,7 +119,29 @@ security = HTTPBearer()
 users_db = {}
 refresh_tokens_db = {}
 
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """
+    Startup: open only the configured connectors (STARTUP_CONNECTORS), then warm the
+    team pool in the background so the server accepts requests immediately.
+    Shutdown: stop warming and close whatever was opened.
+    """
+    from src.infrastructure import lifecycle
+
+    connected = await lifecycle.startup(settings.STARTUP_CONNECTORS)
+    logger.info(f"🚀 Startup connectors: {connected}")
+    warm_task = asyncio.create_task(warm_team_pool())
+    try:
+        yield
+    finally:
+        warm_task.cancel()
+        from src.model_client.perplexity_client import get_perplexity_client
+        await get_perplexity_client().aclose()
+        await lifecycle.shutdown()
+
+
 app = FastAPI(
+    lifespan=lifespan,
     title="iOffer AI Chat API",
     version="2.0.0",
     description="基于 Autogen 框架的 AI 智能问答系统，支持多种 AI 代理团队协作",
@@ -657,7 +679,6 @@ async def chat_endpoint(request: ChatRequest):
         import json
         from src.teams.hybrid_qa_team import hybrid_qa_query
         from src.teams.school_rec_teams import create_school_rec_team, create_simple_school_rec_agent
-        from src.teams.student_info_team import create_student_info_team
         from src.domain.students_pg import StudentDocument
         from autogen_agentchat.ui import Console
 
@@ -665,7 +686,7 @@ async def chat_endpoint(request: ChatRequest):
         user_profile = None
         user_context = ""
         try:
-            user_profile = StudentDocument.find_by_user_id(request.user_id)
+            user_profile = await StudentDocument.afind_by_user_id(request.user_id)
             if user_profile:
                 user_context = format_user_context(user_profile)
                 print(f"✅ 找到用户档案: {request.user_id}")
@@ -764,8 +785,8 @@ async def chat_endpoint(request: ChatRequest):
         elif team_type == "STUDENT_INFO":
             # Use real student info team
             try:
-                student_team = create_student_info_team()
-                task_result = await Console(student_team.run_stream(task=request.message))
+                async with get_team_pool().acquire("STUDENT_INFO") as student_team:
+                    task_result = await Console(student_team.run_stream(task=request.message))
                 team_response = task_result.messages[-1].content
 
                 # Clean up response
@@ -1115,22 +1136,110 @@ async def _send_error(ws: WebSocket, user_message: str, exc: Exception) -> None:
     })
 
 
-def _build_workflow_context():
+async def _stream_team_to_ws(ws: WebSocket, stream) -> Optional["TaskResult"]:
     """
-    Build and return routing agent, user proxy, and teams for handling messages.
-    We intentionally avoid relying on ChatbotWorkflow to keep WS non-blocking.
+    Consume a team's run_stream, forwarding model token chunks to the client as
+    {"type": "token"} messages as they arrive. Returns the final TaskResult.
     """
-    routing_agent = get_orchestrating_agent()
-    # Non-blocking user proxy (input_func accepts prompt but returns empty string)
-    user_proxy = UserProxyAgent("user_proxy", input_func=lambda prompt: "")
-
-    teams: Dict[str, Any] = {
-        "STUDENT_INFO": create_student_info_team(),
-        "SCHOOL_RECOMMENDATION": create_school_rec_team(),
-        "GENERAL_QA": create_hybrid_qa_team(),
-    }
+    from autogen_agentchat.base import TaskResult
+    from autogen_agentchat.messages import ModelClientStreamingChunkEvent
+
+    task_result: Optional[TaskResult] = None
+    async for event in stream:
+        if isinstance(event, TaskResult):
+            task_result = event
+        elif isinstance(event, ModelClientStreamingChunkEvent):
+            await ws.send_json({
+                "type": "token",
+                "data": {"content": event.content, "source": event.source},
+            })
+        else:
+            logger.info(f"🧩 {type(event).__name__} | source: {getattr(event, 'source', 'unknown')}")
+    return task_result
+
 
-    return routing_agent, user_proxy, teams
+class ClientDisconnected(Exception):
+    """The WebSocket client went away while a request was still running"""
+
+
+async def _receive_loop(ws: WebSocket, inbox: asyncio.Queue, disconnected: asyncio.Event) -> None:
+    """
+    Read client messages into the connection's inbox. Runs next to request processing,
+    so a disconnect is noticed while a team or workflow run is still in flight.
+    """
+    try:
+        while True:
+            await inbox.put(await ws.receive_json())
+    except WebSocketDisconnect:
+        pass
+    except Exception as e:
+        logger.warning(f"⚠️ WebSocket receive failed: {type(e).__name__}: {e}")
+    finally:
+        disconnected.set()
+        inbox.put_nowait(None)
+
+
+async def _run_until_disconnect(coro, disconnected: asyncio.Event, inflight: set, label: str,
+                                on_cancel=None):
+    """
+    Run one request as a tracked task of this connection. If the client disconnects first,
+    cancel it (plus on_cancel, e.g. the AutoGen team's cancellation token), kill blocking work
+    through the cancellation token, record the saved work and raise ClientDisconnected.
+    """
+    token = CancellationToken()
+    with cancellation_scope(token):
+        task = asyncio.ensure_future(coro)
+    inflight.add(task)
+    started = time.perf_counter()
+    waiter = asyncio.ensure_future(disconnected.wait())
+    try:
+        await asyncio.wait({task, waiter}, return_when=asyncio.FIRST_COMPLETED)
+        if task.done():
+            return task.result()
+        raise ClientDisconnected(label)
+    finally:
+        waiter.cancel()
+        if not task.done():
+            elapsed = time.perf_counter() - started
+            token.cancel()
+            task.cancel()
+            if on_cancel is not None:
+                on_cancel()
+            record_cancellation("runs_cancelled")
+            record_cancellation(f"runs_cancelled.{label}")
+            record_cancellation("in_flight_seconds_at_cancel", elapsed)
+            logger.info(f"🛑 Cancelled in-flight {label} run after {elapsed:.1f}s")
+            try:
+                await task
+            except BaseException:
+                pass
+        inflight.discard(task)
+
+
+def _workflow_event_relay(ws: WebSocket):
+    """
+    Progress callback for the multi-agent workflow: each stage event (with partial
+    results such as the profile summary or initial school list) is sent immediately
+    as {"type": "workflow_event"}. A failed send cancels the remaining stages.
+    """
+    async def relay(event: Dict[str, Any]) -> None:
+        await ws.send_json({"type": "workflow_event", "data": event})
+    return relay
+
+
+async def warm_team_pool():
+    """
+    Build the shared heavy components (hybrid QA retriever, model clients, tools) and a
+    first idle team of each type once per process, instead of on every WebSocket connection.
+    """
+    from src.teams.hybrid_qa_team import get_hybrid_qa_agent
+    try:
+        await asyncio.to_thread(get_hybrid_qa_agent)
+        await get_team_pool().warm(settings.TEAM_POOL_WARM_SIZE)
+        logger.info(f"✅ Team pool warmed: {get_team_pool().get_stats()}")
+    except Exception as e:
+        # Teams are still built lazily on first use
+        logger.warning(f"⚠️ Team pool warm-up failed: {e}")
 
 
 @app.get("/")
@@ -1153,6 +1262,25 @@ async def root():
 async def health_check():
     return {"status": "healthy", "service": "iOffer AI Chat API"}
 
+@app.get("/metrics/llm")
+async def llm_metrics():
+    """Per-model gateway queue depth / wait / latency, Perplexity client stats, work saved by cancellation, team pool usage, RAG index load/RSS, async Postgres pool usage, profile cache hit/miss and profile write amplification"""
+    from src.model_client.model_gateway import get_model_gateway
+    from src.model_client.perplexity_client import get_perplexity_client
+    from src.agents.general_qa_agent.rag_registry import get_rag_registry
+    from src.domain.profile_cache import get_profile_cache
+    from src.domain.change_tracking import get_write_stats
+    return {
+        "gateway": get_model_gateway().get_stats(),
+        "perplexity": get_perplexity_client().get_stats(),
+        "cancellation": get_cancellation_stats(),
+        "team_pool": get_team_pool().get_stats(),
+        "rag": get_rag_registry().get_stats(),
+        "postgres_pool": async_postgres_connector.get_stats() if async_postgres_connector.initialized else {"initialized": False},
+        "profile_cache": get_profile_cache().get_stats(),
+        "profile_writes": get_write_stats(),
+    }
+
 @app.get("/api")
 async def api_docs():
     """简洁的API文档页面"""
@@ -1505,7 +1633,7 @@ def _summarize_profile(doc: StudentDocument) -> Dict[str, Any]:
 async def get_profile(user_id: str):
     """Read-only endpoint to check if a profile exists and return a concise summary."""
     try:
-        doc = StudentDocument.find_by_user_id(user_id)
+        doc = await StudentDocument.afind_by_user_id(user_id)
         if not doc:
             return {"exists": False, "summary": None}
         return {"exists": True, "summary": _summarize_profile(doc)}
@@ -1536,19 +1664,25 @@ async def ws_endpoint(ws: WebSocket, user_id: str):
     await ws.send_json({"type": "system", "message": "Welcome to iOffer AI!", "user_id": user_id})
     logger.info(f"✅ 欢迎消息已发送")
 
-    routing_agent, user_proxy, teams = _build_workflow_context()
+    # Teams are leased on first use and kept until disconnect, so multi-turn context survives
+    connection_teams = get_team_pool().for_connection()
     interaction_count = 0
 
+    # 独立的接收循环：请求处理期间也能发现断开，并取消本连接的在途任务
+    inbox: asyncio.Queue = asyncio.Queue()
+    disconnected = asyncio.Event()
+    inflight: set = set()
+    receiver = asyncio.create_task(_receive_loop(ws, inbox, disconnected))
+
     try:
         while True:
-            try:
-                payload = await ws.receive_json()
-                log_section("收到用户消息")
-                logger.info(f"📥 原始数据: {payload}")
-            except WebSocketDisconnect:
+            payload = await inbox.get()
+            if payload is None:
                 log_section("WebSocket 连接断开")
                 logger.info("🔌 连接已断开")
                 break
+            log_section("收到用户消息")
+            logger.info(f"📥 原始数据: {payload}")
 
             msg_type = str(payload.get("type", "")).strip().lower()
             data = payload.get("data", {}) if isinstance(payload.get("data", {}), dict) else {}
@@ -1639,7 +1773,7 @@ async def ws_endpoint(ws: WebSocket, user_id: str):
                 print(f"🎓 SCHOOL_RECOMMENDATION route reached! Using Multi-Agent workflow instead of AutoGen")
 
                 try:
-                    from src.workflows.multi_agent_workflow import get_multi_agent_workflow
+                    from src.workflows.multi_agent_workflow import get_multi_agent_workflow, WorkflowCancelled
                     workflow = get_multi_agent_workflow()
 
                     # Extract user_id for the workflow
@@ -1650,7 +1784,16 @@ async def ws_endpoint(ws: WebSocket, user_id: str):
                         user_id = session_data['user_id']
 
                     print(f"📝 Using Multi-Agent workflow for message: {message_text[:100]}...")
-                    team_response = await workflow.run_complete_recommendation(message_text, user_id)
+                    try:
+                        team_response = await _run_until_disconnect(
+                            workflow.run_complete_recommendation(
+                                message_text, user_id, on_event=_workflow_event_relay(ws)
+                            ),
+                            disconnected, inflight, label="SCHOOL_REC_MULTI_AGENT_WORKFLOW",
+                        )
+                    except (WorkflowCancelled, ClientDisconnected):
+                        logger.info("🔌 客户端在推荐流程中断开，已取消剩余阶段")
+                        break
 
                     # Convert Multi-Agent response to format expected by WebSocket client
                     await _send_status(ws, "Analysis complete! Preparing your recommendations…", step="tools_complete", extra_details={"team": "SCHOOL_REC_MULTI_AGENT_WORKFLOW"})
@@ -1673,7 +1816,6 @@ async def ws_endpoint(ws: WebSocket, user_id: str):
                     print("🔄 Falling back to AutoGen workflow...")
                     # Continue to normal processing below
 
-            team = teams.get(team_key)
             try:
                 # Pass the user's original message as task
                 # Set team-specific timeouts based on complexity
@@ -1686,11 +1828,23 @@ async def ws_endpoint(ws: WebSocket, user_id: str):
 
 
 
-                # Use run_stream to capture messages as they happen
-                team_result = await asyncio.wait_for(
-                    Console(team.run_stream(task=message_text)),
-                    timeout=timeout_seconds
-                )
+                # Use run_stream to forward tokens and capture messages as they happen
+                # The connection's team for this type keeps its conversation between messages
+                from autogen_core import CancellationToken as AgentCancellationToken
+                agent_token = AgentCancellationToken()
+                team = await connection_teams.get(team_key)
+                try:
+                    team_result = await _run_until_disconnect(
+                        asyncio.wait_for(
+                            _stream_team_to_ws(ws, team.run_stream(task=message_text, cancellation_token=agent_token)),
+                            timeout=timeout_seconds
+                        ),
+                        disconnected, inflight, label=team_key, on_cancel=agent_token.cancel,
+                    )
+                except BaseException:
+                    # An interrupted run leaves the conversation half-finished: start over next message
+                    await asyncio.shield(connection_teams.reset(team_key))
+                    raise
                 
                 # Find the last meaningful message before TERMINATE
                 final_message = ""
@@ -1759,6 +1913,8 @@ async def ws_endpoint(ws: WebSocket, user_id: str):
             except asyncio.TimeoutError:
                 print(f"Team {team_key} execution timed out after {timeout_seconds} seconds")
                 team_text = f"I apologize, but the {team_key} team is taking longer than expected. Please try again in a moment."
+            except ClientDisconnected:
+                raise
             except Exception as team_error:
                 print(f"Team {team_key} execution failed: {team_error}")
                 # Provide more specific error messages based on the error type
@@ -2107,11 +2263,18 @@ async def ws_endpoint(ws: WebSocket, user_id: str):
 
             await ws.send_json({"type": "result", "data": result_data})
 
+    except ClientDisconnected:
+        log_section("WebSocket 连接断开")
+        logger.info("🔌 连接在请求处理中断开，已取消在途任务")
     except Exception as e:
         log_section("错误处理")
         logger.error(f"❌ 发生错误: {e}")
         await _send_error(ws, user_message="", exc=e)
     finally:
+        receiver.cancel()
+        for task in list(inflight):
+            task.cancel()
+        await asyncio.shield(connection_teams.release())
         try:
             await ws.close()
             log_section("连接关闭")
@@ -0,0 +1,114 @@
+#!/usr/bin/env python3
+"""
+Concurrent profile-read throughput: sync SQLAlchemy inside async handlers vs. the async pool.
+
+"before" reproduces the old /profile/{user_id} handler, which ran the synchronous
+database read directly on the event loop; "after" awaits the asyncpg-pool read. Both call
+the uncached loaders (StudentDocument._load / _aload): find_by_user_id() and
+afind_by_user_id() go through profile_cache, so with a single --user-id every measured
+request would be an in-memory hit. Both modes issue --requests reads with --concurrency
+in flight, and a heartbeat task measures how long the event loop was stalled (max lag),
+which is what other WebSocket/HTTP clients experience meanwhile.
+
+Run:
+  uv run python scripts/benchmark_profile_reads.py --user-id <existing user id> [--requests 500] [--concurrency 50]
+"""
+
+import argparse
+import asyncio
+import statistics
+import sys
+import time
+from pathlib import Path
+
+# Ensure project root on sys.path so 'src' package can be imported when running from scripts/
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+
+async def heartbeat(stop: asyncio.Event, interval: float = 0.005) -> float:
+    """Returns the largest delay between scheduled and actual wake-ups"""
+    max_lag = 0.0
+    loop = asyncio.get_running_loop()
+    while not stop.is_set():
+        expected = loop.time() + interval
+        await asyncio.sleep(interval)
+        max_lag = max(max_lag, loop.time() - expected)
+    return max_lag
+
+
+async def run_mode(mode: str, user_id: str, requests: int, concurrency: int) -> dict:
+    from src.domain.students_pg import StudentDocument
+
+    async def handler():
+        # Database read the API handler makes on a cache miss, in each mode
+        loaded = StudentDocument._load(user_id) if mode == "before" else await StudentDocument._aload(user_id)
+        return loaded[0] if loaded else None
+
+    # Warm up connections so pool creation is not part of the measurement
+    for _ in range(min(concurrency, 5)):
+        await handler()
+
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies = []
+    found = 0
+
+    async def one():
+        nonlocal found
+        async with semaphore:
+            start = time.perf_counter()
+            doc = await handler()
+            latencies.append(time.perf_counter() - start)
+            found += doc is not None
+
+    stop = asyncio.Event()
+    lag_task = asyncio.create_task(heartbeat(stop))
+    start = time.perf_counter()
+    await asyncio.gather(*(one() for _ in range(requests)))
+    elapsed = time.perf_counter() - start
+    stop.set()
+    max_lag = await lag_task
+
+    latencies.sort()
+    return {
+        "mode": mode,
+        "requests": requests,
+        "found": found,
+        "elapsed_s": round(elapsed, 3),
+        "throughput_rps": round(requests / elapsed, 1),
+        "p50_ms": round(statistics.median(latencies) * 1000, 2),
+        "p95_ms": round(latencies[int(len(latencies) * 0.95) - 1] * 1000, 2),
+        "max_loop_lag_ms": round(max_lag * 1000, 2),
+    }
+
+
+async def main_async(args) -> list:
+    from src.infrastructure.db.postgres import PostgreSQLConnector
+    from src.infrastructure.db.postgres_async import AsyncPostgreSQLConnector
+
+    results = []
+    for mode in args.modes:
+        results.append(await run_mode(mode, args.user_id, args.requests, args.concurrency))
+    PostgreSQLConnector.close_connection()
+    await AsyncPostgreSQLConnector.close_connection()
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--user-id", required=True, help="user id with an existing profile row")
+    parser.add_argument("--requests", type=int, default=500)
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--modes", nargs="+", choices=["before", "after"], default=["before", "after"])
+    args = parser.parse_args()
+
+    results = asyncio.run(main_async(args))
+    print(f"{'mode':<8} {'rps':>9} {'p50 ms':>9} {'p95 ms':>9} {'max lag ms':>11} {'found':>7}")
+    for r in results:
+        print(f"{r['mode']:<8} {r['throughput_rps']:>9} {r['p50_ms']:>9} {r['p95_ms']:>9} "
+              f"{r['max_loop_lag_ms']:>11} {r['found']:>7}")
+
+
+if __name__ == "__main__":
+    main()
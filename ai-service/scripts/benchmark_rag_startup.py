@@ -0,0 +1,83 @@
+#!/usr/bin/env python3
+"""
+Measure RAG startup time and RSS: shared registry vs. loading the artifacts per agent.
+
+"before" reproduces the old behavior (every RAGRetriever/HybridQAAgent read qa_pairs.pkl,
+faiss.index and mapping.pkl itself) by loading N private snapshots; "after" constructs N
+RAGRetrievers backed by the process-wide registry.
+
+Run:
+  uv run python scripts/benchmark_rag_startup.py [--agents 4]
+
+Each mode runs in a fresh subprocess so RSS numbers are not polluted by the other mode.
+"""
+
+import argparse
+import json
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+# Ensure project root on sys.path so 'src' package can be imported when running from scripts/
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+
+def run_mode(mode: str, agents: int) -> dict:
+    from src.agents.general_qa_agent.rag_registry import RAGArtifactRegistry, current_rss_mb, get_rag_registry
+
+    rss_start = current_rss_mb()
+    start = time.perf_counter()
+    per_agent_ms = []
+
+    if mode == "before":
+        paths = get_rag_registry().paths
+        snapshots = []
+        for _ in range(agents):
+            agent_start = time.perf_counter()
+            snapshots.append(RAGArtifactRegistry(paths, check_interval=0).get())
+            per_agent_ms.append((time.perf_counter() - agent_start) * 1000)
+    else:
+        from src.agents.general_qa_agent.rag_agent import RAGRetriever
+        retrievers = []
+        for _ in range(agents):
+            agent_start = time.perf_counter()
+            retrievers.append(RAGRetriever())
+            per_agent_ms.append((time.perf_counter() - agent_start) * 1000)
+
+    return {
+        "mode": mode,
+        "agents": agents,
+        "total_s": round(time.perf_counter() - start, 3),
+        "per_agent_ms": [round(ms, 1) for ms in per_agent_ms],
+        "rss_delta_mb": round(current_rss_mb() - rss_start, 1),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--agents", type=int, default=4, help="number of agents/retrievers to construct")
+    parser.add_argument("--mode", choices=["before", "after"], help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.mode:
+        print(json.dumps(run_mode(args.mode, args.agents)))
+        return
+
+    for mode in ("before", "after"):
+        proc = subprocess.run(
+            [sys.executable, __file__, "--mode", mode, "--agents", str(args.agents)],
+            capture_output=True, text=True, cwd=ROOT,
+        )
+        if proc.returncode != 0:
+            print(f"[{mode}] failed:\n{proc.stderr}")
+            continue
+        result = json.loads(proc.stdout.strip().splitlines()[-1])
+        print(f"[{mode:>6}] {result['agents']} agents: {result['total_s']:.2f}s total, "
+              f"+{result['rss_delta_mb']:.0f} MB RSS, per agent (ms): {result['per_agent_ms']}")
+
+
+if __name__ == "__main__":
+    main()
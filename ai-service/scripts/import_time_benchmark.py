@@ -0,0 +1,94 @@
+#!/usr/bin/env python3
+"""
+Import-time benchmark based on `python -X importtime`.
+
+Imports a module (default: api_server) in a fresh interpreter, then reports the
+cumulative import time and the slowest top-level packages. It also lists any heavy
+packages (faiss, xgboost, pandas, autogen, ...) that got pulled in at import time.
+With --max-ms or --forbid-heavy it exits non-zero, which lets CI track regressions
+(see test/test_import_time.py).
+
+Run:
+  uv run python scripts/import_time_benchmark.py [--module api_server] [--top 15] [--max-ms 3000] [--forbid-heavy]
+"""
+
+import argparse
+import re
+import subprocess
+import sys
+from collections import defaultdict
+from pathlib import Path
+from typing import Dict, List, Tuple
+
+ROOT = Path(__file__).resolve().parents[1]
+
+# Only loaded by the routes/tools that need them
+HEAVY_PACKAGES = ("faiss", "xgboost", "pandas", "sklearn", "joblib", "autogen_agentchat", "autogen_ext", "google.genai")
+
+LINE_RE = re.compile(r"^import time:\s+(\d+)\s+\|\s+(\d+)\s+\|(\s*)(\S+)")
+
+
+def measure(module: str) -> Tuple[int, Dict[str, int], List[str], int]:
+    """
+    Returns (returncode, cumulative_us per top-level package, imported module names,
+    cumulative_us of the module itself)
+    """
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        capture_output=True, text=True, cwd=ROOT,
+    )
+    per_package: Dict[str, int] = defaultdict(int)
+    modules: List[str] = []
+    total_us = 0
+    for line in proc.stderr.splitlines():
+        match = LINE_RE.match(line)
+        if not match:
+            continue
+        cumulative_us, indent, name = int(match.group(2)), len(match.group(3)), match.group(4)
+        modules.append(name)
+        # Top-level entries (indent 1) carry the cumulative time of everything they pulled in
+        if indent <= 1:
+            per_package[name.split(".")[0]] += cumulative_us
+        if name == module:
+            total_us = cumulative_us
+    if proc.returncode != 0:
+        print(proc.stderr[-2000:], file=sys.stderr)
+    return proc.returncode, dict(per_package), modules, total_us
+
+
+def heavy_imports(modules: List[str]) -> List[str]:
+    return sorted({pkg for pkg in HEAVY_PACKAGES for name in modules if name == pkg or name.startswith(pkg + ".")})
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--module", default="api_server")
+    parser.add_argument("--top", type=int, default=15)
+    parser.add_argument("--max-ms", type=float, help="fail if importing the module takes longer")
+    parser.add_argument("--forbid-heavy", action="store_true", help="fail if a heavy package is imported")
+    args = parser.parse_args()
+
+    returncode, per_package, modules, total_us = measure(args.module)
+    if returncode != 0:
+        print(f"import {args.module} failed")
+        return returncode
+
+    print(f"import {args.module}: {total_us / 1000:.1f} ms, {len(modules)} modules")
+    for name, cumulative_us in sorted(per_package.items(), key=lambda item: item[1], reverse=True)[:args.top]:
+        print(f"  {cumulative_us / 1000:>9.1f} ms  {name}")
+
+    heavy = heavy_imports(modules)
+    print(f"heavy packages imported: {', '.join(heavy) or 'none'}")
+
+    failed = False
+    if args.max_ms is not None and total_us / 1000 > args.max_ms:
+        print(f"FAIL: {total_us / 1000:.1f} ms exceeds budget of {args.max_ms:.0f} ms")
+        failed = True
+    if args.forbid_heavy and heavy:
+        print(f"FAIL: heavy packages imported at import time: {', '.join(heavy)}")
+        failed = True
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
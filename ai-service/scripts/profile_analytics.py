@@ -0,0 +1,100 @@
+#!/usr/bin/env python3
+"""
+Nightly profile analytics: stream every student profile in batches and aggregate
+application targets (degree type, target country, intended major), optionally
+exporting the profiles to JSONL for offline scoring.
+
+Profiles are read with the bulk loaders (StudentDocument.iter_profiles for Postgres,
+StudentDocument.iter_students for Mongo), so memory stays bounded by --batch-size no
+matter how many users there are.
+
+For Postgres, --country/--degree/--major are pushed down as indexed filters on the
+promoted user_profiles columns ("all users targeting the UK in Business").
+
+Run:
+  uv run python scripts/profile_analytics.py [--source pg|mongo] [--batch-size 500] [--since 2025-01-01] [--export profiles.jsonl] [--top 10]
+  uv run python scripts/profile_analytics.py --country UK --major Business
+"""
+
+import argparse
+import sys
+import time
+from collections import Counter
+from datetime import datetime
+from pathlib import Path
+
+# Ensure project root on sys.path so 'src' package can be imported when running from scripts/
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+
+def iter_batches(args, full: bool):
+    if args.source == "pg":
+        from src.domain.students_pg import StudentDocument
+        return StudentDocument.iter_profiles(
+            batch_size=args.batch_size, since=args.since,
+            target_country=args.country, degree_type=args.degree, intended_major=args.major,
+        )
+
+    from src.domain.students import StudentDocument
+    filter_options = {"updatedAt": {"$gte": args.since}} if args.since else {}
+    for value, path in ((args.country, "applicationDetails.targetCountry"),
+                        (args.degree, "applicationDetails.degreeType"),
+                        (args.major, "applicationDetails.intendedMajor")):
+        if value:
+            filter_options[path] = value
+    # Aggregates only need applicationDetails; the export needs the whole document
+    fields = None if full else ["applicationDetails"]
+    return StudentDocument.iter_students(batch_size=args.batch_size, fields=fields, **filter_options)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--source", choices=["pg", "mongo"], default="pg")
+    parser.add_argument("--batch-size", type=int, default=500)
+    parser.add_argument("--since", type=datetime.fromisoformat, help="only profiles updated at/after this time")
+    parser.add_argument("--country", help="only profiles targeting this country")
+    parser.add_argument("--degree", help="only profiles applying for this degree type")
+    parser.add_argument("--major", help="only profiles with this intended major")
+    parser.add_argument("--export", help="write every profile as one JSON line to this file")
+    parser.add_argument("--top", type=int, default=10)
+    args = parser.parse_args()
+
+    from src.agents.general_qa_agent.rag_registry import current_rss_mb
+
+    counters = {"degreeType": Counter(), "targetCountry": Counter(), "intendedMajor": Counter()}
+    total = batches = 0
+    peak_rss = current_rss_mb()
+    export = open(args.export, "w", encoding="utf-8") if args.export else None
+    start = time.perf_counter()
+    try:
+        for batch in iter_batches(args, full=bool(export)):
+            batches += 1
+            total += len(batch)
+            for profile in batch:
+                details = profile.applicationDetails
+                for field, counter in counters.items():
+                    counter[(getattr(details, field, "") or "(empty)").strip()] += 1
+                if export:
+                    export.write(profile.model_dump_json() + "\n")
+            peak_rss = max(peak_rss, current_rss_mb())
+    finally:
+        if export:
+            export.close()
+    elapsed = time.perf_counter() - start
+
+    print("=== Profile Analytics ===")
+    print(f"Source: {args.source}  Profiles: {total}  Batches: {batches}  Time: {elapsed:.1f}s  "
+          f"({total / elapsed if elapsed else 0:.0f}/s)  Peak RSS: {peak_rss:.0f} MB")
+    for field, counter in counters.items():
+        print(f"\n{field}:")
+        for value, count in counter.most_common(args.top):
+            print(f"  {count:>7}  {value}")
+    if export:
+        print(f"\nExported to {args.export}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,74 @@
+#!/usr/bin/env python3
+"""
+Pre-fetch admission requirements for the top-N QS institutions per subject.
+
+Fills the persistent admission cache (src/tools/admission_cache.py) so the
+first student who picks a popular school does not wait on Perplexity. Entries
+that are still fresh are skipped by the cache itself; stale ones are re-fetched
+here rather than in the background (those tasks would be cancelled on exit).
+
+Run:
+  uv run python scripts/warm_admission_cache.py [--top-n 50] [--concurrency 4] "Computer Science" "Business"
+
+The program name sent to Perplexity is the QS subject name unless --program is given.
+"""
+
+import argparse
+import asyncio
+import sys
+import time
+from pathlib import Path
+
+# Ensure project root on sys.path so 'src' package can be imported when running from scripts/
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+from src.tools.admission_cache import get_admission_cache
+from src.tools.school_rec_tools import check_addmission_requirement, get_top_qs_institutions
+
+
+async def warm(subjects, top_n: int, concurrency: int, program: str | None):
+    semaphore = asyncio.Semaphore(concurrency)
+    failures = 0
+    get_admission_cache().serve_stale = False
+
+    async def warm_one(university: str, program_name: str):
+        nonlocal failures
+        async with semaphore:
+            try:
+                await check_addmission_requirement(university, program_name)
+                print(f"[OK] {university} / {program_name}")
+            except Exception as e:
+                failures += 1
+                print(f"[ERROR] {university} / {program_name}: {type(e).__name__}: {e}")
+
+    jobs = []
+    for subject in subjects:
+        institutions = get_top_qs_institutions(subject, top_n)
+        print(f"=== {subject}: {len(institutions)} institutions ===")
+        jobs.extend(warm_one(university, program or subject) for university in institutions)
+
+    start = time.perf_counter()
+    await asyncio.gather(*jobs)
+    elapsed = time.perf_counter() - start
+
+    print("=== Warm-up Result ===")
+    print(f"Lookups: {len(jobs)}  Failures: {failures}  Time: {elapsed:.1f}s")
+    print(f"Cache: {get_admission_cache().get_stats()}")
+    return 1 if failures else 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Warm the Perplexity admission-requirement cache")
+    parser.add_argument("subjects", nargs="+", help="QS subject names, e.g. 'Computer Science'")
+    parser.add_argument("--top-n", type=int, default=50, help="Institutions per subject")
+    parser.add_argument("--concurrency", type=int, default=4, help="Parallel Perplexity lookups")
+    parser.add_argument("--program", type=str, default=None, help="Program name to ask about (default: subject)")
+    args = parser.parse_args()
+
+    return asyncio.run(warm(args.subjects, args.top_n, args.concurrency, args.program))
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -1,16 +1,48 @@
+"""
+Answer crawler for the GENERAL_QA knowledge base.
+
+Questions are answered by a fixed number of workers (--concurrency) whose model calls go
+through the model gateway at background priority (per-model limits, 429/5xx backoff);
+any other failure is retried per question with jittered exponential backoff. Every
+answer is appended to a JSONL checkpoint as soon as it arrives and streamed into MySQL
+in batches via update_answers_in_db, so an interrupted run resumes where it stopped.
+
+Run:
+  uv run python src/agents/general_qa_agent/answer_crawler.py [--table test_agent_qa] [--concurrency 8] [--retries 3] [--db-batch-size 100]
+  uv run python src/agents/general_qa_agent/answer_crawler.py --questions common_questions.pkl   # no DB writes
+"""
+
+import argparse
 import asyncio
+import json
+import os
+import pickle
+import random
+import sys
+import time
+from pathlib import Path
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
 from autogen_ext.models.openai import OpenAIChatCompletionClient
 from autogen_ext.agents.web_surfer import MultimodalWebSurfer
 from autogen_core.models import UserMessage
-import re
-import sys
-import os
-import pickle
 
 # Add the src path for importing settings
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "../../../")))
 from src.settings import settings
-# from src.infrastructure.db.mysql import mysql_connector
+from src.infrastructure.db.mysql import mysql_connector
+from src.model_client.model_gateway import Priority, get_model_gateway, llm_priority
+
+MODEL = "gemini-1.5-pro"
+
+PROMPT_BASE = (
+    "You are a professional university application advisor with years of experience in help students apply to U.S. universities. "
+    "You can browse the web, especially the official websites of universities, to find accurate and up-to-date information. "
+    "Browse multiple websites to find the best and most accurate answer for the question. "
+    "No need to include any markdown formatting. Just give the answer in plain text.\n\n"
+    "If you cannot find the answer, just say 'I don't know'.\n\n"
+)
+
 
 def extract_answer_only(response):
     """
@@ -24,51 +56,148 @@ def extract_answer_only(response):
     """
     if isinstance(response, dict):
         return response.get("content", "").strip()
-    
+
     # If it's an object (e.g., from a class with `.content` attribute)
     if hasattr(response, "content"):
         return getattr(response, "content", "").strip()
-    
+
     raise ValueError("Response does not contain a 'content' field.")
 
-async def search_answers_for_questions(questions):
-    # client = OpenAIChatCompletionClient(
-    #     model="gpt-4.1-nano",
-    #     api_key=settings.OPENAI_API_KEY
-    # )
 
-    # Configuration for the Gemini Pro model
-    client = OpenAIChatCompletionClient(
-        model="gemini-1.5-pro", api_key=settings.GEMINI_API_KEY)
-    
-    # surfer = MultimodalWebSurfer(
-    #     name="basic_web_surfer",
-    #     model_client=client,
-    #     description="You are a web surfer that can search and browse the internet. Provide helpful answers based on online information. Only give back one answer for all webs you browse. ",
-    #     headless=True,
-    #     start_page="https://www.google.com",
-    # )
+class AnswerCheckpoint:
+    """Append-only JSONL of answered questions ({"id", "question", "answer"} per line)"""
+
+    def __init__(self, path: str):
+        self.path = Path(path)
+        self.done: Dict[str, Dict[str, Any]] = {}
+        needs_newline = False
+        if self.path.exists():
+            with open(self.path, "r", encoding="utf-8") as f:
+                for line in f:
+                    needs_newline = not line.endswith("\n")
+                    try:
+                        record = json.loads(line)
+                    except json.JSONDecodeError:
+                        continue  # torn last line of an interrupted run
+                    self.done[str(record["id"])] = record
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._file = open(self.path, "a", encoding="utf-8")
+        if needs_newline:
+            self._file.write("\n")
 
-    qa_pairs = []
-    prompt_base = (
-        "You are a professional university application advisor with years of experience in help students apply to U.S. universities. "
-        "You can browse the web, especially the official websites of universities, to find accurate and up-to-date information. "
-        "Browse multiple websites to find the best and most accurate answer for the question. "
-        "No need to include any markdown formatting. Just give the answer in plain text.\n\n"
-        "If you cannot find the answer, just say 'I don't know'.\n\n"
-
-    )
-    
-    for q in questions:
+    def append(self, record: Dict[str, Any]):
+        self._file.write(json.dumps(record, ensure_ascii=False) + "\n")
+        self._file.flush()
+        self.done[str(record["id"])] = record
+
+    def close(self):
+        self._file.close()
+
+
+async def ask_with_retry(ask: Callable[[str], Awaitable[str]], question: str, retries: int,
+                         backoff_base: float, stats: Dict[str, Any]) -> str:
+    """Answer one question, retrying any failure up to `retries` times (full-jitter backoff)"""
+    for attempt in range(retries + 1):
         try:
-            prompt = prompt_base + f"Question: {q}"
-            ans = await client.create([UserMessage(content=prompt, source="user")]) # Send the prompt to the model
-            ans = extract_answer_only(ans)  # Extract the answer text from the response
-            qa_pairs.append({"question": q, "answer": ans})
+            return await ask(question)
         except Exception as e:
-            qa_pairs.append({"question": q, "answer": f"Error: {str(e)}"})
+            if attempt == retries:
+                raise
+            delay = random.uniform(0, backoff_base * (2 ** attempt))
+            stats["retries"] += 1
+            print(f"[!] Retry {attempt + 1}/{retries} in {delay:.1f}s: {type(e).__name__}: {e}")
+            await asyncio.sleep(delay)
 
-    return qa_pairs
+
+async def crawl_answers(
+    rows: List[Dict[str, Any]],
+    ask: Callable[[str], Awaitable[str]],
+    checkpoint: Optional[AnswerCheckpoint] = None,
+    write_batch: Optional[Callable[[List[Dict[str, Any]]], Any]] = None,
+    concurrency: int = 8,
+    retries: int = 3,
+    db_batch_size: int = 100,
+    backoff_base: float = 1.0,
+    progress_every: int = 50,
+) -> Dict[str, Any]:
+    """
+    Answer rows ({"id", "question"}) with at most `concurrency` questions in flight.
+    Answers go to the checkpoint immediately and to write_batch (run in a worker thread)
+    every db_batch_size answers. Questions already in the checkpoint are not asked again;
+    their answers are re-sent to write_batch, since the caller still listed them as open.
+    Questions that fail every retry and batches the DB rejects are only counted, so the
+    next run picks them up (from the table / the checkpoint). Returns throughput stats.
+    """
+    stats = {"questions": len(rows), "resumed": 0, "answered": 0, "failed": 0, "retries": 0,
+             "db_rows": 0, "db_failed_rows": 0, "latency_ms_total": 0.0}
+    pending_db: List[Dict[str, Any]] = []
+    queue: asyncio.Queue = asyncio.Queue()
+    for row in rows:
+        record = checkpoint.done.get(str(row["id"])) if checkpoint else None
+        if record is None:
+            queue.put_nowait(row)
+            continue
+        stats["resumed"] += 1
+        if write_batch:
+            pending_db.append(record)
+
+    async def flush():
+        if not write_batch or not pending_db:
+            return
+        batch = pending_db[:]
+        pending_db.clear()
+        try:
+            await asyncio.to_thread(write_batch, batch)
+        except Exception as e:
+            # Keep crawling; the answers are checkpointed, so the next run re-sends them
+            stats["db_failed_rows"] += len(batch)
+            print(f"[✘] DB write of {len(batch)} answers failed: {type(e).__name__}: {e}")
+            return
+        stats["db_rows"] += len(batch)
+
+    to_ask = queue.qsize()
+    start = time.perf_counter()
+
+    async def worker():
+        while True:
+            try:
+                row = queue.get_nowait()
+            except asyncio.QueueEmpty:
+                return
+            asked_at = time.perf_counter()
+            try:
+                answer = await ask_with_retry(ask, row["question"], retries, backoff_base, stats)
+            except Exception as e:
+                stats["failed"] += 1
+                print(f"[✘] Question {row['id']} failed: {type(e).__name__}: {e}")
+                continue
+            stats["latency_ms_total"] += (time.perf_counter() - asked_at) * 1000
+            stats["answered"] += 1
+
+            record = {"id": row["id"], "question": row["question"], "answer": answer}
+            if checkpoint:
+                checkpoint.append(record)
+            if write_batch:
+                pending_db.append(record)
+                if len(pending_db) >= db_batch_size:
+                    await flush()
+
+            done = stats["answered"] + stats["failed"]
+            if progress_every and done % progress_every == 0:
+                elapsed = time.perf_counter() - start
+                print(f"[…] {done}/{to_ask} processed, {stats['failed']} failed, "
+                      f"{stats['answered'] / elapsed:.2f} answers/s")
+
+    # Answers resumed from the checkpoint go out before new ones arrive
+    await flush()
+    await asyncio.gather(*(worker() for _ in range(max(1, concurrency))))
+    await flush()
+
+    elapsed = time.perf_counter() - start
+    stats["elapsed_s"] = round(elapsed, 2)
+    stats["answers_per_s"] = round(stats["answered"] / elapsed, 3) if elapsed else 0.0
+    stats["avg_latency_ms"] = round(stats["latency_ms_total"] / stats["answered"], 1) if stats["answered"] else 0.0
+    return stats
 
 
 def fetch_all_questions_from_db(table):
@@ -85,32 +214,67 @@ def update_answers_in_db(qa_pairs, table):
 
 
 async def main():
-    table = "test_agent_qa"
-    # rows = fetch_all_questions_from_db(table)
-    # if not rows:
-    #     print("No unanswered questions found.")
-    #     return
-
-    # questions = [row["question"] for row in rows]
-    # ids = [row["id"] for row in rows]
-    with open("./common_questions.pkl", "rb") as f:
-        questions = pickle.load(f)
-    ids = [i for i in range(len(questions))]  # Example IDs for testing
-
-    qa_pairs_raw = await search_answers_for_questions(questions)
-
-    # Attach ids
-    qa_pairs = []
-    for i, pair in enumerate(qa_pairs_raw):
-        qa_pairs.append({
-            "id": ids[i],
-            "question": pair["question"],
-            "answer": pair["answer"]
-        })
-    with open("qa_pairs.pkl", "wb") as f:
-        pickle.dump(qa_pairs, f)
-
-    # update_answers_in_db(qa_pairs, table)
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--table", default="test_agent_qa")
+    parser.add_argument("--questions", help="pickle with a list of question strings instead of the table "
+                                            "(ids are list positions; nothing is written to MySQL)")
+    parser.add_argument("--checkpoint", help="JSONL checkpoint (default: data/crawl/answers_<table or pickle name>.jsonl)")
+    parser.add_argument("--concurrency", type=int, default=8, help="questions in flight")
+    parser.add_argument("--retries", type=int, default=3, help="retries per question")
+    parser.add_argument("--db-batch-size", type=int, default=100, help="answers per UPDATE batch")
+    args = parser.parse_args()
+
+    if args.questions:
+        with open(args.questions, "rb") as f:
+            rows = [{"id": i, "question": q} for i, q in enumerate(pickle.load(f))]
+        write_batch = None
+    else:
+        rows = fetch_all_questions_from_db(args.table)
+        write_batch = lambda batch: update_answers_in_db(batch, args.table)
+    if not rows:
+        print("No unanswered questions found.")
+        return
+
+    # client = OpenAIChatCompletionClient(
+    #     model="gpt-4.1-nano",
+    #     api_key=settings.OPENAI_API_KEY
+    # )
+
+    # Configuration for the Gemini Pro model
+    client = OpenAIChatCompletionClient(model=MODEL, api_key=settings.GEMINI_API_KEY)
+
+    # surfer = MultimodalWebSurfer(
+    #     name="basic_web_surfer",
+    #     model_client=client,
+    #     description="You are a web surfer that can search and browse the internet. Provide helpful answers based on online information. Only give back one answer for all webs you browse. ",
+    #     headless=True,
+    #     start_page="https://www.google.com",
+    # )
+
+    gateway = get_model_gateway()
+
+    async def ask(question: str) -> str:
+        messages = [UserMessage(content=PROMPT_BASE + f"Question: {question}", source="user")]
+        return extract_answer_only(await gateway.run(MODEL, lambda: client.create(messages)))
+
+    # Pickle ids are list positions, so they get their own checkpoint
+    source = Path(args.questions).stem if args.questions else args.table
+    checkpoint = AnswerCheckpoint(args.checkpoint or f"data/crawl/answers_{source}.jsonl")
+    try:
+        with llm_priority(Priority.BACKGROUND):
+            stats = await crawl_answers(
+                rows, ask, checkpoint=checkpoint, write_batch=write_batch,
+                concurrency=args.concurrency, retries=args.retries, db_batch_size=args.db_batch_size,
+            )
+    finally:
+        checkpoint.close()
+
+    print("=== Crawl Result ===")
+    print(f"Questions: {stats['questions']}  Resumed: {stats['resumed']}  Answered: {stats['answered']}  "
+          f"Failed: {stats['failed']}  Retries: {stats['retries']}  DB rows: {stats['db_rows']}  "
+          f"DB failed rows: {stats['db_failed_rows']}")
+    print(f"Time: {stats['elapsed_s']:.1f}s  ({stats['answers_per_s']:.2f} answers/s, "
+          f"avg {stats['avg_latency_ms']:.0f} ms/question)  Checkpoint: {checkpoint.path}")
 
 
 if __name__ == "__main__":
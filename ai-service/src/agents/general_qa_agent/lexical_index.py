@@ -0,0 +1,163 @@
+"""
+Lexical side of the hybrid RAG retriever
+BM25 inverted index with CJK-aware tokenization and per-QA-pair entity sets,
+built once alongside the FAISS index and loaded by RAGRetriever.
+"""
+
+import math
+import pickle
+import re
+from collections import Counter, defaultdict
+from typing import Dict, FrozenSet, List, Tuple
+
+LEXICAL_INDEX_VERSION = 2
+
+# Latin words/numbers (keeps things like "u.s" and "master's" together)
+_LATIN_TOKEN = re.compile(r"[a-z0-9]+(?:['.][a-z0-9]+)*")
+# CJK ideograph runs - tokenized into overlapping bigrams
+_CJK_RUN = re.compile(r"[\u3400-\u4dbf\u4e00-\u9fff\uf900-\ufaff]+")
+
+# Capitalized phrases / acronyms ("Stanford University", "MIT", "TOEFL")
+_LATIN_ENTITY = re.compile(r'\b[A-Z][a-z]+(?:\s[A-Z][a-z]+)*\b|[A-Z]{2,}')
+# Chinese institution names ("斯坦福大学", "伦敦商学院"): a suffix plus the 2-4 ideographs before it
+_CJK_NAME_RUN = re.compile(r'[\u4e00-\u9fff]+')
+_CJK_ENTITY_SUFFIX = re.compile(r'商学院|大学|学院|理工')
+_CJK_NAME_MAX_PREFIX = 4
+# Particles / verbs that end the text before a name ("申请交通大学", "北大和清华大学")
+_CJK_NAME_BOUNDARY = re.compile(r'了解|申请|报考|对比|比较|关于|介绍|请问|[的和与跟及或在去读想我是比问]')
+
+_STOPWORDS = {
+    'the', 'and', 'or', 'but', 'in', 'on', 'at', 'to', 'for', 'of', 'with', 'by', 'is', 'are',
+    'was', 'were', 'be', 'been', 'have', 'has', 'had', 'do', 'does', 'did', 'will', 'would',
+    'could', 'should', 'may', 'might', 'can', 'a', 'an', 'this', 'that', 'these', 'those',
+    'what', 'how', 'which', 'when', 'where', 'why', 'who', 'i', 'my', 'me', 'you', 'your', 'it',
+}
+
+# Sentence-initial words that the capitalization heuristic would otherwise treat as entities
+_ENTITY_STOPWORDS = {
+    'What', 'How', 'Which', 'When', 'Where', 'Why', 'Who', 'Is', 'Are', 'Do', 'Does', 'Did',
+    'Can', 'Could', 'Should', 'Would', 'Will', 'I', 'My', 'The', 'A', 'An', 'If', 'For', 'In',
+}
+
+
+def tokenize(text: str) -> List[str]:
+    """Lowercased latin word tokens plus CJK character bigrams"""
+    text = text.lower()
+    tokens = [token for token in _LATIN_TOKEN.findall(text) if token not in _STOPWORDS]
+    for run in _CJK_RUN.findall(text):
+        if len(run) == 1:
+            tokens.append(run)
+        else:
+            tokens.extend(run[i:i + 2] for i in range(len(run) - 1))
+    return tokens
+
+
+def _extract_cjk_names(text: str) -> List[str]:
+    """
+    One name per suffix, never overlapping: 上海交通大学 yields only itself, not 交通大学,
+    so it cannot match 西安交通大学. A suffix right after a name extends it (伦敦大学学院).
+    """
+    names = []
+    for run in _CJK_NAME_RUN.findall(text):
+        name_end = 0
+        for match in _CJK_ENTITY_SUFFIX.finditer(run):
+            if names and name_end and match.start() == name_end:
+                names[-1] += match.group()
+                name_end = match.end()
+                continue
+            window_start = max(name_end, match.start() - _CJK_NAME_MAX_PREFIX)
+            prefix = run[window_start:match.start()]
+            boundaries = list(_CJK_NAME_BOUNDARY.finditer(prefix))
+            if boundaries:
+                prefix = prefix[boundaries[-1].end():]
+            if len(prefix) >= 2:
+                names.append(prefix + match.group())
+                name_end = match.end()
+    return names
+
+
+def extract_entities(text: str) -> FrozenSet[str]:
+    """Extract potential entities like school names (English and Chinese)"""
+    entities = {entity for entity in _LATIN_ENTITY.findall(text) if entity not in _ENTITY_STOPWORDS}
+    entities.update(_extract_cjk_names(text))
+    return frozenset(entities)
+
+
+class BM25Index:
+    """
+    Okapi BM25 over an inverted index. Document ids are positions in the
+    qa_pairs list, i.e. the same ids used by the FAISS index and mapping.
+    """
+
+    def __init__(self, k1: float = 1.5, b: float = 0.75):
+        self.k1 = k1
+        self.b = b
+        self.version = LEXICAL_INDEX_VERSION
+        self.postings: Dict[str, List[Tuple[int, int]]] = {}
+        self.idf: Dict[str, float] = {}
+        self.doc_lengths: List[int] = []
+        self.avg_doc_length = 0.0
+        self.entities: List[FrozenSet[str]] = []
+
+    @property
+    def total_docs(self) -> int:
+        return len(self.doc_lengths)
+
+    @classmethod
+    def build(cls, qa_pairs: List[Dict], **kwargs) -> "BM25Index":
+        """Index question + answer text and precompute entity sets for every QA pair"""
+        index = cls(**kwargs)
+        postings = defaultdict(list)
+
+        for doc_id, pair in enumerate(qa_pairs):
+            tokens = tokenize(f"{pair['question']} {pair['answer']}")
+            index.doc_lengths.append(len(tokens))
+            for term, tf in Counter(tokens).items():
+                postings[term].append((doc_id, tf))
+            index.entities.append(extract_entities(pair['question']))
+
+        index.postings = dict(postings)
+        n = index.total_docs
+        index.avg_doc_length = (sum(index.doc_lengths) / n) if n else 0.0
+        index.idf = {
+            term: math.log(1 + (n - len(docs) + 0.5) / (len(docs) + 0.5))
+            for term, docs in index.postings.items()
+        }
+        return index
+
+    def search(self, query: str, top_k: int) -> List[Tuple[int, float]]:
+        """Return (doc_id, bm25_score) pairs, best first"""
+        if not self.total_docs:
+            return []
+
+        scores: Dict[int, float] = defaultdict(float)
+        for term in set(tokenize(query)):
+            idf = self.idf.get(term)
+            if idf is None:
+                continue
+            for doc_id, tf in self.postings[term]:
+                norm = self.k1 * (1 - self.b + self.b * self.doc_lengths[doc_id] / self.avg_doc_length)
+                scores[doc_id] += idf * tf * (self.k1 + 1) / (tf + norm)
+
+        return sorted(scores.items(), key=lambda item: item[1], reverse=True)[:top_k]
+
+    def save(self, path: str):
+        with open(path, 'wb') as f:
+            pickle.dump(self, f)
+
+    @classmethod
+    def load(cls, path: str) -> "BM25Index":
+        with open(path, 'rb') as f:
+            index = pickle.load(f)
+        if getattr(index, 'version', None) != LEXICAL_INDEX_VERSION:
+            raise ValueError(f"Lexical index version mismatch: {getattr(index, 'version', None)}")
+        return index
+
+
+def reciprocal_rank_fusion(rankings: List[List[int]], k: int = 60) -> Dict[int, float]:
+    """Fuse several ranked id lists into a single RRF score per id"""
+    fused: Dict[int, float] = defaultdict(float)
+    for ranking in rankings:
+        for rank, doc_id in enumerate(ranking, 1):
+            fused[doc_id] += 1.0 / (k + rank)
+    return dict(fused)
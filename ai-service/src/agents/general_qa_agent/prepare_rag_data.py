@@ -12,17 +12,21 @@ import numpy as np
 import pickle
 import json
 import asyncio
+import hashlib
+import random
+import re
 import time
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional
 from dotenv import load_dotenv
 
 # Add the src path for importing settings
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "../../../")))
 from src.settings import settings
+from src.agents.general_qa_agent.lexical_index import BM25Index
 
 try:
     import openai
-    from openai import OpenAI
+    from openai import OpenAI, AsyncOpenAI
     OPENAI_AVAILABLE = True
 except ImportError:
     OPENAI_AVAILABLE = False
@@ -35,6 +39,110 @@ except ImportError:
 
 load_dotenv(os.path.join(os.path.dirname(__file__), "../../../.env"))
 
+
+def _parse_reset_duration(value: Optional[str]) -> Optional[float]:
+    """Parse OpenAI rate limit reset values such as '1s', '6m0s' or '20ms' into seconds"""
+    if not value:
+        return None
+    try:
+        return float(value)
+    except ValueError:
+        pass
+
+    seconds = 0.0
+    matched = False
+    for amount, unit in re.findall(r'(\d+(?:\.\d+)?)(ms|h|m|s)', value):
+        matched = True
+        amount = float(amount)
+        if unit == 'ms':
+            seconds += amount / 1000
+        elif unit == 'h':
+            seconds += amount * 3600
+        elif unit == 'm':
+            seconds += amount * 60
+        else:
+            seconds += amount
+    return seconds if matched else None
+
+
+class TokenBucket:
+    """
+    Async token bucket refilled continuously at a per-minute rate.
+    Capacity and remaining budget can be corrected from API response headers.
+    """
+
+    def __init__(self, per_minute: float):
+        self.capacity = float(per_minute)
+        self.refill_rate = self.capacity / 60.0
+        self.tokens = self.capacity
+        self.updated_at = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        if now < self.updated_at:
+            # Paused until the server-side window resets
+            return
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated_at) * self.refill_rate)
+        self.updated_at = now
+
+    async def acquire(self, amount: float = 1.0):
+        """Wait until `amount` tokens are available and consume them"""
+        amount = min(amount, self.capacity)
+        async with self._lock:
+            while True:
+                self._refill()
+                if self.tokens >= amount:
+                    self.tokens -= amount
+                    return
+                await asyncio.sleep((amount - self.tokens) / self.refill_rate)
+
+    def sync(self, limit: Optional[float], remaining: Optional[float], reset_seconds: Optional[float]):
+        """Align the bucket with the server's view of the rate limit window"""
+        self._refill()
+        if limit:
+            self.capacity = float(limit)
+            self.refill_rate = self.capacity / 60.0
+        if remaining is not None:
+            self.tokens = min(self.tokens, float(remaining))
+            # Server says we are exhausted: don't refill before the window resets
+            if remaining <= 0 and reset_seconds:
+                self.updated_at = time.monotonic() + reset_seconds
+
+
+class EmbeddingRateLimiter:
+    """
+    Request + token rate limiter driven by OpenAI's x-ratelimit-* response headers
+    """
+
+    def __init__(self, requests_per_minute: float, tokens_per_minute: float):
+        self.requests = TokenBucket(requests_per_minute)
+        self.tokens = TokenBucket(tokens_per_minute)
+
+    async def acquire(self, estimated_tokens: int):
+        await self.requests.acquire(1)
+        await self.tokens.acquire(estimated_tokens)
+
+    def update_from_headers(self, headers) -> None:
+        def _num(name):
+            value = headers.get(name)
+            try:
+                return float(value) if value is not None else None
+            except ValueError:
+                return None
+
+        self.requests.sync(
+            _num("x-ratelimit-limit-requests"),
+            _num("x-ratelimit-remaining-requests"),
+            _parse_reset_duration(headers.get("x-ratelimit-reset-requests")),
+        )
+        self.tokens.sync(
+            _num("x-ratelimit-limit-tokens"),
+            _num("x-ratelimit-remaining-tokens"),
+            _parse_reset_duration(headers.get("x-ratelimit-reset-tokens")),
+        )
+
+
 class RAGDataPreparer:
     """
     Prepares RAG data using OpenAI text-embedding-3-large model
@@ -52,11 +160,30 @@ class RAGDataPreparer:
         self.faiss_index_path = os.path.join(self.output_dir, "faiss.index")
         self.embeddings_path = os.path.join(self.output_dir, "embeddings.npy")
         self.mapping_path = os.path.join(self.output_dir, "mapping.pkl")
+        self.lexical_index_path = os.path.join(self.output_dir, "lexical_index.pkl")
         self.config_path = os.path.join(self.output_dir, "rag_config.json")
+        self.checkpoint_dir = os.path.join(self.output_dir, "embedding_checkpoints")
         
         # Rate limiting
         self.batch_size = 50  # Process embeddings in batches
-        self.delay_between_batches = 1  # seconds
+        self.max_concurrency = 4  # Batches in flight at the same time
+        self.max_retries = 6
+        self.backoff_base = 1.0  # seconds, doubled on every retry
+        self.backoff_max = 60.0
+        self.rate_limiter = EmbeddingRateLimiter(
+            requests_per_minute=float(os.getenv("EMBEDDING_RPM_LIMIT", 3000)),
+            tokens_per_minute=float(os.getenv("EMBEDDING_TPM_LIMIT", 1_000_000)),
+        )
+        self._async_client = None
+        
+        # Throughput statistics
+        self.stats = {
+            'requests': 0,
+            'retries': 0,
+            'resumed_batches': 0,
+            'embedded_texts': 0,
+            'total_tokens': 0,
+        }
         
         self._validate_setup()
     
@@ -128,61 +255,136 @@ class RAGDataPreparer:
             print(f"❌ Error loading CSV: {e}")
             sys.exit(1)
     
+    @property
+    def async_client(self) -> "AsyncOpenAI":
+        if self._async_client is None:
+            self._async_client = AsyncOpenAI(api_key=self.openai_api_key, max_retries=0)
+        return self._async_client
+    
+    def _backoff_delay(self, attempt: int, retry_after: Optional[float] = None) -> float:
+        """Exponential backoff with full jitter, honoring Retry-After when given"""
+        if retry_after is not None:
+            return retry_after + random.uniform(0, 1)
+        return random.uniform(0, min(self.backoff_max, self.backoff_base * (2 ** attempt)))
+    
     async def generate_embeddings_batch(self, texts: List[str]) -> List[List[float]]:
         """Generate embeddings for a batch of texts using OpenAI API"""
-        try:
-            client = OpenAI(api_key=self.openai_api_key)
-            
-            response = client.embeddings.create(
-                model=self.embedding_model,
-                input=texts,
-                encoding_format="float"
-            )
-            
-            embeddings = [item.embedding for item in response.data]
-            return embeddings
-            
-        except Exception as e:
-            print(f"❌ Error generating embeddings: {e}")
-            if "rate limit" in str(e).lower():
-                print("⏳ Rate limited, waiting 30 seconds...")
-                await asyncio.sleep(30)
-                return await self.generate_embeddings_batch(texts)
-            raise e
+        estimated_tokens = sum(len(text) // 4 + 1 for text in texts)
+        
+        for attempt in range(self.max_retries + 1):
+            await self.rate_limiter.acquire(estimated_tokens)
+            try:
+                self.stats['requests'] += 1
+                raw = await self.async_client.embeddings.with_raw_response.create(
+                    model=self.embedding_model,
+                    input=texts,
+                    encoding_format="float"
+                )
+                self.rate_limiter.update_from_headers(raw.headers)
+                response = raw.parse()
+                
+                if response.usage:
+                    self.stats['total_tokens'] += response.usage.total_tokens
+                return [item.embedding for item in sorted(response.data, key=lambda item: item.index)]
+                
+            except (openai.RateLimitError, openai.APITimeoutError,
+                    openai.APIConnectionError, openai.InternalServerError) as e:
+                if attempt == self.max_retries:
+                    print(f"❌ Giving up after {attempt + 1} attempts: {e}")
+                    raise
+                
+                retry_after = None
+                response = getattr(e, 'response', None)
+                if response is not None:
+                    self.rate_limiter.update_from_headers(response.headers)
+                    retry_after = _parse_reset_duration(response.headers.get("retry-after"))
+                
+                delay = self._backoff_delay(attempt, retry_after)
+                self.stats['retries'] += 1
+                print(f"⏳ {type(e).__name__}, retrying in {delay:.1f}s (attempt {attempt + 1}/{self.max_retries})")
+                await asyncio.sleep(delay)
+    
+    def _checkpoint_path(self, batch_num: int, texts: List[str]) -> str:
+        """Checkpoint file for a batch, keyed by model and batch content so stale files are never reused"""
+        digest = hashlib.sha1(
+            "\x1f".join([self.embedding_model, *texts]).encode("utf-8")
+        ).hexdigest()[:16]
+        return os.path.join(self.checkpoint_dir, f"batch_{batch_num:05d}_{digest}.npy")
+    
+    def clear_checkpoints(self):
+        """Remove batch checkpoints once the final files are written"""
+        if not os.path.isdir(self.checkpoint_dir):
+            return
+        for filename in os.listdir(self.checkpoint_dir):
+            if filename.startswith("batch_") and filename.endswith(".npy"):
+                os.remove(os.path.join(self.checkpoint_dir, filename))
+        print("🧹 Cleared embedding checkpoints")
+    
+    async def _embed_batch_with_checkpoint(self, batch_num: int, total_batches: int,
+                                           texts: List[str], semaphore: asyncio.Semaphore) -> np.ndarray:
+        checkpoint_path = self._checkpoint_path(batch_num, texts)
+        if os.path.exists(checkpoint_path):
+            self.stats['resumed_batches'] += 1
+            return np.load(checkpoint_path)
+        
+        async with semaphore:
+            print(f"⚡ Processing batch {batch_num}/{total_batches} ({len(texts)} questions)")
+            embeddings = np.array(await self.generate_embeddings_batch(texts), dtype=np.float32)
+        
+        # Write atomically so an interrupted run never leaves a truncated checkpoint
+        tmp_path = checkpoint_path + ".tmp"
+        with open(tmp_path, 'wb') as f:
+            np.save(f, embeddings)
+        os.replace(tmp_path, checkpoint_path)
+        
+        self.stats['embedded_texts'] += len(texts)
+        return embeddings
     
     async def generate_all_embeddings(self, qa_pairs: List[Dict]) -> np.ndarray:
-        """Generate embeddings for all questions with rate limiting"""
+        """Generate embeddings for all questions with bounded concurrency and resumable checkpoints"""
         print(f"🔮 Generating embeddings using {self.embedding_model}")
-        print(f"📊 Processing {len(qa_pairs)} questions in batches of {self.batch_size}")
+        print(f"📊 Processing {len(qa_pairs)} questions in batches of {self.batch_size} "
+              f"({self.max_concurrency} concurrent)")
         
-        all_embeddings = []
+        os.makedirs(self.checkpoint_dir, exist_ok=True)
         questions = [pair['question'] for pair in qa_pairs]
+        total_batches = (len(questions) + self.batch_size - 1) // self.batch_size
+        semaphore = asyncio.Semaphore(self.max_concurrency)
         
-        # Process in batches to avoid rate limits
-        for i in range(0, len(questions), self.batch_size):
-            batch = questions[i:i + self.batch_size]
-            batch_num = i // self.batch_size + 1
-            total_batches = (len(questions) + self.batch_size - 1) // self.batch_size
-            
-            print(f"⚡ Processing batch {batch_num}/{total_batches} ({len(batch)} questions)")
-            
-            try:
-                batch_embeddings = await self.generate_embeddings_batch(batch)
-                all_embeddings.extend(batch_embeddings)
-                
-                # Rate limiting delay
-                if i + self.batch_size < len(questions):
-                    print(f"⏳ Waiting {self.delay_between_batches}s before next batch...")
-                    await asyncio.sleep(self.delay_between_batches)
-                    
-            except Exception as e:
-                print(f"❌ Error in batch {batch_num}: {e}")
-                sys.exit(1)
+        start_time = time.perf_counter()
+        try:
+            batch_results = await asyncio.gather(*[
+                self._embed_batch_with_checkpoint(
+                    i // self.batch_size + 1,
+                    total_batches,
+                    questions[i:i + self.batch_size],
+                    semaphore,
+                )
+                for i in range(0, len(questions), self.batch_size)
+            ])
+        except Exception as e:
+            print(f"❌ Error generating embeddings: {e}")
+            print(f"💾 Finished batches are checkpointed in {os.path.abspath(self.checkpoint_dir)} - rerun to resume")
+            sys.exit(1)
+        elapsed = time.perf_counter() - start_time
         
-        embeddings_array = np.array(all_embeddings, dtype=np.float32)
+        embeddings_array = np.vstack(batch_results).astype(np.float32)
         print(f"✅ Generated embeddings: {embeddings_array.shape}")
+        self.print_throughput(elapsed)
         return embeddings_array
     
+    def print_throughput(self, elapsed: float):
+        """Print embedding throughput statistics"""
+        elapsed = max(elapsed, 1e-9)
+        print("📈 Embedding throughput:")
+        print(f"   • Elapsed: {elapsed:.1f}s")
+        print(f"   • Requests: {self.stats['requests']} (retries: {self.stats['retries']})")
+        print(f"   • Resumed from checkpoint: {self.stats['resumed_batches']} batches")
+        print(f"   • Texts embedded: {self.stats['embedded_texts']} "
+              f"({self.stats['embedded_texts'] / elapsed:.1f} texts/s)")
+        print(f"   • Tokens: {self.stats['total_tokens']} "
+              f"({self.stats['total_tokens'] / elapsed:.0f} tokens/s)")
+    
     def build_faiss_index(self, embeddings: np.ndarray) -> faiss.Index:
         """Build FAISS index for fast similarity search"""
         print("🔍 Building FAISS index for fast similarity search")
@@ -202,7 +404,16 @@ class RAGDataPreparer:
             print(f"❌ Error building FAISS index: {e}")
             sys.exit(1)
     
-    def save_all_files(self, qa_pairs: List[Dict], embeddings: np.ndarray, index: faiss.Index):
+    def build_lexical_index(self, qa_pairs: List[Dict]) -> BM25Index:
+        """Build the BM25 inverted index and per-pair entity sets used for hybrid retrieval"""
+        print("🔤 Building BM25 lexical index")
+        
+        lexical_index = BM25Index.build(qa_pairs)
+        print(f"✅ Lexical index built: {lexical_index.total_docs} documents, {len(lexical_index.postings)} terms")
+        return lexical_index
+    
+    def save_all_files(self, qa_pairs: List[Dict], embeddings: np.ndarray, index: faiss.Index,
+                       lexical_index: BM25Index):
         """Save all required files for the hybrid agent"""
         print("💾 Saving all RAG files...")
         
@@ -226,6 +437,10 @@ class RAGDataPreparer:
                 pickle.dump(mapping, f)
             print(f"✅ Saved mapping: {os.path.abspath(self.mapping_path)}")
             
+            # Save lexical index
+            lexical_index.save(self.lexical_index_path)
+            print(f"✅ Saved lexical index: {os.path.abspath(self.lexical_index_path)}")
+            
             # Save configuration
             config = {
                 'embedding_model': self.embedding_model,
@@ -258,11 +473,14 @@ class RAGDataPreparer:
             with open(self.mapping_path, 'rb') as f:
                 loaded_mapping = pickle.load(f)
             
+            loaded_lexical_index = BM25Index.load(self.lexical_index_path)
+            
             # Validate consistency
             assert len(loaded_qa_pairs) == len(qa_pairs), "Q&A pairs count mismatch"
             assert loaded_index.ntotal == len(qa_pairs), "FAISS index count mismatch"
             assert loaded_embeddings.shape[0] == len(qa_pairs), "Embeddings count mismatch"
             assert len(loaded_mapping) == len(qa_pairs), "Mapping count mismatch"
+            assert loaded_lexical_index.total_docs == len(qa_pairs), "Lexical index count mismatch"
             
             print("✅ All files validated successfully")
             return True
@@ -332,6 +550,7 @@ class RAGDataPreparer:
         print(f"   • data/faiss.index")
         print(f"   • data/embeddings.npy")
         print(f"   • data/mapping.pkl")
+        print("   • data/lexical_index.pkl")
         print(f"   • data/rag_config.json")
         print("\n🚀 Ready for Hybrid QA Agent!")
         print("From root directory, run:")
@@ -355,13 +574,17 @@ async def main():
     # Step 3: Build FAISS index
     index = preparer.build_faiss_index(embeddings)
     
+    # Step 3b: Build BM25 lexical index
+    lexical_index = preparer.build_lexical_index(qa_pairs)
+    
     # Step 4: Save all files
-    preparer.save_all_files(qa_pairs, embeddings, index)
+    preparer.save_all_files(qa_pairs, embeddings, index, lexical_index)
     
     # Step 5: Validate setup
     if not preparer.validate_setup(qa_pairs):
         print("❌ Setup validation failed")
         sys.exit(1)
+    preparer.clear_checkpoints()
     
     # Step 6: Test similarity search
     if not preparer.test_similarity_search():
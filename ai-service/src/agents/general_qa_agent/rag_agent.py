@@ -4,19 +4,21 @@ Uses text-embedding-3-large for generating embeddings and FAISS for similarity s
 Returns only retrieved context without LLM generation.
 """
 
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Optional, Tuple
 import faiss
 import numpy as np
 import os
-import re
 import pickle
 import sys
+import time
 from dotenv import load_dotenv
 from openai import OpenAI
 
 # Add the src path for importing settings
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "../../../")))
 from src.settings import settings
+from src.agents.general_qa_agent.lexical_index import BM25Index, extract_entities, reciprocal_rank_fusion
+from src.agents.general_qa_agent.rag_registry import RAGArtifactRegistry, RAGArtifacts, get_rag_registry
 
 # Load environment variables
 load_dotenv(os.path.join(os.path.dirname(__file__), "../../../.env"))
@@ -34,10 +36,14 @@ QA_PAIRS_PATH = get_data_path('qa_pairs.pkl')
 FAISS_INDEX_PATH = get_data_path('faiss.index')
 EMBEDDINGS_PATH = get_data_path('embeddings.npy')
 MAPPING_PATH = get_data_path('mapping.pkl')
+LEXICAL_INDEX_PATH = get_data_path('lexical_index.pkl')
 EMBEDDING_MODEL_NAME = 'text-embedding-3-large'
 EMBEDDING_DIMENSIONS = 3072  # text-embedding-3-large dimensions
 TOP_K = 5  # Retrieve more candidates to filter
 SIMILARITY_THRESHOLD = 1.5 # Max L2 distance. Lower is more similar. Increased for better recall.
+CANDIDATE_MULTIPLIER = 4  # Each retriever contributes top_k * CANDIDATE_MULTIPLIER candidates to fusion
+RRF_K = 60
+EMBEDDING_BATCH_LIMIT = 2048  # Max inputs per OpenAI embeddings request
 
 # Initialize OpenAI client
 openai_client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
@@ -47,96 +53,188 @@ class RAGRetriever:
     Pure RAG Retrieval Agent - returns only retrieved context without LLM generation
     """
     
-    def __init__(self):
+    def __init__(self, registry: Optional[RAGArtifactRegistry] = None):
         self.openai_client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
         self.embedding_model = EMBEDDING_MODEL_NAME
         self.similarity_threshold = SIMILARITY_THRESHOLD
         self.top_k = TOP_K
+        self.candidate_multiplier = CANDIDATE_MULTIPLIER
         
         # Validate setup
         if not os.getenv("OPENAI_API_KEY"):
             raise ValueError("OPENAI_API_KEY not found in environment variables")
         
-        # Load RAG components
-        self.qa_pairs = None
-        self.index = None
-        self.mapping = None
-        self._load_rag_components()
-    
-    def _load_rag_components(self):
-        """Load all RAG components"""
+        # RAG components are loaded once per process and shared read-only by all retrievers
+        self.registry = registry or get_rag_registry()
         try:
-            if os.path.exists(QA_PAIRS_PATH) and os.path.exists(FAISS_INDEX_PATH) and os.path.exists(MAPPING_PATH):
-                self.qa_pairs = load_qa_pairs(QA_PAIRS_PATH)
-                self.index = load_faiss_index(FAISS_INDEX_PATH)
-                self.mapping = load_mapping(MAPPING_PATH)
-                print(f"✅ RAG components loaded: {len(self.qa_pairs)} QA pairs")
-            else:
-                raise FileNotFoundError("RAG components not found")
+            self.registry.get()
         except Exception as e:
             print(f"❌ Error loading RAG components: {e}")
             raise e
     
+    @property
+    def artifacts(self) -> RAGArtifacts:
+        """Current snapshot; take it once per query so a reload cannot mix index and mapping versions"""
+        return self.registry.get()
+    
+    @property
+    def qa_pairs(self):
+        return self.artifacts.qa_pairs
+    
+    @property
+    def index(self):
+        return self.artifacts.index
+    
+    @property
+    def mapping(self):
+        return self.artifacts.mapping
+    
+    @property
+    def lexical_index(self):
+        return self.artifacts.lexical_index
+    
     def extract_entities(self, text: str) -> set:
         """Extract potential entities like school names"""
-        pattern = r'\b[A-Z][a-z]+(?:\s[A-Z][a-z]+)*\b|[A-Z]{2,}'
-        return set(re.findall(pattern, text))
+        return set(extract_entities(text))
     
-    def retrieve_similar_questions(self, question: str, top_k: Optional[int] = None) -> List[Dict[str, Any]]:
-        """Retrieve similar questions using OpenAI embeddings"""
-        if top_k is None:
-            top_k = self.top_k
-            
+    def _embed_queries(self, questions: List[str]) -> Optional[np.ndarray]:
+        """Embed queries in as few API requests as possible; returns a (n, dim) float32 matrix"""
         try:
-            # Generate embedding for the query
-            response = self.openai_client.embeddings.create(
-                model=self.embedding_model,
-                input=[question],
-                encoding_format="float"
-            )
-            embedding = np.array([response.data[0].embedding], dtype=np.float32)
+            embeddings = []
+            for i in range(0, len(questions), EMBEDDING_BATCH_LIMIT):
+                response = self.openai_client.embeddings.create(
+                    model=self.embedding_model,
+                    input=questions[i:i + EMBEDDING_BATCH_LIMIT],
+                    encoding_format="float"
+                )
+                embeddings.extend(item.embedding for item in sorted(response.data, key=lambda item: item.index))
+            return np.array(embeddings, dtype=np.float32)
         except Exception as e:
             print(f"❌ Error generating query embedding: {e}")
-            return []
+            return None
+    
+    def embed_query(self, question: str) -> Optional[np.ndarray]:
+        """Embed a single query; the vector can be reused via get_rag_context(query_embedding=...)"""
+        embeddings = self._embed_queries([question])
+        return None if embeddings is None else embeddings[0]
+    
+    def _l2_distance(self, artifacts: RAGArtifacts, embedding: np.ndarray, idx: int) -> Optional[float]:
+        """Distance for a lexical-only candidate that the vector search did not return"""
+        try:
+            vector = artifacts.index.reconstruct(int(idx))
+        except Exception:
+            return None
+        return float(np.sum((embedding - vector) ** 2))
+    
+    def _fuse_and_filter(self, artifacts: RAGArtifacts, question: str, embedding: np.ndarray,
+                         vector_hits: Dict[int, float], lexical_hits: Dict[int, float],
+                         top_k: int) -> List[Dict[str, Any]]:
+        """Fuse vector and lexical candidates with RRF, then filter by distance and entities"""
+        fused = reciprocal_rank_fusion([list(vector_hits), list(lexical_hits)], k=RRF_K)
+        user_entities = extract_entities(question)
         
-        distances, indices = self.index.search(embedding, top_k)
+        similarity_filtered_results = []
+        for idx, rrf_score in sorted(fused.items(), key=lambda item: item[1], reverse=True):
+            dist = vector_hits.get(idx)
+            if dist is None:
+                dist = self._l2_distance(artifacts, embedding, idx)
+            if dist is None or dist >= self.similarity_threshold:
+                continue
+            
+            qa_pair = artifacts.mapping[idx]
+            similarity_filtered_results.append({
+                'question': qa_pair['question'],
+                'answer': qa_pair['answer'],
+                'similarity': 1 / (1 + dist),  # Convert distance to similarity
+                'distance': dist,
+                'bm25_score': lexical_hits.get(idx, 0.0),
+                'rrf_score': rrf_score,
+                'entity_match': bool(user_entities and user_entities & artifacts.lexical_index.entities[idx])
+                                if artifacts.lexical_index else False,
+            })
         
-        print(f"Retrieved distances: {distances[0]} (lower is better)")
+        # Hard filter by matching entities (e.g., school names) when any candidate shares one
+        entity_filtered_results = [pair for pair in similarity_filtered_results if pair['entity_match']]
+        results = (entity_filtered_results or similarity_filtered_results)[:top_k]
+        # Ranks are positions in the returned list, after the entity filter
+        for rank, pair in enumerate(results, 1):
+            pair['rank'] = rank
+        return results
+    
+    def retrieve_many(self, questions: List[str], top_k: Optional[int] = None,
+                      embeddings: Optional[np.ndarray] = None) -> List[List[Dict[str, Any]]]:
+        """
+        Batched hybrid retrieval: one embedding request and one FAISS search over the
+        stacked query matrix for all questions. Returns one result list per question,
+        in input order. Precomputed query embeddings (n, dim) skip the embedding request.
+        """
+        return self.retrieve_many_timed(questions, top_k, embeddings)[0]
+    
+    def retrieve_many_timed(self, questions: List[str], top_k: Optional[int] = None,
+                            embeddings: Optional[np.ndarray] = None
+                            ) -> Tuple[List[List[Dict[str, Any]]], Dict[str, float]]:
+        """
+        retrieve_many plus the per-stage latencies (ms) of this call. Timings are returned
+        rather than stored because one retriever serves concurrent queries from worker threads.
+        """
+        if top_k is None:
+            top_k = self.top_k
+        if not questions:
+            return [], {}
+        candidate_k = top_k * self.candidate_multiplier
+        timings = {}
+        artifacts = self.artifacts
         
-        # Filter by similarity score (distance)
-        similarity_filtered_results = []
-        for i, dist in enumerate(distances[0]):
-            if dist < self.similarity_threshold:
-                qa_pair = self.mapping[indices[0][i]]
-                similarity_score = 1 / (1 + dist)  # Convert distance to similarity
-                similarity_filtered_results.append({
-                    'question': qa_pair['question'],
-                    'answer': qa_pair['answer'],
-                    'similarity': similarity_score,
-                    'distance': dist,
-                    'rank': i + 1
-                })
-            else:
-                break
+        # Stage 1: query embeddings (single batched request)
+        stage_start = time.perf_counter()
+        if embeddings is None:
+            embeddings = self._embed_queries(questions)
+        else:
+            embeddings = np.asarray(embeddings, dtype=np.float32).reshape(len(questions), -1)
+        timings['embed_ms'] = (time.perf_counter() - stage_start) * 1000
+        if embeddings is None:
+            return [[] for _ in questions], timings
         
-        if not similarity_filtered_results:
-            return []
+        # Stage 2: vector search over the whole query matrix
+        stage_start = time.perf_counter()
+        distances, indices = artifacts.index.search(embeddings, candidate_k)
+        vector_hits = [
+            {int(idx): float(dist) for dist, idx in zip(distances[row], indices[row]) if idx >= 0}
+            for row in range(len(questions))
+        ]
+        timings['vector_ms'] = (time.perf_counter() - stage_start) * 1000
         
-        # Hard filter by matching entities (e.g., school names)
-        user_entities = self.extract_entities(question)
-        print(f"Detected entities in query: {user_entities or 'None'}")
+        # Stage 3: lexical search
+        stage_start = time.perf_counter()
+        lexical_hits = [
+            dict(artifacts.lexical_index.search(question, candidate_k)) if artifacts.lexical_index else {}
+            for question in questions
+        ]
+        timings['lexical_ms'] = (time.perf_counter() - stage_start) * 1000
         
-        if not user_entities:
-            # If no entities in query, return similarity-filtered results
-            return similarity_filtered_results
+        # Stage 4: fusion + filtering
+        stage_start = time.perf_counter()
+        results = [
+            self._fuse_and_filter(artifacts, question, embeddings[row], vector_hits[row], lexical_hits[row], top_k)
+            for row, question in enumerate(questions)
+        ]
+        timings['fusion_ms'] = (time.perf_counter() - stage_start) * 1000
+        timings['total_ms'] = sum(timings.values())
+        timings['queries'] = len(questions)
         
-        hard_filtered_results = []
-        for pair in similarity_filtered_results:
-            candidate_entities = self.extract_entities(pair['question'])
-            if user_entities.intersection(candidate_entities):
-                hard_filtered_results.append(pair)
+        print(f"Hybrid retrieval: {len(questions)} queries -> "
+              f"{sum(len(r) for r in results)} results ({timings['total_ms']:.1f} ms)")
         
-        return hard_filtered_results if hard_filtered_results else similarity_filtered_results
+        return results, timings
+    
+    def retrieve_similar_questions(self, question: str, top_k: Optional[int] = None,
+                                   query_embedding: Optional[np.ndarray] = None) -> List[Dict[str, Any]]:
+        """
+        Hybrid retrieval: FAISS vector search + BM25 lexical search fused with
+        reciprocal rank fusion, then filtered by distance and precomputed entities
+        """
+        print(f"Detected entities in query: {self.extract_entities(question) or 'None'}")
+        return self.retrieve_many([question], top_k, embeddings=query_embedding)[0]
     
     def format_rag_context(self, retrieved: List[Dict[str, Any]]) -> str:
         """Format retrieved QA pairs into context string"""
@@ -153,7 +251,8 @@ class RAGRetriever:
         
         return '\n'.join(context_parts)
     
-    def get_rag_context(self, question: str, top_k: Optional[int] = None) -> Dict[str, Any]:
+    def get_rag_context(self, question: str, top_k: Optional[int] = None,
+                        query_embedding: Optional[np.ndarray] = None) -> Dict[str, Any]:
         """
         Main method to get RAG context for a question
         Returns: {
@@ -161,20 +260,28 @@ class RAGRetriever:
             'context': str,
             'retrieved_pairs': List[Dict],
             'best_similarity': float,
-            'total_pairs': int
+            'total_pairs': int,
+            'timings': Dict[str, float]  # per-stage latency in ms
         }
         """
-        retrieved = self.retrieve_similar_questions(question, top_k)
-        
-        result = {
+        print(f"Detected entities in query: {self.extract_entities(question) or 'None'}")
+        results, timings = self.retrieve_many_timed([question], top_k, embeddings=query_embedding)
+        return self._build_context_result(results[0], timings)
+    
+    def get_rag_contexts(self, questions: List[str], top_k: Optional[int] = None) -> List[Dict[str, Any]]:
+        """Batched get_rag_context: one result dict per question, in input order (timings cover the batch)"""
+        results, timings = self.retrieve_many_timed(questions, top_k)
+        return [self._build_context_result(retrieved, timings) for retrieved in results]
+    
+    def _build_context_result(self, retrieved: List[Dict[str, Any]], timings: Dict[str, float]) -> Dict[str, Any]:
+        return {
             'has_context': len(retrieved) > 0,
             'context': self.format_rag_context(retrieved),
             'retrieved_pairs': retrieved,
-            'best_similarity': retrieved[0]['similarity'] if retrieved else 0.0,
-            'total_pairs': len(retrieved)
+            'best_similarity': max((pair['similarity'] for pair in retrieved), default=0.0),
+            'total_pairs': len(retrieved),
+            'timings': dict(timings)
         }
-        
-        return result
 
 def load_qa_pairs(path):
     with open(path, 'rb') as f:
@@ -187,6 +294,20 @@ def load_mapping(path):
     with open(path, 'rb') as f:
         return pickle.load(f)
 
+def load_lexical_index(path, qa_pairs):
+    """Load the prebuilt BM25 index, building it in memory for older data directories"""
+    if os.path.exists(path):
+        try:
+            lexical_index = BM25Index.load(path)
+            if lexical_index.total_docs == len(qa_pairs):
+                return lexical_index
+            print("⚠️ Lexical index is out of sync with qa_pairs.pkl, rebuilding in memory")
+        except Exception as e:
+            print(f"⚠️ Could not load lexical index ({e}), rebuilding in memory")
+    else:
+        print("⚠️ Lexical index not found, building in memory (run prepare_rag_data.py to persist it)")
+    return BM25Index.build(qa_pairs)
+
 def main():
     """Test the RAG retriever"""
     print('🔍 RAG Retriever - Pure Retrieval Mode')
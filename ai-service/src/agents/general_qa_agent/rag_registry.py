@@ -0,0 +1,173 @@
+"""
+Process-wide registry of RAG artifacts (qa_pairs.pkl, faiss.index, mapping.pkl, lexical_index.pkl)
+
+Artifacts are loaded lazily on first use and shared read-only by every RAGRetriever and
+thread in the process. The artifact files are fingerprinted (size + mtime); when
+prepare_rag_data.py rewrites them, the next check loads a fresh snapshot and swaps it in
+atomically while in-flight queries finish on the old one. A snapshot is only swapped in when
+qa_pairs, index and mapping agree in size and the files did not change during the load
+(otherwise a reload racing the rewrite could pair new qa_pairs with the old index).
+"""
+
+import os
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Any, Dict, Optional, Tuple
+
+from src.settings import settings
+
+
+def current_rss_mb() -> float:
+    """Resident set size of this process in MB (peak RSS where /proc is unavailable)"""
+    try:
+        with open("/proc/self/statm") as f:
+            resident_pages = int(f.read().split()[1])
+        return resident_pages * os.sysconf("SC_PAGE_SIZE") / (1024 * 1024)
+    except (OSError, ValueError, IndexError):
+        import resource
+        import sys
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+class InconsistentArtifacts(ValueError):
+    """The files on disk are mid-rewrite or out of sync with each other"""
+
+
+@dataclass(frozen=True)
+class RAGArtifacts:
+    """One immutable snapshot of the loaded artifacts; never mutate it after loading"""
+    qa_pairs: Any
+    index: Any
+    mapping: Any
+    lexical_index: Any
+    version: Tuple
+    load_seconds: float
+    rss_delta_mb: float
+    loaded_at: float = field(default_factory=time.time)
+
+
+class RAGArtifactRegistry:
+    def __init__(self, paths: Dict[str, str], check_interval: float = 60.0):
+        self.paths = paths
+        self.check_interval = check_interval
+        self._artifacts: Optional[RAGArtifacts] = None
+        self._checked_at = 0.0
+        self._lock = threading.Lock()
+        self.stats = {"loads": 0, "reloads": 0, "reload_failures": 0, "inconsistent_loads": 0}
+
+    def version(self) -> Tuple:
+        """Fingerprint of the artifact files on disk"""
+        fingerprint = []
+        for name in sorted(self.paths):
+            try:
+                stat = os.stat(self.paths[name])
+                fingerprint.append((name, stat.st_size, stat.st_mtime_ns))
+            except FileNotFoundError:
+                fingerprint.append((name, None, None))
+        return tuple(fingerprint)
+
+    def get(self) -> RAGArtifacts:
+        """Current snapshot; loads on first call and reloads when the files changed"""
+        artifacts = self._artifacts
+        if artifacts is None:
+            with self._lock:
+                if self._artifacts is None:
+                    self._artifacts = self._load()
+                    self._checked_at = time.monotonic()
+                return self._artifacts
+
+        if self.check_interval > 0 and time.monotonic() - self._checked_at >= self.check_interval:
+            # Only one thread checks/reloads; the others keep serving the current snapshot
+            if self._lock.acquire(blocking=False):
+                try:
+                    self._checked_at = time.monotonic()
+                    if self.version() != self._artifacts.version:
+                        self.reload()
+                finally:
+                    self._lock.release()
+        return self._artifacts
+
+    def reload(self):
+        """Load a fresh snapshot and swap it in; on failure the old snapshot stays active"""
+        try:
+            self._artifacts = self._load()
+            self.stats["reloads"] += 1
+        except Exception as e:
+            self.stats["reload_failures"] += 1
+            print(f"⚠️ RAG artifact reload failed, keeping previous version: {e}")
+
+    def _load(self) -> RAGArtifacts:
+        # Imported here to avoid a cycle: rag_agent uses this registry
+        from src.agents.general_qa_agent.rag_agent import (
+            load_faiss_index, load_lexical_index, load_mapping, load_qa_pairs,
+        )
+
+        required = ("qa_pairs", "index", "mapping")
+        if not all(os.path.exists(self.paths[name]) for name in required):
+            raise FileNotFoundError("RAG components not found")
+
+        version = self.version()
+        rss_before = current_rss_mb()
+        start = time.perf_counter()
+        qa_pairs = load_qa_pairs(self.paths["qa_pairs"])
+        index = load_faiss_index(self.paths["index"])
+        mapping = load_mapping(self.paths["mapping"])
+        sizes = (len(qa_pairs), index.ntotal, len(mapping))
+        if len(set(sizes)) != 1 or self.version() != version:
+            self.stats["inconsistent_loads"] += 1
+            raise InconsistentArtifacts(
+                f"RAG files changed or disagree during load (qa_pairs/index/mapping sizes: {sizes})")
+
+        artifacts = RAGArtifacts(
+            qa_pairs=qa_pairs,
+            index=index,
+            mapping=mapping,
+            lexical_index=load_lexical_index(self.paths["lexical_index"], qa_pairs),
+            version=version,
+            load_seconds=time.perf_counter() - start,
+            rss_delta_mb=current_rss_mb() - rss_before,
+        )
+        self.stats["loads"] += 1
+        print(f"✅ RAG components loaded: {len(qa_pairs)} QA pairs "
+              f"({artifacts.load_seconds:.2f}s, +{artifacts.rss_delta_mb:.0f} MB RSS)")
+        return artifacts
+
+    def get_stats(self) -> Dict[str, Any]:
+        artifacts = self._artifacts
+        stats = {**self.stats, "loaded": artifacts is not None, "rss_mb": round(current_rss_mb(), 1)}
+        if artifacts is not None:
+            stats.update(
+                qa_pairs=len(artifacts.qa_pairs),
+                load_seconds=round(artifacts.load_seconds, 3),
+                rss_delta_mb=round(artifacts.rss_delta_mb, 1),
+                loaded_at=artifacts.loaded_at,
+            )
+        return stats
+
+
+_registry: Optional[RAGArtifactRegistry] = None
+_registry_lock = threading.Lock()
+
+def get_rag_registry() -> RAGArtifactRegistry:
+    """
+    获取进程级共享的RAG数据注册表
+    """
+    global _registry
+    if _registry is None:
+        with _registry_lock:
+            if _registry is None:
+                from src.agents.general_qa_agent.rag_agent import (
+                    FAISS_INDEX_PATH, LEXICAL_INDEX_PATH, MAPPING_PATH, QA_PAIRS_PATH,
+                )
+                _registry = RAGArtifactRegistry(
+                    {
+                        "qa_pairs": QA_PAIRS_PATH,
+                        "index": FAISS_INDEX_PATH,
+                        "mapping": MAPPING_PATH,
+                        "lexical_index": LEXICAL_INDEX_PATH,
+                    },
+                    check_interval=settings.RAG_RELOAD_CHECK_SECONDS,
+                )
+    return _registry
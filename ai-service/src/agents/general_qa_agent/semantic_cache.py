@@ -0,0 +1,183 @@
+"""
+Semantic answer cache for the GENERAL_QA path
+Maps a question embedding to the nearest previously answered question and
+replays its final answer when the two are similar enough and the entry is
+still within its TTL.
+"""
+
+import copy
+import re
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Any, Dict, FrozenSet, List, Optional
+
+import numpy as np
+
+from src.agents.general_qa_agent.lexical_index import extract_entities
+
+
+@dataclass
+class CacheEntry:
+    """A cached answer together with where it came from"""
+    question: str
+    result: Dict[str, Any]
+    tags: FrozenSet[str]
+    created_at: float
+    expires_at: float
+    provenance: Dict[str, Any] = field(default_factory=dict)
+    hits: int = 0
+
+
+class SemanticAnswerCache:
+    """
+    In-process semantic cache keyed by question embedding (cosine similarity).
+    Entries carry provenance (strategy, sources, RAG similarity) and tags
+    (institutions / topic); a hit needs the same tags as the question, so
+    "GPA for Stanford CS?" never replays the answer about Berkeley CS, and
+    tags drive targeted invalidation.
+    """
+
+    def __init__(self, similarity_threshold: float = 0.95, ttl_seconds: float = 86400,
+                 max_entries: int = 5000):
+        self.similarity_threshold = similarity_threshold
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+
+        self._entries: List[CacheEntry] = []
+        self._matrix: Optional[np.ndarray] = None  # (n, dim) unit vectors, row i <-> _entries[i]
+        self._lock = threading.Lock()
+        self.stats = {'hits': 0, 'misses': 0, 'tag_mismatches': 0, 'expired': 0, 'evictions': 0,
+                      'invalidations': 0, 'stores': 0}
+
+    @staticmethod
+    def _normalize(embedding: np.ndarray) -> np.ndarray:
+        vector = np.asarray(embedding, dtype=np.float32).reshape(-1)
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
+
+    @staticmethod
+    def build_tags(question: str, topic: Optional[str] = None) -> FrozenSet[str]:
+        tags = {entity.lower() for entity in extract_entities(question)}
+        if topic:
+            tags.add(topic.lower())
+        return frozenset(tags)
+
+    def _remove(self, positions: List[int]):
+        """Drop entries at the given positions (caller holds the lock)"""
+        if not positions:
+            return
+        drop = set(positions)
+        self._entries = [entry for i, entry in enumerate(self._entries) if i not in drop]
+        if self._entries:
+            keep = [i for i in range(self._matrix.shape[0]) if i not in drop]
+            self._matrix = self._matrix[keep]
+        else:
+            self._matrix = None
+
+    def lookup(self, question: str, embedding: np.ndarray, topic: Optional[str] = None) -> Optional[Dict[str, Any]]:
+        """
+        Return a copy of the cached result for the nearest fresh question with the same
+        tags (pass the topic used when storing), or None
+        """
+        query = self._normalize(embedding)
+        tags = self.build_tags(question, topic)
+        now = time.time()
+
+        with self._lock:
+            expired = [i for i, entry in enumerate(self._entries) if entry.expires_at <= now]
+            if expired:
+                self.stats['expired'] += len(expired)
+                self._remove(expired)
+
+            if self._matrix is None:
+                self.stats['misses'] += 1
+                return None
+
+            similarities = self._matrix @ query
+            candidates = np.flatnonzero(similarities >= self.similarity_threshold)
+            # Most similar first; near-identical wording about another school is skipped
+            for position in candidates[np.argsort(-similarities[candidates])]:
+                if self._entries[position].tags == tags:
+                    break
+            else:
+                if len(candidates):
+                    self.stats['tag_mismatches'] += 1
+                self.stats['misses'] += 1
+                return None
+
+            entry = self._entries[position]
+            similarity = float(similarities[position])
+            entry.hits += 1
+            self.stats['hits'] += 1
+            result = copy.deepcopy(entry.result)
+
+        result['question'] = question
+        result['cache'] = {
+            'hit': True,
+            'similarity': similarity,
+            'cached_question': entry.question,
+            'age_seconds': round(now - entry.created_at, 1),
+            'provenance': dict(entry.provenance),
+        }
+        return result
+
+    def store(self, question: str, embedding: np.ndarray, result: Dict[str, Any],
+              topic: Optional[str] = None, ttl_seconds: Optional[float] = None) -> None:
+        """Cache a final answer; provenance is taken from the result's strategy/source fields"""
+        now = time.time()
+        entry = CacheEntry(
+            question=question,
+            result=copy.deepcopy(result),
+            tags=self.build_tags(question, topic),
+            created_at=now,
+            expires_at=now + (ttl_seconds if ttl_seconds is not None else self.ttl_seconds),
+            provenance={
+                'strategy': result.get('strategy'),
+                'source': result.get('source'),
+                'rag_similarity': result.get('rag_similarity'),
+                'reference_links': list(result.get('reference_links', [])),
+                'created_at': time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(now)),
+            },
+        )
+        vector = self._normalize(embedding)[np.newaxis, :]
+
+        with self._lock:
+            if len(self._entries) >= self.max_entries:
+                # Entries are appended in creation order, so the head is the oldest
+                overflow = len(self._entries) - self.max_entries + 1
+                self.stats['evictions'] += overflow
+                self._remove(list(range(overflow)))
+
+            self._entries.append(entry)
+            self._matrix = vector if self._matrix is None else np.vstack([self._matrix, vector])
+            self.stats['stores'] += 1
+
+    def invalidate(self, topic: Optional[str] = None, institution: Optional[str] = None) -> int:
+        """
+        Drop entries with a tag matching the given topic and/or institution as whole words
+        (case-insensitive: "Stanford" matches "stanford university", not "stanfordville").
+        With no arguments the whole cache is cleared. Returns the number of entries removed.
+        """
+        needles = [re.compile(rf"\b{re.escape(value.lower())}\b") for value in (topic, institution) if value]
+
+        with self._lock:
+            if not needles:
+                positions = list(range(len(self._entries)))
+            else:
+                positions = [
+                    i for i, entry in enumerate(self._entries)
+                    if any(needle.search(tag) for needle in needles for tag in entry.tags)
+                ]
+            self._remove(positions)
+            self.stats['invalidations'] += len(positions)
+            return len(positions)
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self.stats['hits'] + self.stats['misses']
+            return {
+                **self.stats,
+                'entries': len(self._entries),
+                'hit_rate': (self.stats['hits'] / lookups) if lookups else 0.0,
+            }
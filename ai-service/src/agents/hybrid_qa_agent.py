@@ -2,6 +2,7 @@ import os
 import asyncio
 import requests
 import sys
+import time
 from typing import Any, Dict, List, Optional
 from dotenv import load_dotenv
 
@@ -17,7 +18,9 @@ except ImportError:
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "../../")))
 from src.settings import settings
 from src.agents.general_qa_agent.rag_agent import RAGRetriever
+from src.agents.general_qa_agent.semantic_cache import SemanticAnswerCache
 from src.agents.perplexity_qa_agent import PerplexityQAAgent
+from src.model_client.llm_logging import LLMCall
 
 load_dotenv()
 
@@ -55,6 +58,18 @@ class HybridQAAgent:
         # Configuration
         self.uniqueness_threshold = 0.3  # How much RAG needs to add to be valuable
         self.min_rag_similarity = 0.6    # Minimum similarity for RAG to be considered
+        self.perplexity_timeout = 45     # Seconds before the web search is abandoned
+        self.rag_timeout = 15            # Seconds before RAG retrieval is abandoned
+        
+        # Semantic answer cache - needs the RAG retriever's embedding model to key questions
+        if settings.QA_CACHE_ENABLED and self.rag_available:
+            self.answer_cache = SemanticAnswerCache(
+                similarity_threshold=settings.QA_CACHE_SIMILARITY_THRESHOLD,
+                ttl_seconds=settings.QA_CACHE_TTL_SECONDS,
+                max_entries=settings.QA_CACHE_MAX_ENTRIES
+            )
+        else:
+            self.answer_cache = None
         
         # Validate setup
         self._validate_setup()
@@ -72,7 +87,7 @@ class HybridQAAgent:
         
         print("✅ Hybrid QA Agent initialized successfully")
     
-    def _query_perplexity(self, question: str) -> Dict[str, Any]:
+    async def _query_perplexity(self, question: str) -> Dict[str, Any]:
         """Get answer from Perplexity"""
         if not self.perplexity_available:
             return {
@@ -82,7 +97,7 @@ class HybridQAAgent:
             }
         
         try:
-            answer = self.perplexity_agent.query_perplexity(question)
+            answer = await self.perplexity_agent.query_perplexity(question)
             
             # Check if the answer contains error messages
             if "❌" in answer or "error" in answer.lower():
@@ -117,7 +132,7 @@ class HybridQAAgent:
                 'error': str(e)
             }
     
-    def _get_rag_context(self, question: str) -> Dict[str, Any]:
+    async def _get_rag_context(self, question: str, query_embedding=None) -> Dict[str, Any]:
         """Get context from RAG knowledge base"""
         if not self.rag_available:
             return {
@@ -128,7 +143,9 @@ class HybridQAAgent:
             }
         
         try:
-            return self.rag_retriever.get_rag_context(question, top_k=3)
+            return await asyncio.to_thread(
+                self.rag_retriever.get_rag_context, question, top_k=3, query_embedding=query_embedding
+            )
         except Exception as e:
             return {
                 'has_context': False,
@@ -137,6 +154,31 @@ class HybridQAAgent:
                 'error': str(e)
             }
     
+    async def _run_source(self, name: str, coro, timeout: float, on_timeout: Dict[str, Any]) -> Dict[str, Any]:
+        """Await one source with its own timeout; a slow source is cancelled instead of failing the request"""
+        start = time.perf_counter()
+        try:
+            result = await asyncio.wait_for(coro, timeout=timeout)
+        except asyncio.TimeoutError:
+            print(f"⏰ {name} timed out after {timeout}s")
+            result = dict(on_timeout, error=f"{name} timed out after {timeout}s")
+        result['latency_ms'] = (time.perf_counter() - start) * 1000
+        print(f"⏱️ {name}: {result['latency_ms']:.0f} ms")
+        return result
+    
+    async def _fetch_sources(self, question: str, query_embedding=None):
+        """Query Perplexity and RAG concurrently; total wait is the slower of the two, not the sum"""
+        return await asyncio.gather(
+            self._run_source(
+                "Perplexity", self._query_perplexity(question), self.perplexity_timeout,
+                {'success': False, 'answer': ""}
+            ),
+            self._run_source(
+                "RAG", self._get_rag_context(question, query_embedding), self.rag_timeout,
+                {'has_context': False, 'context': "", 'best_similarity': 0.0}
+            ),
+        )
+    
     def _evaluate_rag_uniqueness(self, question: str, perplexity_answer: str, rag_context: str) -> Dict[str, Any]:
         """
         Evaluate if RAG provides unique information not found in Perplexity answer
@@ -187,6 +229,15 @@ class HybridQAAgent:
             'reason': f"Uniqueness score: {uniqueness_score:.2f}, Domain knowledge: {has_domain_knowledge}"
         }
     
+    async def _complete(self, prompt: str, model: str = "gemini-1.5-pro") -> str:
+        """Single-prompt completion through the OpenAI-compatible client, with structured call logging"""
+        client = OpenAIChatCompletionClient(model=model, api_key=self.gemini_api_key)
+        with LLMCall("openai_compat", model, request=prompt, prompt_chars=len(prompt)) as call:
+            response = await client.create([UserMessage(content=prompt, source="user")])
+            call.set_response(response.content)
+            call.set_usage(response.usage.prompt_tokens, response.usage.completion_tokens)
+        return response.content
+    
     async def _synthesize_with_llm(self, question: str, perplexity_answer: str, rag_context: str) -> str:
         """Use LLM to synthesize Perplexity + RAG when RAG adds value"""
         if not AUTOGEN_AVAILABLE or not self.gemini_api_key:
@@ -202,11 +253,6 @@ class HybridQAAgent:
 *Note: This is a simple combination. For better synthesis, ensure Gemini API is available.*"""
         
         try:
-            client = OpenAIChatCompletionClient(
-                model="gemini-1.5-pro", 
-                api_key=self.gemini_api_key
-            )
-            
             prompt = f"""You are an expert study abroad consultant. You have two sources of information to answer this question:
 
 QUESTION: {question}
@@ -230,8 +276,7 @@ Your task is to provide ONE comprehensive answer that intelligently combines bot
 
 Combine these sources into one authoritative answer:"""
 
-            response = await client.create([UserMessage(content=prompt, source="user")])
-            return response.content
+            return await self._complete(prompt)
             
         except Exception as e:
             print(f"⚠️ LLM synthesis failed: {e}")
@@ -247,16 +292,48 @@ Combine these sources into one authoritative answer:"""
     
     async def answer_question(self, question: str) -> Dict[str, Any]:
         """
-        Main method to answer questions using the new hybrid approach
+        Main method to answer questions using the new hybrid approach.
+        Near-duplicate questions are served from the semantic answer cache.
         """
         print(f"🤔 Processing question: {question}")
         
-        # Step 1: Get results from BOTH sources simultaneously
+        query_embedding = None
+        topic = self._extract_topic(question)
+        if self.answer_cache:
+            query_embedding = await asyncio.to_thread(self.rag_retriever.embed_query, question)
+            if query_embedding is not None:
+                cached = self.answer_cache.lookup(question, query_embedding, topic=topic)
+                if cached:
+                    print(f"⚡ Answer cache hit (similarity: {cached['cache']['similarity']:.3f}, "
+                          f"cached question: {cached['cache']['cached_question']})")
+                    return cached
+        
+        result = await self._answer_uncached(question, query_embedding)
+        
+        if self.answer_cache and query_embedding is not None and result.get('strategy') != 'error':
+            self.answer_cache.store(question, query_embedding, result, topic=topic)
+        
+        return result
+    
+    def invalidate_cached_answers(self, topic: Optional[str] = None, institution: Optional[str] = None) -> int:
+        """Drop cached answers for a topic / institution (e.g. after its requirements change)"""
+        if not self.answer_cache:
+            return 0
+        removed = self.answer_cache.invalidate(topic=topic, institution=institution)
+        print(f"🧹 Invalidated {removed} cached answers (topic={topic}, institution={institution})")
+        return removed
+    
+    def get_cache_stats(self) -> Dict[str, Any]:
+        """Hit/miss counters and hit rate of the semantic answer cache"""
+        return self.answer_cache.get_stats() if self.answer_cache else {'enabled': False}
+    
+    async def _answer_uncached(self, question: str, query_embedding=None) -> Dict[str, Any]:
+        """Full Perplexity + RAG pipeline; query_embedding is reused for RAG retrieval"""
+        
+        # Step 1: Get results from BOTH sources simultaneously (each with its own timeout)
         print("🔍 Querying both Perplexity and RAG...")
         
-        # Run both queries
-        perplexity_result = self._query_perplexity(question)
-        rag_result = self._get_rag_context(question)
+        perplexity_result, rag_result = await self._fetch_sources(question, query_embedding)
         
         # Step 2: Evaluate results
         perplexity_success = perplexity_result.get('success', False)
@@ -283,9 +360,7 @@ Combine these sources into one authoritative answer:"""
             # Both available - use hybrid approach
             print("🔄 Using hybrid synthesis approach")
             
-            # Extract reference links from Perplexity results
             perplexity_result['question'] = question  # Add question for fallback links
-            reference_links = await self._extract_reference_links(perplexity_result)
             
             # Synthesize the information
             synthesis_prompt = f"""Combine the following information to provide a comprehensive answer to the question: "{question}"
@@ -305,17 +380,17 @@ Instructions:
 
 Provide a well-structured, comprehensive answer:"""
 
-            try:
+            async def synthesize() -> str:
                 if AUTOGEN_AVAILABLE and self.gemini_api_key:
-                    client = OpenAIChatCompletionClient(
-                        model="gemini-1.5-pro", 
-                        api_key=self.gemini_api_key
-                    )
-                    response = await client.create([UserMessage(content=synthesis_prompt, source="user")])
-                    synthesized_answer = response.content
-                else:
-                    # Fallback synthesis
-                    synthesized_answer = f"{perplexity_result['answer']}\n\nAdditional Context: {rag_result['context']}"
+                    return await self._complete(synthesis_prompt)
+                # Fallback synthesis
+                return f"{perplexity_result['answer']}\n\nAdditional Context: {rag_result['context']}"
+
+            try:
+                # Reference links are extracted from Perplexity results while the synthesis call runs
+                reference_links, synthesized_answer = await asyncio.gather(
+                    self._extract_reference_links(perplexity_result), synthesize()
+                )
                 
                 thinking_process = await self._generate_thinking_process(question, 'hybrid_synthesis', synthesized_answer, rag_result['context'])
                 return {
@@ -331,9 +406,10 @@ Provide a well-structured, comprehensive answer:"""
             except Exception as e:
                 print(f"❌ Synthesis failed: {str(e)}")
                 # Fallback to web search only
-                perplexity_result['question'] = question  # Add question for fallback links
-                reference_links = await self._extract_reference_links(perplexity_result)
-                thinking_process = await self._generate_thinking_process(question, 'perplexity_preferred', perplexity_result['answer'])
+                reference_links, thinking_process = await asyncio.gather(
+                    self._extract_reference_links(perplexity_result),
+                    self._generate_thinking_process(question, 'perplexity_preferred', perplexity_result['answer'])
+                )
                 return {
                     'question': question,
                     'answer': perplexity_result['answer'],
@@ -348,8 +424,10 @@ Provide a well-structured, comprehensive answer:"""
             # Only Perplexity available
             print("🌐 Using Perplexity only")
             perplexity_result['question'] = question  # Add question for fallback links
-            reference_links = await self._extract_reference_links(perplexity_result)
-            thinking_process = await self._generate_thinking_process(question, 'perplexity_only', perplexity_result['answer'])
+            reference_links, thinking_process = await asyncio.gather(
+                self._extract_reference_links(perplexity_result),
+                self._generate_thinking_process(question, 'perplexity_only', perplexity_result['answer'])
+            )
             return {
                 'question': question,
                 'answer': perplexity_result['answer'],
@@ -451,11 +529,6 @@ Provide a well-structured, comprehensive answer:"""
             return self._generate_simple_thinking_process(question, strategy)
         
         try:
-            client = OpenAIChatCompletionClient(
-                model="gemini-1.5-pro", 
-                api_key=self.gemini_api_key
-            )
-            
             # Create a context-aware prompt for generating the thinking process
             context_info = ""
             if rag_context:
@@ -482,8 +555,7 @@ INSTRUCTIONS:
 
 Generate a personalized thinking process that explains how you specifically analyzed and answered this question:"""
 
-            response = await client.create([UserMessage(content=prompt, source="user")])
-            return response.content
+            return await self._complete(prompt)
             
         except Exception as e:
             print(f"⚠️ LLM thinking process generation failed: {e}")
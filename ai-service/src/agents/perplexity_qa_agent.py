@@ -1,9 +1,12 @@
 import os
+import sys
 import asyncio
-import requests
 from typing import Any, Dict, List
 from dotenv import load_dotenv
 
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "../../")))
+from src.model_client.perplexity_client import PerplexityAPIError, get_perplexity_client
+
 # For modern AutoGen - using the new agentchat version
 try:
     from autogen_agentchat.agents import AssistantAgent
@@ -24,8 +27,8 @@ class PerplexityQAAgent:
         self.perplexity_api_key = os.getenv("PERPLEXITY_API_KEY")
         self.openai_api_key = os.getenv("OPENAI_API_KEY")
         
-        # Perplexity API endpoint
-        self.perplexity_endpoint = "https://api.perplexity.ai/chat/completions"
+        # Shared pooled Perplexity client
+        self.perplexity_client = get_perplexity_client()
         
         # Validate API keys
         if not self.perplexity_api_key:
@@ -35,17 +38,12 @@ class PerplexityQAAgent:
         
         print("✅ API keys loaded successfully")
     
-    def query_perplexity(self, question: str, model: str = "sonar") -> str:
+    async def query_perplexity(self, question: str, model: str = "sonar") -> str:
         """
         Query the Perplexity API for study abroad information
         Available models: 'sonar', 'sonar-reasoning', 'sonar-deep-research'
         """
         try:
-            headers = {
-                "Authorization": f"Bearer {self.perplexity_api_key}",
-                "Content-Type": "application/json"
-            }
-            
             data = {
                 "model": model,
                 "messages": [
@@ -66,18 +64,8 @@ class PerplexityQAAgent:
             }
             
             print(f"🔍 Querying Perplexity with model: {model}")
-            print(f"🔗 Endpoint: {self.perplexity_endpoint}")
-            
-            response = requests.post(self.perplexity_endpoint, headers=headers, json=data, timeout=30)
-            
-            # Debug information
-            print(f"📊 Response status: {response.status_code}")
-            if response.status_code != 200:
-                print(f"❌ Response content: {response.text}")
-            
-            response.raise_for_status()
             
-            result = response.json()
+            result = await self.perplexity_client.chat_completions(data)
             
             # Extract the main content
             main_content = result["choices"][0]["message"]["content"]
@@ -167,14 +155,10 @@ class PerplexityQAAgent:
             
             return clean_content
             
-        except requests.exceptions.RequestException as e:
+        except PerplexityAPIError as e:
             error_msg = f"❌ Perplexity API error: {str(e)}"
-            if hasattr(e, 'response') and e.response is not None:
-                try:
-                    error_details = e.response.json()
-                    error_msg += f"\n📋 Error details: {error_details}"
-                except:
-                    error_msg += f"\n📋 Raw response: {e.response.text}"
+            if e.body is not None:
+                error_msg += f"\n📋 Error details: {e.body}"
             print(error_msg)
             return error_msg
         except KeyError as e:
@@ -214,7 +198,7 @@ class PerplexityQAAgent:
 
 Here's the latest information from Perplexity:
 
-{self.query_perplexity(question)}
+{await self.query_perplexity(question)}
 
 Now provide a comprehensive response based on this information."""
             )
@@ -231,14 +215,14 @@ Now provide a comprehensive response based on this information."""
         except Exception as e:
             return f"❌ Modern QA session error: {str(e)}"
     
-    def run_simple_qa_session(self, question: str) -> str:
+    async def run_simple_qa_session(self, question: str) -> str:
         """
         Run a simple QA session using just Perplexity
         """
         print("🔍 Running simple Perplexity QA session...")
         
         # Get answer from Perplexity
-        perplexity_answer = self.query_perplexity(question)
+        perplexity_answer = await self.query_perplexity(question)
         
         # Format the response
         formatted_response = f"""🎓 **Study Abroad Q&A Result**
@@ -285,9 +269,9 @@ Now provide a comprehensive response based on this information."""
                     except Exception as e:
                         print(f"⚠️ Modern mode failed: {e}")
                         print("🔄 Falling back to simple mode...")
-                        print(self.run_simple_qa_session(question))
+                        print(await self.run_simple_qa_session(question))
                 else:
-                    print(self.run_simple_qa_session(question))
+                    print(await self.run_simple_qa_session(question))
                 
                 print("="*50)
                 
@@ -297,12 +281,12 @@ Now provide a comprehensive response based on this information."""
             except Exception as e:
                 print(f"❌ Error: {str(e)}")
 
-def test_perplexity_api():
+async def test_perplexity_api():
     """Test Perplexity API connection"""
     try:
         agent = PerplexityQAAgent()
         test_question = "What are the general requirements for studying abroad?"
-        result = agent.query_perplexity(test_question)
+        result = await agent.query_perplexity(test_question)
         print("🧪 **API Test Result:**")
         print(result[:200] + "..." if len(result) > 200 else result)
         
@@ -323,7 +307,7 @@ async def main():
     print("=" * 50)
     
     # Test API first
-    if not test_perplexity_api():
+    if not await test_perplexity_api():
         print("\n❌ Please check your API keys and try again.")
         return
     
@@ -2,18 +2,15 @@ from __future__ import annotations
 
 import uuid
 from abc import ABC
-from typing import Generic, Type, TypeVar
+from typing import Generic, Iterator, Optional, Type, TypeVar
 
 from loguru import logger
-from pydantic import BaseModel, UUID4, Field
+from pydantic import BaseModel, UUID4, Field, PrivateAttr
 from pymongo import errors
 
+from src.domain.change_tracking import diff_documents, payload_size, write_stats
 from src.domain.exceptions import ImproperlyConfigured
-from src.infrastructure.db.mongo import connection
-from src.settings import settings
-
-# Get database instance
-_database = connection.get_database(settings.DATABASE_NAME)
+from src.infrastructure.db.mongo import get_database
 
 T = TypeVar("T", bound="NoSQLBaseDocument")
 
@@ -21,6 +18,9 @@ T = TypeVar("T", bound="NoSQLBaseDocument")
 class NoSQLBaseDocument(BaseModel, Generic[T], ABC):
     id: UUID4 = Field(default_factory=uuid.uuid4)
 
+    # to_mongo() image as last loaded/saved; None until the document is persisted
+    _persisted: Optional[dict] = PrivateAttr(default=None)
+
     def __eq__(self, value: object) -> bool:
         if not isinstance(value, self.__class__):
             return False
@@ -39,7 +39,10 @@ class NoSQLBaseDocument(BaseModel, Generic[T], ABC):
 
         id = data.pop("_id")
 
-        return cls(**dict(data, id=id))
+        instance = cls(**dict(data, id=id))
+        instance._persisted = instance.to_mongo()
+
+        return instance
 
     def to_mongo(self: T, **kwargs) -> dict:
         """Convert "id" (UUID object) into "_id" (str object)."""
@@ -67,9 +70,10 @@ class NoSQLBaseDocument(BaseModel, Generic[T], ABC):
         return dict_
 
     def save(self: T, **kwargs) -> T | None:
-        collection = _database[self.get_collection_name()]
+        collection = get_database()[self.get_collection_name()]
         try:
             collection.insert_one(self.to_mongo(**kwargs))
+            self._persisted = self.to_mongo()
 
             return self
         except errors.WriteError:
@@ -79,7 +83,7 @@ class NoSQLBaseDocument(BaseModel, Generic[T], ABC):
 
     @classmethod
     def get_or_create(cls: Type[T], **filter_options) -> T:
-        collection = _database[cls.get_collection_name()]
+        collection = get_database()[cls.get_collection_name()]
         try:
             instance = collection.find_one(filter_options)
             if instance:
@@ -94,9 +98,50 @@ class NoSQLBaseDocument(BaseModel, Generic[T], ABC):
 
             raise
 
+    def changes(self: T) -> tuple[dict, list[str]]:
+        """($set, $unset) of dotted paths changed since the document was loaded/saved"""
+        if self._persisted is None:
+            return self.to_mongo(), []
+        return diff_documents(self._persisted, self.to_mongo())
+
+    def has_changes(self: T) -> bool:
+        set_fields, unset_fields = self.changes()
+        return bool(set_fields or unset_fields)
+
+    def save_changes(self: T) -> bool:
+        """
+        Persist only the changed paths with update_one($set/$unset). Documents without a
+        snapshot (never loaded from Mongo) are written whole with replace_one.
+        Returns True when a write was sent.
+        """
+        collection = get_database()[self.get_collection_name()]
+        document = self.to_mongo()
+        full_bytes = payload_size(document)
+
+        if self._persisted is None:
+            collection.replace_one({"_id": document["_id"]}, document, upsert=True)
+            write_stats.record("mongo", "full", full_bytes, full_bytes, len(document))
+            self._persisted = document
+            return True
+
+        set_fields, unset_fields = diff_documents(self._persisted, document)
+        if not set_fields and not unset_fields:
+            write_stats.record("mongo", "noop", 0, full_bytes)
+            return False
+
+        update: dict = {}
+        if set_fields:
+            update["$set"] = set_fields
+        if unset_fields:
+            update["$unset"] = {path: "" for path in unset_fields}
+        collection.update_one({"_id": document["_id"]}, update)
+        write_stats.record("mongo", "partial", payload_size(update), full_bytes, len(set_fields) + len(unset_fields))
+        self._persisted = document
+        return True
+
     @classmethod
     def bulk_insert(cls: Type[T], documents: list[T], **kwargs) -> bool:
-        collection = _database[cls.get_collection_name()]
+        collection = get_database()[cls.get_collection_name()]
         try:
             collection.insert_many(doc.to_mongo(**kwargs) for doc in documents)
 
@@ -108,7 +153,7 @@ class NoSQLBaseDocument(BaseModel, Generic[T], ABC):
 
     @classmethod
     def find(cls: Type[T], **filter_options) -> T | None:
-        collection = _database[cls.get_collection_name()]
+        collection = get_database()[cls.get_collection_name()]
         try:
             instance = collection.find_one(filter_options)
             if instance:
@@ -122,7 +167,7 @@ class NoSQLBaseDocument(BaseModel, Generic[T], ABC):
 
     @classmethod
     def bulk_find(cls: Type[T], **filter_options) -> list[T]:
-        collection = _database[cls.get_collection_name()]
+        collection = get_database()[cls.get_collection_name()]
         try:
             instances = collection.find(filter_options)
             return [document for instance in instances if (document := cls.from_mongo(instance)) is not None]
@@ -131,6 +176,31 @@ class NoSQLBaseDocument(BaseModel, Generic[T], ABC):
 
             return []
 
+    @classmethod
+    def bulk_iter(cls: Type[T], batch_size: int = 500, projection: Optional[dict] = None,
+                  **filter_options) -> Iterator[list[T]]:
+        """
+        Stream matching documents in lists of batch_size, fetching one cursor batch at a time.
+        With a projection, fields left out keep their model defaults.
+        """
+        collection = get_database()[cls.get_collection_name()]
+        cursor = collection.find(filter_options, projection=projection, batch_size=batch_size)
+        try:
+            batch: list[T] = []
+            for instance in cursor:
+                batch.append(cls.from_mongo(instance))
+                if len(batch) >= batch_size:
+                    yield batch
+                    batch = []
+            if batch:
+                yield batch
+        except errors.OperationFailure:
+            logger.error("Failed to stream documents")
+
+            raise
+        finally:
+            cursor.close()
+
     @classmethod
     def get_collection_name(cls: Type[T]) -> str:
         if not hasattr(cls, "Settings") or not hasattr(cls.Settings, "name"):
@@ -0,0 +1,78 @@
+"""
+Change tracking for persisted profiles
+Documents remember the image they were loaded/saved with; writes send only what differs
+from it ($set/$unset of dotted paths in Mongo, changed columns / jsonb_set in Postgres).
+Every write is recorded with its payload size next to the size a whole-document rewrite
+would have had, so write amplification is visible in /metrics/llm.
+"""
+
+import json
+import threading
+from typing import Any, Dict, List, Tuple
+
+
+def diff_documents(old: Dict[str, Any], new: Dict[str, Any], prefix: str = "") -> Tuple[Dict[str, Any], List[str]]:
+    """
+    Return ($set, $unset) turning `old` into `new`: nested dicts are compared key by key
+    (dotted paths), anything else (scalars, lists) is replaced as a whole.
+    """
+    set_fields: Dict[str, Any] = {}
+    unset_fields: List[str] = []
+    for key, value in new.items():
+        path = f"{prefix}{key}"
+        if key not in old:
+            set_fields[path] = value
+        elif isinstance(value, dict) and isinstance(old[key], dict):
+            nested_set, nested_unset = diff_documents(old[key], value, f"{path}.")
+            set_fields.update(nested_set)
+            unset_fields.extend(nested_unset)
+        elif value != old[key]:
+            set_fields[path] = value
+    unset_fields.extend(f"{prefix}{key}" for key in old if key not in new)
+    return set_fields, unset_fields
+
+
+def payload_size(payload: Any) -> int:
+    """Approximate wire size of a write payload (JSON bytes)"""
+    return len(json.dumps(payload, default=str, ensure_ascii=False).encode("utf-8"))
+
+
+class WriteStats:
+    """Per-store counters: how much was written vs. what full rewrites would have written"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._stores: Dict[str, Dict[str, int]] = {}
+
+    def record(self, store: str, mode: str, written_bytes: int, full_bytes: int, fields: int = 0):
+        """mode: "partial" (diff write), "full" (no snapshot, whole document) or "noop" (nothing changed)"""
+        with self._lock:
+            stats = self._stores.setdefault(store, {
+                "writes": 0, "partial": 0, "full": 0, "noop": 0,
+                "fields_written": 0, "bytes_written": 0, "full_document_bytes": 0,
+            })
+            stats[mode] += 1
+            if mode != "noop":
+                stats["writes"] += 1
+            stats["fields_written"] += fields
+            stats["bytes_written"] += written_bytes
+            stats["full_document_bytes"] += full_bytes
+
+    def get_stats(self) -> Dict[str, Dict[str, Any]]:
+        with self._lock:
+            result = {}
+            for store, stats in self._stores.items():
+                full = stats["full_document_bytes"]
+                result[store] = {
+                    **stats,
+                    # 1.0 means every write rewrote the whole document
+                    "write_amplification": round(stats["bytes_written"] / full, 3) if full else 0.0,
+                }
+            return result
+
+
+write_stats = WriteStats()
+
+
+def get_write_stats() -> Dict[str, Dict[str, Any]]:
+    return write_stats.get_stats()
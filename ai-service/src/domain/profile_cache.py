@@ -0,0 +1,270 @@
+"""
+Read-through cache for student profiles
+Profiles are keyed by (namespace, user_id) — "pg" for the Postgres StudentDocument, "mongo"
+for the Mongo one — and carry a version stamp taken from the row's updatedAt. Writes go
+through invalidate(); a load that raced with a write can never put the older version back.
+
+Tiers: an in-process LRU in front of an optional shared tier (ProfileCacheBackend), so
+several worker processes on one host can share loaded profiles. Entries expire after
+PROFILE_CACHE_TTL_SECONDS to bound staleness for writes made outside this service.
+"""
+
+import os
+import sqlite3
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from datetime import datetime
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple, Type, TypeVar
+
+from loguru import logger
+from pydantic import BaseModel
+
+from src.settings import settings
+
+M = TypeVar("M", bound=BaseModel)
+
+# loader result: (profile, version) or None when the user has no profile
+Loaded = Optional[Tuple[Any, float]]
+
+
+def version_stamp(updated_at: Any) -> float:
+    """updatedAt (datetime / epoch / None) -> comparable version number"""
+    if updated_at is None:
+        return 0.0
+    if isinstance(updated_at, datetime):
+        return updated_at.timestamp()
+    return float(updated_at)
+
+
+class ProfileCacheBackend(ABC):
+    """Shared tier: stores serialized profiles so other processes can reuse them"""
+
+    @abstractmethod
+    def get(self, key: str) -> Optional[Tuple[str, float, float]]:
+        """Return (payload JSON, version, stored_at) or None"""
+
+    @abstractmethod
+    def set(self, key: str, payload: str, version: float):
+        """Store the payload unless a newer version is already stored"""
+
+    @abstractmethod
+    def delete(self, key: str):
+        ...
+
+
+class SQLiteProfileBackend(ProfileCacheBackend):
+    """Shared tier in a local SQLite file (all workers on the same host)"""
+
+    def __init__(self, path: str):
+        self.path = path
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False, timeout=5)
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS profiles (
+                key TEXT PRIMARY KEY,
+                payload TEXT NOT NULL,
+                version REAL NOT NULL,
+                stored_at REAL NOT NULL
+            )
+            """
+        )
+        self._conn.commit()
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[Tuple[str, float, float]]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT payload, version, stored_at FROM profiles WHERE key = ?", (key,)
+            ).fetchone()
+        return tuple(row) if row else None
+
+    def set(self, key: str, payload: str, version: float):
+        with self._lock:
+            self._conn.execute(
+                """
+                INSERT INTO profiles VALUES (?, ?, ?, ?)
+                ON CONFLICT(key) DO UPDATE SET
+                    payload = excluded.payload, version = excluded.version, stored_at = excluded.stored_at
+                WHERE excluded.version >= profiles.version
+                """,
+                (key, payload, version, time.time()),
+            )
+            self._conn.commit()
+
+    def delete(self, key: str):
+        with self._lock:
+            self._conn.execute("DELETE FROM profiles WHERE key = ?", (key,))
+            self._conn.commit()
+
+
+class ProfileCache:
+    """Thread-safe LRU of loaded profiles with version stamps and an optional shared tier"""
+
+    def __init__(self, max_size: int, ttl_seconds: float = 0, shared: Optional[ProfileCacheBackend] = None):
+        self.max_size = max_size
+        self.ttl_seconds = ttl_seconds
+        self.shared = shared
+        # key -> (profile, version, stored_at)
+        self._entries: "OrderedDict[str, Tuple[Any, float, float]]" = OrderedDict()
+        # Bumped by invalidate(); a load started before the bump must not fill the cache
+        self._generations: Dict[str, int] = {}
+        self._lock = threading.Lock()
+        self.stats = {
+            "hits": 0, "shared_hits": 0, "misses": 0, "fills": 0,
+            "stale_fills_skipped": 0, "invalidations": 0, "evictions": 0, "expired": 0, "shared_errors": 0,
+        }
+
+    @staticmethod
+    def make_key(namespace: str, user_id: str) -> str:
+        return f"{namespace}:{user_id}"
+
+    def _fresh(self, stored_at: float) -> bool:
+        return self.ttl_seconds <= 0 or time.time() - stored_at < self.ttl_seconds
+
+    def get(self, namespace: str, user_id: str, model: Optional[Type[M]] = None) -> Optional[Any]:
+        """Cached profile or None; model is needed to decode entries from the shared tier"""
+        key = self.make_key(namespace, user_id)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                if self._fresh(entry[2]):
+                    self._entries.move_to_end(key)
+                    self.stats["hits"] += 1
+                    return entry[0]
+                del self._entries[key]
+                self.stats["expired"] += 1
+            generation = self._generations.get(key, 0)
+
+        if self.shared is not None and model is not None:
+            try:
+                row = self.shared.get(key)
+            except Exception as e:
+                self.stats["shared_errors"] += 1
+                logger.warning(f"Shared profile cache read failed for {key}: {e}")
+                row = None
+            if row is not None and self._fresh(row[2]):
+                profile = model.model_validate_json(row[0])
+                with self._lock:
+                    if self._generations.get(key, 0) == generation:
+                        self._store(key, profile, row[1], row[2])
+                        self.stats["shared_hits"] += 1
+                        return profile
+                    # invalidate() ran while reading: the row may predate the write, treat as a miss
+                    self.stats["stale_fills_skipped"] += 1
+
+        with self._lock:
+            self.stats["misses"] += 1
+        return None
+
+    def _store(self, key: str, profile: Any, version: float, stored_at: float) -> bool:
+        # caller holds the lock
+        current = self._entries.get(key)
+        if current is not None and current[1] > version:
+            self.stats["stale_fills_skipped"] += 1
+            return False
+        self._entries[key] = (profile, version, stored_at)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+            self.stats["evictions"] += 1
+        return True
+
+    def put(self, namespace: str, user_id: str, profile: Any, version: float,
+            generation: Optional[int] = None):
+        """
+        Store a profile loaded at `version`. Skipped when a newer version is cached or when
+        the key was invalidated after `generation` (from generation()) was taken.
+        """
+        key = self.make_key(namespace, user_id)
+        with self._lock:
+            if generation is not None and self._generations.get(key, 0) != generation:
+                self.stats["stale_fills_skipped"] += 1
+                return
+            if self._store(key, profile, version, time.time()):
+                self.stats["fills"] += 1
+
+        if self.shared is not None and isinstance(profile, BaseModel):
+            try:
+                self.shared.set(key, profile.model_dump_json(), version)
+            except Exception as e:
+                self.stats["shared_errors"] += 1
+                logger.warning(f"Shared profile cache write failed for {key}: {e}")
+
+    def generation(self, namespace: str, user_id: str) -> int:
+        with self._lock:
+            return self._generations.get(self.make_key(namespace, user_id), 0)
+
+    def invalidate(self, namespace: str, user_id: str):
+        """Drop the profile from both tiers; call after every write"""
+        key = self.make_key(namespace, user_id)
+        with self._lock:
+            self._entries.pop(key, None)
+            self._generations[key] = self._generations.get(key, 0) + 1
+            self.stats["invalidations"] += 1
+        if self.shared is not None:
+            try:
+                self.shared.delete(key)
+            except Exception as e:
+                self.stats["shared_errors"] += 1
+                logger.warning(f"Shared profile cache delete failed for {key}: {e}")
+
+    def load(self, namespace: str, user_id: str, model: Type[M], loader: Callable[[], Loaded]) -> Optional[M]:
+        """Read-through: cached profile, else loader() -> (profile, version) which is cached"""
+        profile = self.get(namespace, user_id, model)
+        if profile is not None:
+            return profile
+        generation = self.generation(namespace, user_id)
+        loaded = loader()
+        if loaded is None:
+            return None
+        profile, version = loaded
+        self.put(namespace, user_id, profile, version, generation)
+        return profile
+
+    async def aload(self, namespace: str, user_id: str, model: Type[M],
+                    loader: Callable[[], Awaitable[Loaded]]) -> Optional[M]:
+        """load() with an async loader"""
+        profile = self.get(namespace, user_id, model)
+        if profile is not None:
+            return profile
+        generation = self.generation(namespace, user_id)
+        loaded = await loader()
+        if loaded is None:
+            return None
+        profile, version = loaded
+        self.put(namespace, user_id, profile, version, generation)
+        return profile
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self.stats["hits"] + self.stats["shared_hits"] + self.stats["misses"]
+            hit_rate = (self.stats["hits"] + self.stats["shared_hits"]) / lookups if lookups else 0.0
+            return {
+                **self.stats,
+                "hit_rate": round(hit_rate, 3),
+                "size": len(self._entries),
+                "max_size": self.max_size,
+                "shared_tier": type(self.shared).__name__ if self.shared else None,
+            }
+
+
+_cache: Optional[ProfileCache] = None
+_cache_lock = threading.Lock()
+
+def get_profile_cache() -> ProfileCache:
+    global _cache
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                shared = SQLiteProfileBackend(settings.PROFILE_CACHE_SHARED_PATH) if settings.PROFILE_CACHE_SHARED_PATH else None
+                _cache = ProfileCache(
+                    settings.SESSION_MAX_PROFILES,
+                    ttl_seconds=settings.PROFILE_CACHE_TTL_SECONDS,
+                    shared=shared,
+                )
+    return _cache
@@ -1,17 +1,14 @@
 from __future__ import annotations
 
-from typing import Any, List, Optional
+from datetime import datetime, timezone
+from typing import Any, ClassVar, Iterator, List, Optional
 
 from loguru import logger
 from pydantic import BaseModel
 from pymongo import errors
 
 from src.domain.base.nosql import NoSQLBaseDocument
-from src.infrastructure.db.mongo import connection
-from src.settings import settings
-
-# Get database instance
-_database = connection.get_database(settings.DATABASE_NAME)
+from src.domain.profile_cache import get_profile_cache, version_stamp
 
 
 class Name(BaseModel):
@@ -219,6 +216,27 @@ class StudentDocument(StudentBasicInfoModel, NoSQLBaseDocument["StudentDocument"
     
     class Settings:
         name = "students"
+
+    # Version stamp for profile_cache; set on every write
+    updatedAt: Optional[datetime] = None
+
+    # Namespace of these documents in profile_cache
+    CACHE_NAMESPACE: ClassVar[str] = "mongo"
+
+    def _save_changes(self) -> bool:
+        """Stamp updatedAt and write only the changed fields; no-op when nothing changed"""
+        if not self.has_changes():
+            return self.save_changes()  # records the no-op
+        self.updatedAt = datetime.now(timezone.utc)
+        self.save_changes()
+        self._cache_written()
+        return True
+
+    def _cache_written(self):
+        """Invalidate cached copies after a write and cache this (now current) document"""
+        cache = get_profile_cache()
+        cache.invalidate(self.CACHE_NAMESPACE, self.user_id)
+        cache.put(self.CACHE_NAMESPACE, self.user_id, self, version_stamp(self.updatedAt))
     
     @classmethod
     def find_by_user_id(cls, user_id: str) -> "StudentDocument | None":
@@ -236,22 +254,35 @@ class StudentDocument(StudentBasicInfoModel, NoSQLBaseDocument["StudentDocument"
                 if hasattr(existing_student, key):
                     setattr(existing_student, key, value)
             
-            # Update in database
-            collection = _database[cls.get_collection_name()]
-            collection.replace_one(
-                {"user_id": user_id}, 
-                existing_student.to_mongo()
-            )
+            # Update in database (changed fields only)
+            existing_student._save_changes()
             return existing_student
         else:
             # Create new student
-            new_student = cls(user_id=user_id, **student_data)
-            return new_student.save()
+            new_student = cls(user_id=user_id, updatedAt=datetime.now(timezone.utc), **student_data)
+            saved = new_student.save()
+            if saved:
+                saved._cache_written()
+            return saved
     
     @classmethod
     def get_all_students(cls) -> list["StudentDocument"]:
-        """Get all student profiles."""
+        """Get all student profiles (loads everything; batch jobs should use iter_students)."""
         return cls.bulk_find()
+
+    @classmethod
+    def iter_students(cls, batch_size: int = 500, fields: list[str] | None = None,
+                      **filter_options) -> Iterator[list["StudentDocument"]]:
+        """
+        Stream student profiles in batches with bounded memory.
+
+        Args:
+            batch_size: Documents per yielded list (and per Mongo cursor batch)
+            fields: Top-level fields to fetch (user_id is always included); None fetches everything
+            **filter_options: Mongo filter; nested fields via **{"applicationDetails.degreeType": "Master"}
+        """
+        projection = {field: 1 for field in ["user_id", "updatedAt", *fields]} if fields else None
+        return cls.bulk_iter(batch_size=batch_size, projection=projection, **filter_options)
     
     def update_basic_info(self, **basic_info_data) -> "StudentDocument | None":
         """Update basic information for this student."""
@@ -259,13 +290,9 @@ class StudentDocument(StudentBasicInfoModel, NoSQLBaseDocument["StudentDocument"
             if hasattr(self.basicInformation, key):
                 setattr(self.basicInformation, key, value)
         
-        # Save to database
-        collection = _database[self.get_collection_name()]
+        # Save to database (changed fields only)
         try:
-            collection.replace_one(
-                {"user_id": self.user_id}, 
-                self.to_mongo()
-            )
+            self._save_changes()
             return self
         except errors.WriteError:
             logger.exception("Failed to update student basic information.")
@@ -301,12 +328,8 @@ class StudentDocument(StudentBasicInfoModel, NoSQLBaseDocument["StudentDocument"
             if hasattr(self, field_name):
                 setattr(self, field_name, field_value)
         
-        # Save to database
-        collection = _database[self.get_collection_name()]
-        collection.replace_one(
-            {"user_id": self.user_id}, 
-            self.to_mongo()
-        )
+        # Save to database (changed fields only)
+        self._save_changes()
         return self
 
 
@@ -1,15 +1,20 @@
 from __future__ import annotations
 
-from typing import Any, Dict, List, Optional
+from datetime import datetime
+from typing import Any, Dict, Iterator, List, NamedTuple, Optional, Tuple
 import json
 import uuid
 
 from loguru import logger
-from pydantic import BaseModel
-from sqlalchemy import text
+from pydantic import BaseModel, PrivateAttr
+from sqlalchemy import TextClause, text
 from sqlalchemy.exc import SQLAlchemyError
 
+from src.domain.change_tracking import payload_size, write_stats
+
+from src.domain.profile_cache import get_profile_cache, version_stamp
 from src.infrastructure.db.postgres import postgres_connector
+from src.infrastructure.db.postgres_async import async_postgres_connector
 
 # 保持原有的 Pydantic 模型结构用于数据验证和类型安全
 class Name(BaseModel):
@@ -75,6 +80,122 @@ class PersonalityProfile(BaseModel):
     strengths: str = ""
     interests: str = ""
 
+
+# 同步与异步路径共用的 SQL
+_PROFILE_COLUMNS = """
+    SELECT
+        u.id, u.email, u.name, up.id AS profile_id,
+        up.phone, up.wechat, up."birthDate", up."currentEducation",
+        up.gpa, up.major, up."graduationDate", up.toefl, up.ielts,
+        up.gre, up.gmat, up.experiences, up.goals, up.nationality,
+        up."targetDegreeType", up."targetCountries", up."intendedMajor",
+        up."applicationYear", up."applicationTerm",
+        GREATEST(u."updatedAt", up."updatedAt") AS version
+"""
+
+_PROFILE_SELECT = _PROFILE_COLUMNS + """
+    FROM users u
+    LEFT JOIN user_profiles up ON u.id = up."userId"
+"""
+
+_FIND_PROFILE_SQL = text(_PROFILE_SELECT + """
+    WHERE u.id = :user_id
+""")
+
+# 批量读取的过滤条件：均可走索引（targetCountries 为 GIN，其余为 B-tree）
+_BULK_FILTERS = {
+    "since": 'GREATEST(u."updatedAt", up."updatedAt") >= :since',
+    "target_country": 'up."targetCountries" @> CAST(:target_country AS jsonb)',
+    "degree_type": 'up."targetDegreeType" = :degree_type',
+    "intended_major": 'up."intendedMajor" = :intended_major',
+}
+
+_UPSERT_USER_SQL = text("""
+    INSERT INTO users (id, email, name, password, "createdAt", "updatedAt")
+    VALUES (:user_id, :email, :name, 'temp_password', NOW(), NOW())
+    ON CONFLICT (id) DO UPDATE SET
+        email = EXCLUDED.email,
+        name = EXCLUDED.name,
+        "updatedAt" = NOW()
+""")
+
+# 写入后直接返回与 _FIND_PROFILE_SQL 相同的列，无需再查询一次
+_UPSERT_PROFILE_SQL = text("""
+    WITH up AS (
+        INSERT INTO user_profiles (
+            id, "userId", phone, nationality, "currentEducation",
+            gpa, major, experiences, goals,
+            "targetDegreeType", "targetCountries", "intendedMajor", "applicationYear", "applicationTerm",
+            "createdAt", "updatedAt"
+        )
+        VALUES (
+            :profile_id, :user_id, :phone, :nationality, :currentEducation,
+            :gpa, :major, CAST(:experiences AS jsonb), :goals,
+            :targetDegreeType, CAST(:targetCountries AS jsonb), :intendedMajor, :applicationYear, :applicationTerm,
+            NOW(), NOW()
+        )
+        ON CONFLICT ("userId") DO UPDATE SET
+            phone = EXCLUDED.phone,
+            nationality = EXCLUDED.nationality,
+            "currentEducation" = EXCLUDED."currentEducation",
+            gpa = EXCLUDED.gpa,
+            major = EXCLUDED.major,
+            experiences = EXCLUDED.experiences,
+            goals = EXCLUDED.goals,
+            -- 前端/后端也会写这些列：未提供时保留原值；
+            -- 目标国家不覆盖其它来源写入的国家，而是把本次的国家移到列表首位（读取时取首位）
+            "targetDegreeType" = COALESCE(EXCLUDED."targetDegreeType", user_profiles."targetDegreeType"),
+            "intendedMajor" = COALESCE(EXCLUDED."intendedMajor", user_profiles."intendedMajor"),
+            "applicationYear" = COALESCE(EXCLUDED."applicationYear", user_profiles."applicationYear"),
+            "applicationTerm" = COALESCE(EXCLUDED."applicationTerm", user_profiles."applicationTerm"),
+            "targetCountries" = CASE
+                WHEN EXCLUDED."targetCountries" IS NULL THEN user_profiles."targetCountries"
+                ELSE EXCLUDED."targetCountries"
+                    || (COALESCE(user_profiles."targetCountries", '[]'::jsonb) - (EXCLUDED."targetCountries" ->> 0))
+            END,
+            "updatedAt" = NOW()
+        RETURNING *
+    )
+""" + _PROFILE_COLUMNS + """
+    FROM users u
+    JOIN up ON u.id = up."userId"
+""")
+
+# 增量更新时可单独写入的 user_profiles 列（其余字段在 experiences JSONB 中）
+_PROFILE_UPDATE_COLUMNS = ("phone", "nationality", "currentEducation", "gpa", "major", "goals")
+
+# 从 experiences 提升出来的热点列（用于过滤/分析，有索引）；值为空时不覆盖已有值
+_PROMOTED_COLUMNS = ("targetDegreeType", "intendedMajor", "applicationYear", "applicationTerm")
+
+
+class _WritePlan(NamedTuple):
+    """一次写入要执行的语句（最后一条返回完整记录）及写放大统计"""
+    statements: List[Tuple[TextClause, Dict[str, Any]]]
+    mode: str  # full | partial | noop
+    written_bytes: int
+    full_bytes: int
+    fields: int
+
+
+def _parse_json(value, default):
+    """解析 JSONB 字段（psycopg2 已解码为 dict/list，asyncpg 返回字符串）"""
+    if not value:
+        return default
+    try:
+        return json.loads(value) if isinstance(value, str) else value
+    except (json.JSONDecodeError, TypeError):
+        return default
+
+
+def _target_countries(value) -> List[str]:
+    countries = _parse_json(value, [])
+    return [country for country in countries if isinstance(country, str)] if isinstance(countries, list) else []
+
+
+# profile_cache 中的命名空间
+CACHE_NAMESPACE = "pg"
+
+
 class StudentDocument(BaseModel):
     user_id: str
     basicInformation: BasicInformation = BasicInformation()
@@ -84,107 +205,257 @@ class StudentDocument(BaseModel):
     studyAbroadPreparation: StudyAbroadPreparation = StudyAbroadPreparation()
     personalityProfile: PersonalityProfile = PersonalityProfile()
 
+    # 读取时的数据库记录映像（列值 + experiences），用于写入时只更新变化的部分
+    _persisted: Optional[Dict[str, Any]] = PrivateAttr(default=None)
+
+    @classmethod
+    def _from_row(cls, user_id: str, result) -> StudentDocument:
+        """将数据库记录转换为 StudentDocument"""
+        experiences = _parse_json(result.experiences, {})
+        target_countries = _target_countries(result.targetCountries)
+
+        # 从 experiences 中提取结构化数据
+        career_dev = experiences.get('career', {})
+        study_abroad = experiences.get('studyAbroad', {})
+        personality = experiences.get('personality', {})
+
+        # 构建学生档案
+        student_profile = cls(
+            user_id=user_id,
+            basicInformation=BasicInformation(
+                name=Name(
+                    firstName=result.name.split(' ')[0] if result.name else "",
+                    lastName=' '.join(result.name.split(' ')[1:]) if result.name and len(result.name.split(' ')) > 1 else ""
+                ),
+                contactInformation=ContactInformation(
+                    email=result.email or "",
+                    phoneNumber=PhoneNumber(
+                        countryCode="+1",  # 默认值
+                        number=result.phone or ""
+                    )
+                ),
+                nationality=result.nationality or ""
+            ),
+            # 优先读取提升出来的列，旧数据回退到 experiences
+            applicationDetails=ApplicationDetails(
+                degreeType=result.targetDegreeType or experiences.get('degreeType', ''),
+                intendedMajor=result.intendedMajor or result.major or "",
+                targetCountry=target_countries[0] if target_countries else experiences.get('targetCountry', ''),
+                applicationYear=result.applicationYear or experiences.get('applicationYear', ''),
+                applicationTerm=result.applicationTerm or experiences.get('applicationTerm', '')
+            ),
+            educationBackground=EducationBackground(
+                highestDegree=result.currentEducation or "",
+                currentInstitution=CurrentInstitution(
+                    name=experiences.get('institution', ''),
+                    type="University"  # 默认值
+                ),
+                major=result.major or "",
+                gpa=Gpa(
+                    average=str(result.gpa or ""),
+                    lastYear=""  # PostgreSQL 中没有这个字段
+                )
+            ),
+            careerDevelopment=CareerDevelopment(
+                careerPath=career_dev.get('careerPath', ''),
+                futureCareerPlan=career_dev.get('futureCareerPlan', ''),
+                graduateStudyPlan=career_dev.get('graduateStudyPlan', ''),
+                hasWorkExperience=career_dev.get('hasWorkExperience', False)
+            ),
+            studyAbroadPreparation=StudyAbroadPreparation(
+                internationalDegree=InternationalDegree(
+                    desiredInstitution=study_abroad.get('desiredInstitution', ''),
+                    desiredProgram=study_abroad.get('desiredProgram', '')
+                ),
+                lifestylePreferences=LifestylePreferences(
+                    preferredCityType=study_abroad.get('preferredCityType', []),
+                    preferredEnvironment=study_abroad.get('preferredEnvironment', []),
+                    preferredGeography=study_abroad.get('preferredGeography', []),
+                    preferredLifestyle=study_abroad.get('preferredLifestyle', [])
+                )
+            ),
+            personalityProfile=PersonalityProfile(
+                mbtiType=personality.get('mbtiType', ''),
+                strengths=personality.get('strengths', ''),
+                interests=personality.get('interests', '')
+            )
+        )
+        student_profile._persisted = {
+            'has_profile': result.profile_id is not None,
+            'email': result.email,
+            'name': result.name,
+            **{column: getattr(result, column) for column in _PROFILE_UPDATE_COLUMNS + _PROMOTED_COLUMNS},
+            'targetCountries': target_countries,
+            'experiences': experiences,
+        }
+        return student_profile
+
+    @staticmethod
+    def _upsert_params(
+        user_id: str,
+        basicInformation: Optional[BasicInformation],
+        applicationDetails: Optional[ApplicationDetails],
+        educationBackground: Optional[EducationBackground],
+        careerDevelopment: Optional[CareerDevelopment],
+        studyAbroadPreparation: Optional[StudyAbroadPreparation],
+        personalityProfile: Optional[PersonalityProfile],
+    ) -> tuple[Optional[Dict[str, Any]], Dict[str, Any]]:
+        """返回 (users 表参数或 None, user_profiles 表参数)"""
+        # 构建 experiences JSON 数据
+        experiences = {
+            'career': careerDevelopment.dict() if careerDevelopment else {},
+            'studyAbroad': studyAbroadPreparation.dict() if studyAbroadPreparation else {},
+            'personality': personalityProfile.dict() if personalityProfile else {},
+            'degreeType': applicationDetails.degreeType if applicationDetails else '',
+            'targetCountry': applicationDetails.targetCountry if applicationDetails else '',
+            'applicationYear': applicationDetails.applicationYear if applicationDetails else '',
+            'applicationTerm': applicationDetails.applicationTerm if applicationDetails else '',
+            'institution': educationBackground.currentInstitution.name if educationBackground else ''
+        }
+
+        user_params = None
+        if basicInformation:
+            full_name = f"{basicInformation.name.firstName} {basicInformation.name.lastName}".strip()
+            user_params = {
+                'user_id': user_id,
+                'email': basicInformation.contactInformation.email,
+                'name': full_name
+            }
+
+        profile_params = {
+            'profile_id': str(uuid.uuid4()),
+            'user_id': user_id,
+            'phone': basicInformation.contactInformation.phoneNumber.number if basicInformation else None,
+            'nationality': basicInformation.nationality if basicInformation else None,
+            'currentEducation': educationBackground.highestDegree if educationBackground else None,
+            'gpa': float(educationBackground.gpa.average) if educationBackground and educationBackground.gpa.average else None,
+            'major': educationBackground.major if educationBackground else None,
+            'experiences': experiences,
+            'goals': careerDevelopment.futureCareerPlan if careerDevelopment else None,
+            # 热点列：空值记为 None（不覆盖已有值）
+            'targetDegreeType': (applicationDetails.degreeType or None) if applicationDetails else None,
+            'intendedMajor': (applicationDetails.intendedMajor or None) if applicationDetails else None,
+            'applicationYear': (applicationDetails.applicationYear or None) if applicationDetails else None,
+            'applicationTerm': (applicationDetails.applicationTerm or None) if applicationDetails else None,
+            'targetCountries': [applicationDetails.targetCountry] if applicationDetails and applicationDetails.targetCountry else None,
+        }
+        return user_params, profile_params
+
+    @staticmethod
+    def _plan_write(
+        user_id: str,
+        existing: Optional[StudentDocument],
+        user_params: Optional[Dict[str, Any]],
+        profile_params: Dict[str, Any],
+    ) -> _WritePlan:
+        """
+        已有档案（且带有读取时的记录映像）时只写变化的列，experiences 按顶层键 jsonb_set；
+        否则整行 upsert。
+        """
+        full_bytes = payload_size({**(user_params or {}), **profile_params})
+        image = existing._persisted if existing is not None else None
+
+        if not image or not image['has_profile']:
+            statements = [(_UPSERT_USER_SQL, user_params)] if user_params else []
+            statements.append((_UPSERT_PROFILE_SQL, {
+                **profile_params,
+                'experiences': json.dumps(profile_params['experiences']),
+                'targetCountries': json.dumps(profile_params['targetCountries']) if profile_params['targetCountries'] else None,
+            }))
+            fields = len(profile_params) + len(user_params or {})
+            return _WritePlan(statements, 'full', full_bytes, full_bytes, fields)
+
+        user_changes = {
+            column: user_params[column] for column in ('email', 'name')
+            if user_params and user_params[column] != image[column]
+        }
+        column_changes = {
+            column: profile_params[column] for column in _PROFILE_UPDATE_COLUMNS
+            if profile_params[column] != image[column]
+        }
+        column_changes.update({
+            column: profile_params[column] for column in _PROMOTED_COLUMNS
+            if profile_params[column] is not None and profile_params[column] != image[column]
+        })
+        # 本次的目标国家不在首位时才需要写（读取时以首位为准）
+        target_country = (profile_params['targetCountries'] or [None])[0]
+        move_country = target_country is not None and image['targetCountries'][:1] != [target_country]
+        experience_changes = {
+            key: value for key, value in profile_params['experiences'].items()
+            if image['experiences'].get(key) != value
+        }
+        if not (user_changes or column_changes or move_country or experience_changes):
+            return _WritePlan([], 'noop', 0, full_bytes, 0)
+
+        statements = []
+        if user_changes:
+            assignments = ", ".join(f'"{column}" = :{column}' for column in user_changes)
+            statements.append((
+                text(f'UPDATE users SET {assignments}, "updatedAt" = NOW() WHERE id = :user_id'),
+                {**user_changes, 'user_id': user_id},
+            ))
+
+        # 列名来自固定白名单，值全部通过绑定参数传入
+        assignments = [f'"{column}" = :{column}' for column in column_changes]
+        profile_update_params: Dict[str, Any] = {**column_changes, 'user_id': user_id}
+        if move_country:
+            # 移到首位，保留前端写入的其它国家
+            assignments.append(
+                "\"targetCountries\" = CAST(:targetCountries AS jsonb)"
+                " || (COALESCE(\"targetCountries\", '[]'::jsonb) - CAST(:targetCountry AS text))"
+            )
+            profile_update_params['targetCountries'] = json.dumps([target_country])
+            profile_update_params['targetCountry'] = target_country
+        if experience_changes:
+            expression = "COALESCE(experiences, '{}'::jsonb)"
+            for index, (key, value) in enumerate(experience_changes.items()):
+                expression = f"jsonb_set({expression}, ARRAY[:exp_key_{index}], CAST(:exp_value_{index} AS jsonb))"
+                profile_update_params[f'exp_key_{index}'] = key
+                profile_update_params[f'exp_value_{index}'] = json.dumps(value)
+            assignments.append(f"experiences = {expression}")
+        assignments.append('"updatedAt" = NOW()')
+
+        statements.append((text(f"""
+            WITH up AS (
+                UPDATE user_profiles SET {", ".join(assignments)}
+                WHERE "userId" = :user_id
+                RETURNING *
+            )
+        """ + _PROFILE_COLUMNS + """
+            FROM users u
+            JOIN up ON u.id = up."userId"
+        """), profile_update_params))
+
+        written_bytes = payload_size({**user_changes, **column_changes, **experience_changes,
+                                      'targetCountries': [target_country] if move_country else []})
+        fields = len(user_changes) + len(column_changes) + move_country + len(experience_changes)
+        return _WritePlan(statements, 'partial', written_bytes, full_bytes, fields)
+
     @classmethod
     def find_by_user_id(cls, user_id: str) -> Optional[StudentDocument]:
-        """根据用户 ID 查找用户档案"""
+        """根据用户 ID 查找用户档案（先查 profile_cache；异步处理器请使用 afind_by_user_id）"""
+        return get_profile_cache().load(CACHE_NAMESPACE, user_id, cls, lambda: cls._load(user_id))
+
+    @classmethod
+    async def afind_by_user_id(cls, user_id: str) -> Optional[StudentDocument]:
+        """根据用户 ID 查找用户档案（先查 profile_cache，未命中时走异步连接池，不阻塞事件循环）"""
+        return await get_profile_cache().aload(CACHE_NAMESPACE, user_id, cls, lambda: cls._aload(user_id))
+
+    @classmethod
+    def _load(cls, user_id: str) -> Optional[tuple[StudentDocument, float]]:
+        """从数据库读取档案，返回 (档案, 版本号)"""
         try:
             session = postgres_connector.get_session()
 
-            # 查询用户基本信息和档案
-            query = text("""
-                SELECT
-                    u.id, u.email, u.name,
-                    up.phone, up.wechat, up."birthDate", up."currentEducation",
-                    up.gpa, up.major, up."graduationDate", up.toefl, up.ielts,
-                    up.gre, up.gmat, up.experiences, up.goals, up.nationality
-                FROM users u
-                LEFT JOIN user_profiles up ON u.id = up."userId"
-                WHERE u.id = :user_id
-            """)
-
-            result = session.execute(query, {"user_id": user_id}).fetchone()
+            result = session.execute(_FIND_PROFILE_SQL, {"user_id": user_id}).fetchone()
 
             if not result:
                 logger.info(f"No user profile found for user_id: {user_id}")
                 return None
 
-            # 将数据库记录转换为 StudentDocument
-            # 解析 experiences JSON 字段
-            experiences = {}
-            if result.experiences:
-                try:
-                    experiences = json.loads(result.experiences) if isinstance(result.experiences, str) else result.experiences
-                except (json.JSONDecodeError, TypeError):
-                    experiences = {}
-
-            # 从 experiences 中提取结构化数据
-            career_dev = experiences.get('career', {})
-            study_abroad = experiences.get('studyAbroad', {})
-            personality = experiences.get('personality', {})
-
-            # 构建学生档案
-            student_profile = StudentDocument(
-                user_id=user_id,
-                basicInformation=BasicInformation(
-                    name=Name(
-                        firstName=result.name.split(' ')[0] if result.name else "",
-                        lastName=' '.join(result.name.split(' ')[1:]) if result.name and len(result.name.split(' ')) > 1 else ""
-                    ),
-                    contactInformation=ContactInformation(
-                        email=result.email or "",
-                        phoneNumber=PhoneNumber(
-                            countryCode="+1",  # 默认值
-                            number=result.phone or ""
-                        )
-                    ),
-                    nationality=result.nationality or ""
-                ),
-                applicationDetails=ApplicationDetails(
-                    degreeType=experiences.get('degreeType', ''),
-                    intendedMajor=result.major or "",
-                    targetCountry=experiences.get('targetCountry', ''),
-                    applicationYear=experiences.get('applicationYear', ''),
-                    applicationTerm=experiences.get('applicationTerm', '')
-                ),
-                educationBackground=EducationBackground(
-                    highestDegree=result.currentEducation or "",
-                    currentInstitution=CurrentInstitution(
-                        name=experiences.get('institution', ''),
-                        type="University"  # 默认值
-                    ),
-                    major=result.major or "",
-                    gpa=Gpa(
-                        average=str(result.gpa or ""),
-                        lastYear=""  # PostgreSQL 中没有这个字段
-                    )
-                ),
-                careerDevelopment=CareerDevelopment(
-                    careerPath=career_dev.get('careerPath', ''),
-                    futureCareerPlan=career_dev.get('futureCareerPlan', ''),
-                    graduateStudyPlan=career_dev.get('graduateStudyPlan', ''),
-                    hasWorkExperience=career_dev.get('hasWorkExperience', False)
-                ),
-                studyAbroadPreparation=StudyAbroadPreparation(
-                    internationalDegree=InternationalDegree(
-                        desiredInstitution=study_abroad.get('desiredInstitution', ''),
-                        desiredProgram=study_abroad.get('desiredProgram', '')
-                    ),
-                    lifestylePreferences=LifestylePreferences(
-                        preferredCityType=study_abroad.get('preferredCityType', []),
-                        preferredEnvironment=study_abroad.get('preferredEnvironment', []),
-                        preferredGeography=study_abroad.get('preferredGeography', []),
-                        preferredLifestyle=study_abroad.get('preferredLifestyle', [])
-                    )
-                ),
-                personalityProfile=PersonalityProfile(
-                    mbtiType=personality.get('mbtiType', ''),
-                    strengths=personality.get('strengths', ''),
-                    interests=personality.get('interests', '')
-                )
-            )
-
+            student_profile = cls._from_row(user_id, result)
             logger.info(f"Successfully found user profile for: {user_id}")
-            return student_profile
+            return student_profile, version_stamp(result.version)
 
         except SQLAlchemyError as e:
             logger.error(f"Database error when finding user {user_id}: {e}")
@@ -196,6 +467,68 @@ class StudentDocument(BaseModel):
             if 'session' in locals():
                 session.close()
 
+    @classmethod
+    async def _aload(cls, user_id: str) -> Optional[tuple[StudentDocument, float]]:
+        """_load() 的异步版本"""
+        try:
+            async with async_postgres_connector.get_session() as session:
+                result = (await session.execute(_FIND_PROFILE_SQL, {"user_id": user_id})).fetchone()
+
+            if not result:
+                logger.info(f"No user profile found for user_id: {user_id}")
+                return None
+
+            student_profile = cls._from_row(user_id, result)
+            logger.info(f"Successfully found user profile for: {user_id}")
+            return student_profile, version_stamp(result.version)
+
+        except SQLAlchemyError as e:
+            logger.error(f"Database error when finding user {user_id}: {e}")
+            return None
+        except Exception as e:
+            logger.error(f"Error finding user {user_id}: {e}")
+            return None
+
+    @classmethod
+    def iter_profiles(
+        cls,
+        batch_size: int = 500,
+        since: Optional[datetime] = None,
+        target_country: Optional[str] = None,
+        degree_type: Optional[str] = None,
+        intended_major: Optional[str] = None,
+    ) -> Iterator[List[StudentDocument]]:
+        """
+        批量读取档案（供离线评分/分析脚本使用），每次产出 batch_size 个。
+        使用服务端游标（yield_per），内存占用与批大小相关而与总行数无关；
+        过滤条件走 user_profiles 上的索引（如 target_country="UK", intended_major="Business"）；
+        不写入 profile_cache，避免批处理把在线用户的缓存挤出。
+        """
+        params: Dict[str, Any] = {
+            "since": since,
+            "target_country": json.dumps([target_country]) if target_country else None,
+            "degree_type": degree_type,
+            "intended_major": intended_major,
+        }
+        params = {name: value for name, value in params.items() if value is not None}
+        where = " AND ".join(_BULK_FILTERS[name] for name in params)
+        query = text(_PROFILE_SELECT + (f" WHERE {where}" if where else "") + " ORDER BY u.id")
+        with postgres_connector.get_engine().connect() as conn:
+            result = conn.execution_options(yield_per=batch_size).execute(query, params)
+            for rows in result.partitions():
+                yield [cls._from_row(row.id, row) for row in rows]
+
+    @classmethod
+    def _cache_written(cls, user_id: str, result) -> Optional[StudentDocument]:
+        """写入已提交：使旧缓存失效，并用写入语句返回的记录重新填充"""
+        cache = get_profile_cache()
+        cache.invalidate(CACHE_NAMESPACE, user_id)
+        if not result:
+            return None
+        student_profile = cls._from_row(user_id, result)
+        cache.put(CACHE_NAMESPACE, user_id, student_profile, version_stamp(result.version))
+        return student_profile
+
     @classmethod
     def create_or_update_student(
         cls,
@@ -209,77 +542,30 @@ class StudentDocument(BaseModel):
     ) -> Optional[StudentDocument]:
         """创建或更新学生档案"""
         try:
+            user_params, profile_params = cls._upsert_params(
+                user_id, basicInformation, applicationDetails, educationBackground,
+                careerDevelopment, studyAbroadPreparation, personalityProfile,
+            )
+            existing = cls.find_by_user_id(user_id)
+            plan = cls._plan_write(user_id, existing, user_params, profile_params)
+            if not plan.statements:
+                write_stats.record("pg", "noop", 0, plan.full_bytes)
+                return existing
+
             session = postgres_connector.get_session()
             session.begin()
 
-            # 构建 experiences JSON 数据
-            experiences = {
-                'career': careerDevelopment.dict() if careerDevelopment else {},
-                'studyAbroad': studyAbroadPreparation.dict() if studyAbroadPreparation else {},
-                'personality': personalityProfile.dict() if personalityProfile else {},
-                'degreeType': applicationDetails.degreeType if applicationDetails else '',
-                'targetCountry': applicationDetails.targetCountry if applicationDetails else '',
-                'applicationYear': applicationDetails.applicationYear if applicationDetails else '',
-                'applicationTerm': applicationDetails.applicationTerm if applicationDetails else '',
-                'institution': educationBackground.currentInstitution.name if educationBackground else ''
-            }
-
-            # 更新或创建用户基本信息
-            if basicInformation:
-                full_name = f"{basicInformation.name.firstName} {basicInformation.name.lastName}".strip()
-                user_query = text("""
-                    INSERT INTO users (id, email, name, password, "createdAt", "updatedAt")
-                    VALUES (:user_id, :email, :name, 'temp_password', NOW(), NOW())
-                    ON CONFLICT (id) DO UPDATE SET
-                        email = EXCLUDED.email,
-                        name = EXCLUDED.name,
-                        "updatedAt" = NOW()
-                """)
-
-                session.execute(user_query, {
-                    'user_id': user_id,
-                    'email': basicInformation.contactInformation.email,
-                    'name': full_name
-                })
-
-            # 更新或创建用户档案
-            profile_query = text("""
-                INSERT INTO user_profiles (
-                    id, "userId", phone, nationality, "currentEducation",
-                    gpa, major, experiences, goals, "createdAt", "updatedAt"
-                )
-                VALUES (
-                    :profile_id, :user_id, :phone, :nationality, :currentEducation,
-                    :gpa, :major, :experiences, :goals, NOW(), NOW()
-                )
-                ON CONFLICT ("userId") DO UPDATE SET
-                    phone = EXCLUDED.phone,
-                    nationality = EXCLUDED.nationality,
-                    "currentEducation" = EXCLUDED."currentEducation",
-                    gpa = EXCLUDED.gpa,
-                    major = EXCLUDED.major,
-                    experiences = EXCLUDED.experiences,
-                    goals = EXCLUDED.goals,
-                    "updatedAt" = NOW()
-            """)
-
-            session.execute(profile_query, {
-                'profile_id': str(uuid.uuid4()),
-                'user_id': user_id,
-                'phone': basicInformation.contactInformation.phoneNumber.number if basicInformation else None,
-                'nationality': basicInformation.nationality if basicInformation else None,
-                'currentEducation': educationBackground.highestDegree if educationBackground else None,
-                'gpa': float(educationBackground.gpa.average) if educationBackground and educationBackground.gpa.average else None,
-                'major': educationBackground.major if educationBackground else None,
-                'experiences': json.dumps(experiences),
-                'goals': careerDevelopment.futureCareerPlan if careerDevelopment else None
-            })
+            # 更新或创建用户基本信息和档案（最后一条语句返回写入后的完整记录）
+            for statement, params in plan.statements:
+                result = session.execute(statement, params)
+            result = result.fetchone()
 
             session.commit()
-            logger.info(f"Successfully created/updated user profile for: {user_id}")
+            write_stats.record("pg", plan.mode, plan.written_bytes, plan.full_bytes, plan.fields)
+            logger.info(f"Successfully created/updated user profile for: {user_id} ({plan.mode}, {plan.fields} fields)")
 
             # 返回完整的学生档案
-            return cls.find_by_user_id(user_id)
+            return cls._cache_written(user_id, result) or cls.find_by_user_id(user_id)
 
         except SQLAlchemyError as e:
             if 'session' in locals():
@@ -293,4 +579,44 @@ class StudentDocument(BaseModel):
             return None
         finally:
             if 'session' in locals():
-                session.close()
\ No newline at end of file
+                session.close()
+
+    @classmethod
+    async def acreate_or_update_student(
+        cls,
+        user_id: str,
+        basicInformation: Optional[BasicInformation] = None,
+        applicationDetails: Optional[ApplicationDetails] = None,
+        educationBackground: Optional[EducationBackground] = None,
+        careerDevelopment: Optional[CareerDevelopment] = None,
+        studyAbroadPreparation: Optional[StudyAbroadPreparation] = None,
+        personalityProfile: Optional[PersonalityProfile] = None,
+    ) -> Optional[StudentDocument]:
+        """创建或更新学生档案（异步）"""
+        try:
+            user_params, profile_params = cls._upsert_params(
+                user_id, basicInformation, applicationDetails, educationBackground,
+                careerDevelopment, studyAbroadPreparation, personalityProfile,
+            )
+            existing = await cls.afind_by_user_id(user_id)
+            plan = cls._plan_write(user_id, existing, user_params, profile_params)
+            if not plan.statements:
+                write_stats.record("pg", "noop", 0, plan.full_bytes)
+                return existing
+
+            # session.begin(): 正常退出时提交，异常时回滚
+            async with async_postgres_connector.get_session() as session, session.begin():
+                for statement, params in plan.statements:
+                    result = await session.execute(statement, params)
+                result = result.fetchone()
+
+            write_stats.record("pg", plan.mode, plan.written_bytes, plan.full_bytes, plan.fields)
+            logger.info(f"Successfully created/updated user profile for: {user_id} ({plan.mode}, {plan.fields} fields)")
+            return cls._cache_written(user_id, result) or await cls.afind_by_user_id(user_id)
+
+        except SQLAlchemyError as e:
+            logger.error(f"Database error when creating/updating user {user_id}: {e}")
+            return None
+        except Exception as e:
+            logger.error(f"Error creating/updating user {user_id}: {e}")
+            return None
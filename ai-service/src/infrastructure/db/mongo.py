@@ -2,6 +2,7 @@ from loguru import logger
 from pymongo import MongoClient
 from pymongo.errors import ConnectionFailure
 
+from src.infrastructure.lazy import LazyConnector
 from src.settings import settings
 
 class MongoDatabaseConnector:
@@ -27,8 +28,15 @@ class MongoDatabaseConnector:
         if cls._instance is not None:
             cls._instance.close()
             cls._instance = None
+            connection.reset()
             logger.info("MongoDB connection closed")
 
 
-connection = MongoDatabaseConnector()
+# Connects (and pings) on first use, not at import time
+connection = LazyConnector("MongoDB", MongoDatabaseConnector)
+
+
+def get_database(name: str | None = None):
+    """Database handle of the shared client; connects on first call"""
+    return connection.get_database(name or settings.DATABASE_NAME)
 
@@ -1,26 +1,214 @@
+"""
+MySQL connector with a bounded, health-checked connection pool (PyMySQL)
+
+- min/max sizing: MYSQL_POOL_MIN_SIZE connections are opened up front and never more than
+  MYSQL_POOL_MAX_SIZE exist; callers wait up to MYSQL_POOL_WAIT_TIMEOUT_SECONDS for one
+- connections idle for longer than MYSQL_POOL_PING_AFTER_IDLE_SECONDS are pinged on
+  checkout (0 = always) and replaced when the server has dropped them (wait_timeout)
+- connections older than MYSQL_POOL_MAX_LIFETIME_SECONDS are recycled on checkout
+- execute_many() sends large batches in chunks of MYSQL_EXECUTE_MANY_CHUNK_SIZE
+
+The asyncio variant (aiomysql) lives in mysql_async.py.
+"""
+
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from typing import Any, Callable, Deque, Dict, Iterator, List, Optional, Tuple
 
-import pandas as pd
-from threading import Lock
-from queue import Queue
-from pymysql.err import MySQLError
 import pymysql
-from typing import Optional, List, Dict, Any
 from loguru import logger
-import sys
-import os
-sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "../../../")))
+from pymysql.err import InterfaceError, MySQLError, OperationalError
+
+from src.infrastructure.lazy import LazyConnector
 from src.settings import settings
 
+
+class PoolTimeout(MySQLError):
+    """No connection became available within the pool's wait timeout"""
+
+
+class MySQLConnectionPool:
+    """Thread-safe pool of PyMySQL connections"""
+
+    def __init__(
+        self,
+        connect: Callable[[], Any],
+        min_size: int = 1,
+        max_size: int = 10,
+        max_lifetime: float = 3600,
+        wait_timeout: float = 10,
+        ping_after_idle: float = 0,
+    ):
+        self._connect = connect
+        self.min_size = min(min_size, max_size)
+        self.max_size = max_size
+        self.max_lifetime = max_lifetime
+        self.wait_timeout = wait_timeout
+        self.ping_after_idle = ping_after_idle
+
+        # Idle connections as (connection, created_at, last_used_at); most recently used on the right
+        self._idle: Deque[Tuple[Any, float, float]] = deque()
+        # created_at of checked-out connections by id(connection)
+        self._in_use: Dict[int, float] = {}
+        # Open connections, including ones being opened right now
+        self._size = 0
+        self._closed = False
+        self._cond = threading.Condition()
+        self.stats = {
+            "created": 0, "closed": 0, "checkouts": 0, "waits": 0, "wait_timeouts": 0,
+            "wait_ms_total": 0.0, "pings": 0, "stale_replaced": 0, "recycled": 0, "discarded": 0,
+        }
+
+        for _ in range(self.min_size):
+            now = time.monotonic()
+            self._idle.append((self._create(), now, now))
+            self._size += 1
+
+    def _create(self):
+        connection = self._connect()
+        with self._cond:
+            self.stats["created"] += 1
+        return connection
+
+    def _close_quietly(self, connection):
+        try:
+            connection.close()
+        except Exception:
+            pass
+        with self._cond:
+            self.stats["closed"] += 1
+
+    def _validate(self, connection, created_at: float, last_used_at: float) -> Tuple[Any, float]:
+        """Recycle connections past their lifetime and ping ones that sat idle; returns a usable one"""
+        now = time.monotonic()
+        if self.max_lifetime and now - created_at > self.max_lifetime:
+            self._close_quietly(connection)
+            with self._cond:
+                self.stats["recycled"] += 1
+            return self._create(), time.monotonic()
+
+        if now - last_used_at >= self.ping_after_idle:
+            with self._cond:
+                self.stats["pings"] += 1
+            try:
+                connection.ping(reconnect=False)
+            except Exception as e:
+                logger.info(f"Replacing stale MySQL connection: {e}")
+                self._close_quietly(connection)
+                with self._cond:
+                    self.stats["stale_replaced"] += 1
+                return self._create(), time.monotonic()
+        return connection, created_at
+
+    def acquire(self, timeout: Optional[float] = None):
+        """Check out a connection; raises PoolTimeout when none frees up in time"""
+        timeout = self.wait_timeout if timeout is None else timeout
+        start = time.monotonic()
+        deadline = start + timeout
+        waited = False
+        with self._cond:
+            while True:
+                if self._closed:
+                    raise MySQLError("MySQL connection pool is closed")
+                if self._idle:
+                    connection, created_at, last_used_at = self._idle.pop()
+                    break
+                if self._size < self.max_size:
+                    # Reserve the slot now, open the connection outside the lock
+                    self._size += 1
+                    connection = created_at = last_used_at = None
+                    break
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    self.stats["wait_timeouts"] += 1
+                    raise PoolTimeout(f"No MySQL connection available within {timeout:.1f}s (max_size={self.max_size})")
+                waited = True
+                self._cond.wait(remaining)
+            self.stats["checkouts"] += 1
+            self.stats["waits"] += waited
+            self.stats["wait_ms_total"] += (time.monotonic() - start) * 1000
+
+        try:
+            if connection is None:
+                connection, created_at = self._create(), time.monotonic()
+            else:
+                connection, created_at = self._validate(connection, created_at, last_used_at)
+        except Exception:
+            with self._cond:
+                self._size -= 1
+                self._cond.notify()
+            raise
+
+        with self._cond:
+            self._in_use[id(connection)] = created_at
+        return connection
+
+    def release(self, connection, discard: bool = False):
+        """Return a connection; discard=True closes it (e.g. after a connection error)"""
+        with self._cond:
+            created_at = self._in_use.pop(id(connection), None)
+            if created_at is None:
+                return  # not checked out from this pool (or released twice)
+            close = discard or self._closed
+            if close:
+                self._size -= 1
+                self.stats["discarded"] += discard
+            else:
+                self._idle.append((connection, created_at, time.monotonic()))
+            self._cond.notify()
+        if close:
+            self._close_quietly(connection)
+
+    @contextmanager
+    def connection(self, timeout: Optional[float] = None) -> Iterator[Any]:
+        """with pool.connection() as conn: ... — always returned, discarded on connection errors"""
+        connection = self.acquire(timeout)
+        discard = False
+        try:
+            yield connection
+        except (OperationalError, InterfaceError):
+            discard = True
+            raise
+        finally:
+            self.release(connection, discard=discard)
+
+    def close_all(self):
+        """Close idle connections now and checked-out ones when they are released"""
+        with self._cond:
+            self._closed = True
+            idle = [connection for connection, _, _ in self._idle]
+            self._idle.clear()
+            self._size -= len(idle)
+            self._cond.notify_all()
+        for connection in idle:
+            self._close_quietly(connection)
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._cond:
+            checkouts = self.stats["checkouts"]
+            return {
+                **self.stats,
+                "avg_wait_ms": round(self.stats["wait_ms_total"] / checkouts, 2) if checkouts else 0.0,
+                "size": self._size,
+                "idle": len(self._idle),
+                "in_use": len(self._in_use),
+                "min_size": self.min_size,
+                "max_size": self.max_size,
+            }
+
+
 class MySQLDatabaseConnector:
-    """MySQL database connector with basic manual connection pooling using PyMySQL"""
+    """MySQL database connector backed by MySQLConnectionPool"""
 
     _instance: Optional['MySQLDatabaseConnector'] = None
-    _pool: Optional[Queue] = None
-    _lock: Lock = Lock()
+    _lock: threading.Lock = threading.Lock()
 
     def __new__(cls):
-        if cls._instance is None:
-            cls._instance = super().__new__(cls)
+        with cls._lock:
+            if cls._instance is None:
+                cls._instance = super().__new__(cls)
         return cls._instance
 
     def __init__(self):
@@ -29,14 +217,17 @@ class MySQLDatabaseConnector:
             self._initialized = True
 
     def _initialize_pool(self):
-        """Initialize a simple connection pool using a queue"""
-        self._pool_size = 5
-        self._pool = Queue(maxsize=self._pool_size)
-        for _ in range(self._pool_size):
-            conn = self._create_connection()
-            self._pool.put(conn)
+        self._pool = MySQLConnectionPool(
+            self._create_connection,
+            min_size=settings.MYSQL_POOL_MIN_SIZE,
+            max_size=settings.MYSQL_POOL_MAX_SIZE,
+            max_lifetime=settings.MYSQL_POOL_MAX_LIFETIME_SECONDS,
+            wait_timeout=settings.MYSQL_POOL_WAIT_TIMEOUT_SECONDS,
+            ping_after_idle=settings.MYSQL_POOL_PING_AFTER_IDLE_SECONDS,
+        )
         logger.info(
-            f"MySQL connection pool initialized successfully: {settings.MYSQL_HOST}:{settings.MYSQL_PORT}")
+            f"MySQL connection pool initialized successfully: {settings.MYSQL_HOST}:{settings.MYSQL_PORT} "
+            f"(min={self._pool.min_size}, max={self._pool.max_size})")
 
     def _create_connection(self):
         """Create a single PyMySQL connection"""
@@ -51,86 +242,96 @@ class MySQLDatabaseConnector:
             cursorclass=pymysql.cursors.DictCursor,
         )
 
+    @contextmanager
+    def connection(self) -> Iterator[Any]:
+        """Check out a pooled connection for several statements"""
+        with self._pool.connection() as conn:
+            yield conn
+
     def get_connection(self):
-        """Get a connection from the pool"""
-        with self._lock:
-            if self._pool.empty():
-                return self._create_connection()
-            return self._pool.get()
+        """Get a connection from the pool; pair with release_connection() (prefer connection())"""
+        return self._pool.acquire()
 
     def release_connection(self, conn):
         """Return the connection to the pool"""
-        with self._lock:
-            if self._pool.full():
-                conn.close()
-            else:
-                self._pool.put(conn)
+        self._pool.release(conn)
 
     def execute_query(self, query: str, params: Optional[tuple] = None) -> List[Dict[str, Any]]:
         """Execute a SELECT query and return results"""
-        conn = None
         try:
-            conn = self.get_connection()
-            with conn.cursor() as cursor:
+            with self.connection() as conn, conn.cursor() as cursor:
                 cursor.execute(query, params or ())
                 return cursor.fetchall()
         except MySQLError as e:
             logger.error(f"Error executing query: {e}")
             raise
-        finally:
-            if conn:
-                self.release_connection(conn)
 
     def execute_update(self, query: str, params: Optional[tuple] = None) -> int:
         """Execute an INSERT/UPDATE/DELETE query and return affected rows"""
-        conn = None
         try:
-            conn = self.get_connection()
-            with conn.cursor() as cursor:
+            with self.connection() as conn, conn.cursor() as cursor:
                 cursor.execute(query, params or ())
                 return cursor.rowcount
         except MySQLError as e:
             logger.error(f"Error executing update: {e}")
             raise
-        finally:
-            if conn:
-                self.release_connection(conn)
 
-    def execute_many(self, query: str, params_list: List[tuple]) -> int:
-        """Execute multiple INSERT/UPDATE/DELETE queries"""
-        conn = None
+    def execute_many(self, query: str, params_list: List[tuple], chunk_size: Optional[int] = None) -> int:
+        """
+        Execute an INSERT/UPDATE/DELETE for every parameter tuple, chunk_size rows per
+        round trip (keeps multi-row INSERTs under max_allowed_packet). Connections are in
+        autocommit mode, so chunks that succeeded before an error stay committed.
+        """
+        chunk_size = chunk_size or settings.MYSQL_EXECUTE_MANY_CHUNK_SIZE
+        affected = 0
         try:
-            conn = self.get_connection()
-            with conn.cursor() as cursor:
-                cursor.executemany(query, params_list)
-                return cursor.rowcount
+            with self.connection() as conn, conn.cursor() as cursor:
+                for start in range(0, len(params_list), chunk_size):
+                    cursor.executemany(query, params_list[start:start + chunk_size])
+                    affected += cursor.rowcount
+            return affected
         except MySQLError as e:
-            logger.error(f"Error executing batch update: {e}")
+            logger.error(f"Error executing batch update after {affected} rows: {e}")
             raise
-        finally:
-            if conn:
-                self.release_connection(conn)
 
-    def query_to_dataframe(self, query: str, params: Optional[tuple] = None) -> pd.DataFrame:
+    def query_to_dataframe(self, query: str, params: Optional[tuple] = None):
         """Execute a query and return results as a pandas DataFrame"""
+        import pandas as pd
+
         results = self.execute_query(query, params)
         return pd.DataFrame(results)
 
     def test_connection(self) -> bool:
         """Test the database connection"""
         try:
-            conn = self.get_connection()
-            with conn.cursor() as cursor:
+            with self.connection() as conn, conn.cursor() as cursor:
                 cursor.execute("SELECT 1")
                 cursor.fetchone()
-            self.release_connection(conn)
             logger.info("MySQL connection test successful")
             return True
         except Exception as e:
             logger.error(f"MySQL connection test failed: {e}")
             return False
 
+    def get_stats(self) -> Dict[str, Any]:
+        return self._pool.get_stats()
+
+    @classmethod
+    def close_connection(cls):
+        """Close the pool"""
+        with cls._lock:
+            instance, cls._instance = cls._instance, None
+        if instance is not None:
+            instance._pool.close_all()
+            mysql_connector.reset()
+            logger.info("MySQL connection pool closed")
+
+
+def _connect_mysql() -> MySQLDatabaseConnector:
+    connector = MySQLDatabaseConnector()
+    connector.test_connection()
+    return connector
+
 
-# Global instance
-mysql_connector = MySQLDatabaseConnector()
-mysql_connector.test_connection()
\ No newline at end of file
+# Global instance; the pool is created on first use
+mysql_connector = LazyConnector("MySQL", _connect_mysql)
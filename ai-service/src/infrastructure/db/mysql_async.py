@@ -0,0 +1,150 @@
+"""
+Async MySQL connector (aiomysql)
+Same pool settings as mysql.py (MYSQL_POOL_*) for code running on the event loop;
+the pool itself is created on first use so constructing the connector never blocks.
+No caller uses it yet: it is registered in lifecycle.py (stats/shutdown) for the
+handlers that move off the thread-pool connector in mysql.py
+"""
+
+import asyncio
+import time
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Dict, List, Optional
+
+import aiomysql
+from loguru import logger
+
+from src.infrastructure.db.mysql import PoolTimeout
+from src.infrastructure.lazy import LazyConnector
+from src.settings import settings
+
+# Last release time (monotonic), for ping-after-idle
+_LAST_USED_ATTR = "_ioffer_last_used"
+
+
+class AsyncMySQLDatabaseConnector:
+    _instance: Optional["AsyncMySQLDatabaseConnector"] = None
+
+    def __new__(cls, *args, **kwargs) -> "AsyncMySQLDatabaseConnector":
+        if cls._instance is None:
+            cls._instance = super().__new__(cls)
+            cls._instance._initialize()
+        return cls._instance
+
+    def _initialize(self):
+        self._pool: Optional[aiomysql.Pool] = None
+        self._pool_lock = asyncio.Lock()
+        self.stats = {"checkouts": 0, "wait_timeouts": 0, "wait_ms_total": 0.0, "pings": 0, "discarded": 0}
+
+    async def _get_pool(self) -> aiomysql.Pool:
+        if self._pool is None:
+            async with self._pool_lock:
+                if self._pool is None:
+                    self._pool = await aiomysql.create_pool(
+                        host=settings.MYSQL_HOST,
+                        port=settings.MYSQL_PORT,
+                        user=settings.MYSQL_USER,
+                        password=settings.MYSQL_PASSWORD,
+                        db=settings.MYSQL_DATABASE,
+                        charset=settings.MYSQL_CHARSET,
+                        autocommit=True,
+                        cursorclass=aiomysql.DictCursor,
+                        minsize=min(settings.MYSQL_POOL_MIN_SIZE, settings.MYSQL_POOL_MAX_SIZE),
+                        maxsize=settings.MYSQL_POOL_MAX_SIZE,
+                        # aiomysql closes connections older than this on acquire
+                        pool_recycle=int(settings.MYSQL_POOL_MAX_LIFETIME_SECONDS) or -1,
+                    )
+                    logger.info(f"Async MySQL pool created: {settings.MYSQL_HOST}:{settings.MYSQL_PORT} "
+                                f"(min={self._pool.minsize}, max={self._pool.maxsize})")
+        return self._pool
+
+    @asynccontextmanager
+    async def connection(self) -> AsyncIterator[Any]:
+        """async with connector.connection() as conn: ... — waits at most MYSQL_POOL_WAIT_TIMEOUT_SECONDS"""
+        pool = await self._get_pool()
+        start = time.monotonic()
+        try:
+            conn = await asyncio.wait_for(pool.acquire(), timeout=settings.MYSQL_POOL_WAIT_TIMEOUT_SECONDS)
+        except asyncio.TimeoutError:
+            self.stats["wait_timeouts"] += 1
+            raise PoolTimeout(f"No MySQL connection available within {settings.MYSQL_POOL_WAIT_TIMEOUT_SECONDS:.1f}s "
+                              f"(max_size={pool.maxsize})") from None
+        self.stats["checkouts"] += 1
+        self.stats["wait_ms_total"] += (time.monotonic() - start) * 1000
+
+        discard = False
+        try:
+            # Stored on the connection itself so it goes away when aiomysql closes or recycles it
+            last_used = getattr(conn, _LAST_USED_ATTR, None)
+            if last_used is None or time.monotonic() - last_used >= settings.MYSQL_POOL_PING_AFTER_IDLE_SECONDS:
+                self.stats["pings"] += 1
+                # Reconnects in place when the server dropped the idle connection (wait_timeout)
+                await conn.ping(reconnect=True)
+            yield conn
+        except (aiomysql.OperationalError, aiomysql.InterfaceError):
+            discard = True
+            raise
+        finally:
+            if discard:
+                # Closed connections are dropped from the pool instead of being reused
+                self.stats["discarded"] += 1
+                conn.close()
+            else:
+                setattr(conn, _LAST_USED_ATTR, time.monotonic())
+            pool.release(conn)
+
+    async def execute_query(self, query: str, params: Optional[tuple] = None) -> List[Dict[str, Any]]:
+        """Execute a SELECT query and return results"""
+        async with self.connection() as conn, conn.cursor() as cursor:
+            await cursor.execute(query, params or ())
+            return await cursor.fetchall()
+
+    async def execute_update(self, query: str, params: Optional[tuple] = None) -> int:
+        """Execute an INSERT/UPDATE/DELETE query and return affected rows"""
+        async with self.connection() as conn, conn.cursor() as cursor:
+            await cursor.execute(query, params or ())
+            return cursor.rowcount
+
+    async def execute_many(self, query: str, params_list: List[tuple], chunk_size: Optional[int] = None) -> int:
+        """Execute a batch in chunks of MYSQL_EXECUTE_MANY_CHUNK_SIZE; returns affected rows"""
+        chunk_size = chunk_size or settings.MYSQL_EXECUTE_MANY_CHUNK_SIZE
+        affected = 0
+        async with self.connection() as conn, conn.cursor() as cursor:
+            for start in range(0, len(params_list), chunk_size):
+                await cursor.executemany(query, params_list[start:start + chunk_size])
+                affected += cursor.rowcount
+        return affected
+
+    async def ping(self):
+        """Create the pool and run SELECT 1 (startup warm-up)"""
+        async with self.connection() as conn, conn.cursor() as cursor:
+            await cursor.execute("SELECT 1")
+
+    def get_stats(self) -> Dict[str, Any]:
+        if self._pool is None:
+            return {"initialized": False}
+        checkouts = self.stats["checkouts"]
+        return {
+            "initialized": True,
+            **self.stats,
+            "avg_wait_ms": round(self.stats["wait_ms_total"] / checkouts, 2) if checkouts else 0.0,
+            "size": self._pool.size,
+            "idle": self._pool.freesize,
+            "in_use": self._pool.size - self._pool.freesize,
+            "min_size": self._pool.minsize,
+            "max_size": self._pool.maxsize,
+        }
+
+    @classmethod
+    async def close_connection(cls):
+        """Close the pool"""
+        if cls._instance and cls._instance._pool:
+            cls._instance._pool.close()
+            await cls._instance._pool.wait_closed()
+            cls._instance = None
+            async_mysql_connector.reset()
+            logger.info("Async MySQL pool closed")
+
+
+# Global instance; the pool is created on first query (or ping() in the startup hook)
+async_mysql_connector = LazyConnector("MySQL (async)", AsyncMySQLDatabaseConnector)
@@ -4,6 +4,7 @@ from sqlalchemy.orm import sessionmaker, Session
 from sqlalchemy.exc import SQLAlchemyError
 from typing import Optional
 
+from src.infrastructure.lazy import LazyConnector
 from src.settings import settings
 
 class PostgreSQLConnector:
@@ -66,7 +67,9 @@ class PostgreSQLConnector:
             cls._instance._engine.dispose()
             cls._instance._engine = None
             cls._instance._session_factory = None
+            cls._instance = None
+            postgres_connector.reset()
             logger.info("PostgreSQL connection closed")
 
-# 创建全局连接实例
-postgres_connector = PostgreSQLConnector()
\ No newline at end of file
+# 全局连接实例：首次使用时才连接（或在启动钩子中显式connect()）
+postgres_connector = LazyConnector("PostgreSQL", PostgreSQLConnector)
\ No newline at end of file
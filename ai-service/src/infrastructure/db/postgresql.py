@@ -5,6 +5,7 @@ from sqlalchemy.exc import SQLAlchemyError
 from sqlalchemy.orm import sessionmaker, declarative_base
 from datetime import datetime
 
+from src.infrastructure.lazy import LazyConnector
 from src.settings import settings
 
 Base = declarative_base()
@@ -125,8 +126,9 @@ class PostgreSQLDatabaseConnector:
             cls._instance.dispose()
             cls._instance = None
             cls._session_maker = None
+            connection.reset()
             logger.info("PostgreSQL connection closed")
 
 
-# Create connection instance
-connection = PostgreSQLDatabaseConnector()
\ No newline at end of file
+# Connection instance, created on first use
+connection = LazyConnector("PostgreSQL", PostgreSQLDatabaseConnector)
\ No newline at end of file
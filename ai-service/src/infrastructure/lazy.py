@@ -0,0 +1,58 @@
+"""
+Lazy connector proxies
+导入数据库模块时不再建立连接：第一次访问属性时才创建连接器（含连接/ping），
+或在应用启动钩子中显式调用 connect()
+"""
+
+import threading
+import time
+from typing import Any, Callable, Generic, Optional, TypeVar
+
+from loguru import logger
+
+T = TypeVar("T")
+
+
+class LazyConnector(Generic[T]):
+    """
+    Stands in for a module-level connector instance, e.g.
+
+        postgres_connector = LazyConnector("postgres", PostgreSQLConnector)
+
+    Call sites keep using postgres_connector.get_session() unchanged.
+    """
+
+    def __init__(self, name: str, factory: Callable[[], T]):
+        self._name = name
+        self._factory = factory
+        self._instance: Optional[T] = None
+        self._lock = threading.Lock()
+        self.connect_seconds: Optional[float] = None
+
+    def connect(self) -> T:
+        """Create the connector now (startup hooks); later calls return the same instance"""
+        if self._instance is None:
+            with self._lock:
+                if self._instance is None:
+                    start = time.perf_counter()
+                    self._instance = self._factory()
+                    self.connect_seconds = time.perf_counter() - start
+                    logger.info(f"{self._name} connector ready in {self.connect_seconds:.2f}s")
+        return self._instance
+
+    @property
+    def initialized(self) -> bool:
+        return self._instance is not None
+
+    def reset(self):
+        """Forget the instance after it was closed so the next access reconnects"""
+        with self._lock:
+            self._instance = None
+
+    def __getattr__(self, item: str) -> Any:
+        # Only called for attributes not defined on the proxy itself
+        return getattr(self.connect(), item)
+
+    def __repr__(self) -> str:
+        state = "connected" if self.initialized else "not connected"
+        return f"<LazyConnector {self._name} ({state})>"
@@ -0,0 +1,71 @@
+"""
+Explicit startup / shutdown of infrastructure, called from the FastAPI lifespan
+只连接配置中列出的数据库（STARTUP_CONNECTORS），例如仅使用Postgres的部署不会触碰MongoDB；
+连接失败只记录日志，相关功能在首次使用时重试
+"""
+
+import asyncio
+import importlib
+import sys
+from typing import Dict, Iterable, Optional, Tuple
+
+from loguru import logger
+
+# name -> (module, LazyConnector attribute, class whose close_connection() closes it);
+# modules are imported only when listed
+CONNECTORS: Dict[str, Tuple[str, str, Optional[str]]] = {
+    "postgres": ("src.infrastructure.db.postgres", "postgres_connector", "PostgreSQLConnector"),
+    "postgres_async": ("src.infrastructure.db.postgres_async", "async_postgres_connector", "AsyncPostgreSQLConnector"),
+    "postgresql": ("src.infrastructure.db.postgresql", "connection", "PostgreSQLDatabaseConnector"),
+    "mongo": ("src.infrastructure.db.mongo", "connection", "MongoDatabaseConnector"),
+    "mysql": ("src.infrastructure.db.mysql", "mysql_connector", "MySQLDatabaseConnector"),
+    "mysql_async": ("src.infrastructure.db.mysql_async", "async_mysql_connector", "AsyncMySQLDatabaseConnector"),
+}
+
+
+def _connector(name: str):
+    module_name, attribute, _ = CONNECTORS[name]
+    return getattr(importlib.import_module(module_name), attribute)
+
+
+async def startup(names: Iterable[str]) -> Dict[str, bool]:
+    """Connect the listed connectors concurrently in worker threads; returns name -> connected"""
+    names = [name for name in names if name]
+    unknown = [name for name in names if name not in CONNECTORS]
+    if unknown:
+        logger.warning(f"Unknown startup connectors ignored: {unknown}")
+    names = [name for name in names if name in CONNECTORS]
+
+    async def connect(name: str) -> bool:
+        try:
+            instance = await asyncio.to_thread(lambda: _connector(name).connect())
+            # Async connectors only create their engine in connect(); open a first pooled connection
+            ping = getattr(instance, "ping", None)
+            if asyncio.iscoroutinefunction(ping):
+                await ping()
+            return True
+        except Exception as e:
+            logger.warning(f"{name} not available at startup (will retry on first use): {e}")
+            return False
+
+    results = await asyncio.gather(*(connect(name) for name in names))
+    return dict(zip(names, results))
+
+
+async def shutdown():
+    """Close every connector that was actually opened"""
+    for name, (module_name, attribute, owner) in CONNECTORS.items():
+        module = sys.modules.get(module_name)
+        connector = getattr(module, attribute, None) if module else None
+        if connector is None or not connector.initialized:
+            continue
+        try:
+            if owner is not None:
+                close = getattr(module, owner).close_connection
+                if asyncio.iscoroutinefunction(close):
+                    await close()
+                else:
+                    await asyncio.to_thread(close)
+            connector.reset()
+        except Exception as e:
+            logger.warning(f"Error closing {name} connector: {e}")
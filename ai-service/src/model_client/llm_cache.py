@@ -0,0 +1,116 @@
+"""
+Content-addressed LLM response cache
+按 (model, system prompt, user content, temperature) 的哈希缓存模型输出（SQLite + TTL）。
+模式：off / readwrite / replay（离线测试：只读，未命中直接报错）
+"""
+
+import hashlib
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, Optional
+
+from src.settings import settings
+
+logger = logging.getLogger(__name__)
+
+CACHE_MODES = ("off", "readwrite", "replay")
+
+
+class LLMCacheMiss(Exception):
+    """Raised in replay mode when a request has no recorded response"""
+
+
+class LLMResponseCache:
+    def __init__(self, path: str, ttl_seconds: float, mode: str = "readwrite"):
+        if mode not in CACHE_MODES:
+            raise ValueError(f"Unknown LLM cache mode: {mode}")
+        self.path = path
+        self.ttl_seconds = ttl_seconds
+        self.mode = mode
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS llm_responses (
+                key TEXT PRIMARY KEY,
+                model TEXT NOT NULL,
+                response TEXT NOT NULL,
+                created_at REAL NOT NULL
+            )
+            """
+        )
+        self._conn.commit()
+        self._lock = threading.Lock()
+        self.stats = {"hits": 0, "misses": 0, "expired": 0, "stores": 0}
+
+    @staticmethod
+    def make_key(model: str, system: str = "", user: Any = "", temperature: Optional[float] = None) -> str:
+        """Stable hash of everything that determines the output; user may be a string or a JSON payload"""
+        material = json.dumps(
+            {"model": model, "system": system, "user": user, "temperature": temperature},
+            sort_keys=True, ensure_ascii=False, default=str,
+        )
+        return hashlib.sha256(material.encode("utf-8")).hexdigest()
+
+    def get(self, key: str) -> Optional[Any]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT response, created_at FROM llm_responses WHERE key = ?", (key,)
+            ).fetchone()
+
+        # Recorded fixtures never expire in replay mode
+        if row is not None and self.mode != "replay" and time.time() - row[1] > self.ttl_seconds:
+            self.stats["expired"] += 1
+            row = None
+
+        if row is None:
+            self.stats["misses"] += 1
+            if self.mode == "replay":
+                raise LLMCacheMiss(f"No recorded LLM response for key {key[:12]}… in {self.path}")
+            return None
+
+        self.stats["hits"] += 1
+        return json.loads(row[0])
+
+    def set(self, key: str, model: str, response: Any):
+        if self.mode != "readwrite":
+            return
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO llm_responses VALUES (?, ?, ?, ?)",
+                (key, model, json.dumps(response, ensure_ascii=False), time.time()),
+            )
+            self._conn.commit()
+        self.stats["stores"] += 1
+
+    def clear(self) -> int:
+        with self._lock:
+            cursor = self._conn.execute("DELETE FROM llm_responses")
+            self._conn.commit()
+            return cursor.rowcount
+
+    def get_stats(self) -> Dict[str, Any]:
+        lookups = self.stats["hits"] + self.stats["misses"]
+        return {**self.stats, "mode": self.mode, "hit_rate": (self.stats["hits"] / lookups) if lookups else 0.0}
+
+
+_cache: Optional[LLMResponseCache] = None
+
+def get_llm_cache() -> Optional[LLMResponseCache]:
+    """
+    获取共享的LLM响应缓存；LLM_CACHE_MODE=off时返回None
+    """
+    global _cache
+    if settings.LLM_CACHE_MODE == "off":
+        return None
+    if _cache is None:
+        _cache = LLMResponseCache(settings.LLM_CACHE_PATH, settings.LLM_CACHE_TTL_SECONDS, settings.LLM_CACHE_MODE)
+        logger.info(f"✅ LLM response cache: {settings.LLM_CACHE_PATH} (mode={settings.LLM_CACHE_MODE})")
+    return _cache
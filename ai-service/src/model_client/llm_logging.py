@@ -0,0 +1,88 @@
+"""
+Structured LLM-call logging
+每次调用一行结构化日志（模型、状态、耗时、token数）；请求/响应内容按采样率截断记录，
+完整dump仅在llm_calls日志级别为DEBUG时才会序列化
+"""
+
+import json
+import logging
+import random
+import time
+from typing import Any, Dict, Optional
+
+from src.settings import settings
+
+# Dedicated logger so full payload dumps stay off even when the root logger runs at DEBUG
+llm_logger = logging.getLogger("llm_calls")
+llm_logger.setLevel(settings.LLM_LOG_LEVEL)
+
+
+class LazyJSON:
+    """Defers json.dumps until a handler actually formats the record"""
+
+    def __init__(self, payload: Any, max_chars: Optional[int] = None, indent: Optional[int] = None):
+        self.payload = payload
+        self.max_chars = max_chars
+        self.indent = indent
+
+    def __str__(self) -> str:
+        try:
+            text = json.dumps(self.payload, indent=self.indent, ensure_ascii=False, default=str)
+        except (TypeError, ValueError):
+            text = repr(self.payload)
+        if self.max_chars is not None and len(text) > self.max_chars:
+            return f"{text[:self.max_chars]}... [truncated, {len(text)} chars]"
+        return text
+
+
+class LLMCall:
+    """
+    One LLM request. Use as a context manager around the API call:
+
+        with LLMCall("gemini", model, request=payload, messages=len(messages)) as call:
+            response = await ...
+            call.set_usage(prompt_tokens=..., completion_tokens=...)
+            call.set_response(response)
+    """
+
+    def __init__(self, client: str, model: str, request: Any = None, **fields):
+        self.client = client
+        self.model = model
+        self.request = request
+        self.response: Any = None
+        self.fields: Dict[str, Any] = dict(fields)
+        self.sampled = random.random() < settings.LLM_LOG_SAMPLE_RATE
+        self.start = 0.0
+
+    def set_usage(self, prompt_tokens: Optional[int] = None, completion_tokens: Optional[int] = None,
+                  total_tokens: Optional[int] = None):
+        self.fields.update(prompt_tokens=prompt_tokens, completion_tokens=completion_tokens, total_tokens=total_tokens)
+
+    def set_response(self, response: Any):
+        self.response = response
+
+    def __enter__(self) -> "LLMCall":
+        self.start = time.perf_counter()
+        if llm_logger.isEnabledFor(logging.DEBUG) and self.request is not None:
+            llm_logger.debug("llm_request client=%s model=%s payload=%s", self.client, self.model,
+                             LazyJSON(self.request, indent=2))
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> bool:
+        latency_ms = (time.perf_counter() - self.start) * 1000
+        status = "ok" if exc_type is None else f"error:{exc_type.__name__}"
+        record = {"client": self.client, "model": self.model, "status": status,
+                  "latency_ms": round(latency_ms, 1), **self.fields}
+
+        level = logging.INFO if exc_type is None else logging.WARNING
+        llm_logger.log(level, "llm_call %s", " ".join(f"{k}={v}" for k, v in record.items() if v is not None),
+                       extra={"llm_call": record})
+
+        if self.sampled:
+            cap = settings.LLM_LOG_MAX_PAYLOAD_CHARS
+            llm_logger.info("llm_sample client=%s model=%s request=%s response=%s", self.client, self.model,
+                            LazyJSON(self.request, cap), LazyJSON(self.response, cap))
+        if llm_logger.isEnabledFor(logging.DEBUG) and self.response is not None:
+            llm_logger.debug("llm_response client=%s model=%s payload=%s", self.client, self.model,
+                             LazyJSON(self.response, indent=2))
+        return False
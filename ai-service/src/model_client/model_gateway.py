@@ -0,0 +1,250 @@
+"""
+Model gateway between agents and the model clients
+每个模型一条通道：并发上限（按优先级排队）、可选的RPM令牌桶、相同请求合并、
+429/5xx退避重试（遵守Retry-After），以及排队深度/等待时间/耗时指标
+"""
+
+import asyncio
+import heapq
+import itertools
+import logging
+import random
+import time
+import weakref
+from collections import deque
+from contextlib import asynccontextmanager, contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass
+from enum import IntEnum
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+from src.settings import settings
+
+logger = logging.getLogger(__name__)
+
+RETRYABLE_STATUS_CODES = {429, 500, 502, 503, 504}
+
+
+class Priority(IntEnum):
+    """Lower value is served first"""
+    INTERACTIVE = 0  # WebSocket / HTTP chat
+    BACKGROUND = 1   # crawling, cache warming, batch jobs
+
+
+_current_priority: ContextVar[Priority] = ContextVar("llm_priority", default=Priority.INTERACTIVE)
+
+
+@contextmanager
+def llm_priority(priority: Priority):
+    """
+    Run model calls in this block (and tasks spawned from it) at the given priority:
+
+        with llm_priority(Priority.BACKGROUND):
+            await crawl()
+    """
+    token = _current_priority.set(priority)
+    try:
+        yield
+    finally:
+        _current_priority.reset(token)
+
+
+class _RateLimiter:
+    """Requests-per-minute token bucket"""
+
+    def __init__(self, rpm: int):
+        self.capacity = float(rpm)
+        self.tokens = float(rpm)
+        self.rate = rpm / 60.0
+        self.updated_at = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    async def acquire(self):
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated_at) * self.rate)
+                self.updated_at = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                await asyncio.sleep((1 - self.tokens) / self.rate)
+
+
+class _ModelLane:
+    """Concurrency slots for one model; waiters are served by (priority, arrival order)"""
+
+    def __init__(self, model: str, max_concurrency: int, rpm: int):
+        self.model = model
+        self.max_concurrency = max_concurrency
+        self.active = 0
+        self.limiter = _RateLimiter(rpm) if rpm > 0 else None
+        self._waiters = []  # heap of (priority, seq, future)
+        self._seq = itertools.count()
+
+        self.stats = {"requests": 0, "errors": 0, "retries": 0, "rate_limited": 0, "coalesced": 0}
+        self.wait_ms = deque(maxlen=1000)
+        self.latency_ms = deque(maxlen=1000)
+
+    @property
+    def queue_depth(self) -> int:
+        return sum(1 for _, _, future in self._waiters if not future.done())
+
+    async def acquire(self, priority: Priority):
+        if self.active < self.max_concurrency and not self.queue_depth:
+            self.active += 1
+            return
+
+        future = asyncio.get_running_loop().create_future()
+        heapq.heappush(self._waiters, (int(priority), next(self._seq), future))
+        try:
+            await future
+        except asyncio.CancelledError:
+            # The slot may have been handed over just before the cancellation landed
+            if future.done() and not future.cancelled():
+                self.release()
+            raise
+
+    def release(self):
+        # Hand the slot straight to the next live waiter; cancelled waiters are skipped
+        while self._waiters:
+            _, _, future = heapq.heappop(self._waiters)
+            if not future.done():
+                future.set_result(None)
+                return
+        self.active -= 1
+
+    def snapshot(self) -> Dict[str, Any]:
+        def avg(values):
+            return round(sum(values) / len(values), 1) if values else 0.0
+
+        def p95(values):
+            ordered = sorted(values)
+            return round(ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))], 1) if ordered else 0.0
+
+        return {
+            **self.stats,
+            "max_concurrency": self.max_concurrency,
+            "active": self.active,
+            "queue_depth": self.queue_depth,
+            "avg_wait_ms": avg(self.wait_ms),
+            "p95_wait_ms": p95(self.wait_ms),
+            "avg_latency_ms": avg(self.latency_ms),
+            "p95_latency_ms": p95(self.latency_ms),
+        }
+
+
+@dataclass
+class _InFlight:
+    task: asyncio.Task
+    waiters: int = 0
+
+
+class ModelGateway:
+    def __init__(self, max_concurrency: int, rpm: int = 0, max_retries: int = 4,
+                 backoff_base: float = 1.0, backoff_max: float = 30.0):
+        self.max_concurrency = max_concurrency
+        self.rpm = rpm
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self._lanes: Dict[str, _ModelLane] = {}
+        self._inflight: Dict[str, _InFlight] = {}
+
+    def _lane(self, model: str) -> _ModelLane:
+        if model not in self._lanes:
+            self._lanes[model] = _ModelLane(model, self.max_concurrency, self.rpm)
+        return self._lanes[model]
+
+    @asynccontextmanager
+    async def slot(self, model: str, priority: Optional[Priority] = None):
+        """Hold one concurrency slot (and one rate token) for the duration of the block, e.g. a stream"""
+        lane = self._lane(model)
+        queued_at = time.perf_counter()
+        await lane.acquire(_current_priority.get() if priority is None else priority)
+        lane.wait_ms.append((time.perf_counter() - queued_at) * 1000)
+        try:
+            if lane.limiter:
+                await lane.limiter.acquire()
+            yield
+        finally:
+            lane.release()
+
+    async def run(self, model: str, call: Callable[[], Awaitable[Any]], key: Optional[str] = None,
+                  priority: Optional[Priority] = None) -> Any:
+        """
+        Run call() under the model's limits with retries. Concurrent runs with the same key
+        share one underlying request; it is cancelled only when every waiter has gone away.
+        """
+        if key is None:
+            return await self._execute(model, call, priority)
+
+        entry = self._inflight.get(key)
+        if entry is None:
+            entry = _InFlight(asyncio.ensure_future(self._execute(model, call, priority)))
+            self._inflight[key] = entry
+            entry.task.add_done_callback(lambda _: self._inflight.pop(key, None))
+        else:
+            self._lane(model).stats["coalesced"] += 1
+
+        entry.waiters += 1
+        try:
+            return await asyncio.shield(entry.task)
+        except asyncio.CancelledError:
+            if entry.waiters == 1 and not entry.task.done():
+                entry.task.cancel()
+            raise
+        finally:
+            entry.waiters -= 1
+
+    async def _execute(self, model: str, call: Callable[[], Awaitable[Any]], priority: Optional[Priority]) -> Any:
+        lane = self._lane(model)
+        start = time.perf_counter()
+        try:
+            for attempt in range(self.max_retries + 1):
+                async with self.slot(model, priority):
+                    try:
+                        return await call()
+                    except Exception as e:
+                        status_code = getattr(e, "status_code", None)
+                        if status_code == 429:
+                            lane.stats["rate_limited"] += 1
+                        if status_code not in RETRYABLE_STATUS_CODES or attempt == self.max_retries:
+                            lane.stats["errors"] += 1
+                            raise
+                        delay = self._retry_delay(attempt, getattr(e, "retry_after", None))
+                        lane.stats["retries"] += 1
+                        logger.warning(f"⚠️ {model} returned {status_code}, retry {attempt + 1} in {delay:.1f}s")
+                # Back off without holding the slot; the retry queues again (and takes a fresh rate token)
+                await asyncio.sleep(delay)
+        finally:
+            lane.stats["requests"] += 1
+            lane.latency_ms.append((time.perf_counter() - start) * 1000)
+
+    def _retry_delay(self, attempt: int, retry_after: Optional[float]) -> float:
+        """Server-provided Retry-After wins; otherwise exponential backoff with full jitter"""
+        if retry_after is not None:
+            return min(float(retry_after), self.backoff_max)
+        return random.uniform(0, min(self.backoff_max, self.backoff_base * (2 ** attempt)))
+
+    def get_stats(self) -> Dict[str, Dict[str, Any]]:
+        return {model: lane.snapshot() for model, lane in self._lanes.items()}
+
+
+# 每个事件循环一个网关（队列中的future与锁绑定在创建它们的循环上）
+_gateways: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, ModelGateway]" = weakref.WeakKeyDictionary()
+
+def get_model_gateway() -> ModelGateway:
+    """
+    获取当前事件循环的模型网关
+    """
+    loop = asyncio.get_running_loop()
+    gateway = _gateways.get(loop)
+    if gateway is None:
+        gateway = ModelGateway(
+            max_concurrency=settings.LLM_MAX_CONCURRENCY_PER_MODEL,
+            rpm=settings.LLM_RPM_LIMIT_PER_MODEL,
+            max_retries=settings.LLM_MAX_RETRIES,
+        )
+        _gateways[loop] = gateway
+    return gateway
@@ -4,12 +4,16 @@ Native Gemini Client for AutoGen compatibility
 """
 
 import asyncio
+import hashlib
 import json
 import httpx
 from typing import List, Dict, Any, Optional, AsyncGenerator, Union
 from dataclasses import dataclass
 from src.settings import settings
 import logging
+from src.model_client.llm_logging import LLMCall
+from src.model_client.model_gateway import get_model_gateway
+from src.model_client.llm_cache import LLMResponseCache
 from autogen_core.models import CreateResult, UserMessage, AssistantMessage
 from autogen_core._types import FunctionCall
 
@@ -17,14 +21,37 @@ logger = logging.getLogger(__name__)
 
 # AutoGen native types are used instead of custom classes
 
+class GeminiAPIError(Exception):
+    """Gemini HTTP错误，带状态码和Retry-After供网关重试使用"""
+
+    def __init__(self, status_code: int, error_text: str, retry_after: Optional[float] = None):
+        super().__init__(f"Gemini API error {status_code}: {error_text}")
+        self.status_code = status_code
+        self.retry_after = retry_after
+
+    @classmethod
+    def from_response(cls, response: httpx.Response, error_text: str) -> "GeminiAPIError":
+        retry_after = None
+        header = response.headers.get("retry-after")
+        if header:
+            try:
+                retry_after = float(header)
+            except ValueError:
+                pass
+        return cls(response.status_code, error_text, retry_after)
+
+
 class NativeGeminiClient:
     """
     原生Gemini客户端，兼容AutoGen的OpenAI接口
     """
 
-    def __init__(self, model: str = "gemini-2.5-pro", api_key: Optional[str] = None):
+    def __init__(self, model: str = "gemini-2.5-pro", api_key: Optional[str] = None,
+                 response_cache: Optional[LLMResponseCache] = None):
         self.model = model
         self.api_key = api_key or settings.GEMINI_API_KEY
+        # 可选的响应缓存（按请求内容寻址），默认关闭：Agent对话一般不需要重放
+        self.response_cache = response_cache
         self.base_url = "https://generativelanguage.googleapis.com/v1"
         self.client = httpx.AsyncClient(timeout=60.0)
 
@@ -50,21 +77,36 @@ class NativeGeminiClient:
         AutoGen兼容的create方法
         """
         try:
-            logger.info(f"🎯 Native Gemini Client - Creating completion for model: {model or self.model}")
-            logger.info(f"📝 Messages count: {len(messages)}")
-            logger.info(f"🔧 Tools count: {len(tools) if tools else 0}")
+            model = model or self.model
 
             # 转换格式
             gemini_request = self._convert_to_gemini_format(messages, tools)
-            logger.info(f"📤 Converted to Gemini format: {json.dumps(gemini_request, indent=2)}")
 
-            # 调用Gemini API
-            response_data = await self._call_gemini_api(gemini_request, model or self.model)
-            logger.info(f"📥 Gemini API response: {json.dumps(response_data, indent=2, ensure_ascii=False)}")
-
-            # 转换回AutoGen格式
-            autogen_response = self._convert_to_autogen_format(response_data, tools)
-            logger.info(f"✅ Converted to AutoGen format")
+            cache_key = None
+            if self.response_cache:
+                temperature = gemini_request.get("generationConfig", {}).get("temperature")
+                cache_key = self.response_cache.make_key(model, user=gemini_request, temperature=temperature)
+                cached = self.response_cache.get(cache_key)
+                if cached is not None:
+                    return self._convert_to_autogen_format(cached, tools)
+
+            # 调用Gemini API（结构化日志：耗时/token/状态，内容按采样率截断记录）
+            with LLMCall("gemini", model, request=gemini_request, messages=len(messages),
+                         tools=len(tools) if tools else 0, stream=False) as call:
+                # 经过模型网关：并发/速率限制、相同请求合并、429/5xx重试
+                # 请求体只序列化一次：合并键直接对要发送的字节求哈希
+                body = json.dumps(gemini_request, ensure_ascii=False).encode("utf-8")
+                request_key = hashlib.sha256(model.encode("utf-8") + b"\n" + body).hexdigest()
+                response_data = await get_model_gateway().run(
+                    model, lambda: self._call_gemini_api(body, model), key=request_key
+                )
+                call.set_response(response_data)
+
+                # 转换回AutoGen格式
+                autogen_response = self._convert_to_autogen_format(response_data, tools)
+                if cache_key:
+                    self.response_cache.set(cache_key, model, response_data)
+                call.set_usage(autogen_response.usage.prompt_tokens, autogen_response.usage.completion_tokens)
 
             return autogen_response
 
@@ -79,25 +121,52 @@ class NativeGeminiClient:
         tools: Optional[List[Dict[str, Any]]] = None,
         tool_choice: Optional[str] = None,
         **kwargs
-    ) -> AsyncGenerator[CreateResult, None]:
+    ) -> AsyncGenerator[Union[str, CreateResult], None]:
         """
         AutoGen兼容的create_stream方法 - 流式响应
-        目前简化实现：调用非流式API并作为单个chunk返回
+        通过streamGenerateContent (SSE) 逐块返回文本，最后返回完整的CreateResult
         """
         try:
-            logger.info(f"🎯 Native Gemini Client - Creating streaming completion for model: {model or self.model}")
-
-            # 调用非流式create方法
-            result = await self.create(
-                messages=messages,
-                model=model,
-                tools=tools,
-                tool_choice=tool_choice,
-                stream=False,
-                **kwargs
-            )
-
-            # 作为单个chunk返回
+            model = model or self.model
+
+            gemini_request = self._convert_to_gemini_format(messages, tools)
+
+            # 累积所有chunk，结束后组装成一个完整的Gemini响应再转换
+            text_parts: List[str] = []
+            function_call_parts: List[Dict[str, Any]] = []
+            finish_reason = "STOP"
+            usage_metadata: Dict[str, Any] = {}
+
+            with LLMCall("gemini", model, request=gemini_request, messages=len(messages),
+                         tools=len(tools) if tools else 0, stream=True) as call:
+                # 流式请求整个过程占用一个网关槽位（不合并、不重试，已输出的token无法撤回）
+                async with get_model_gateway().slot(model):
+                    async for chunk in self._stream_gemini_api(gemini_request, model):
+                        candidates = chunk.get("candidates", [])
+                        if candidates:
+                            candidate = candidates[0]
+                            for part in candidate.get("content", {}).get("parts", []):
+                                if "text" in part:
+                                    text_parts.append(part["text"])
+                                    yield part["text"]
+                                elif "functionCall" in part:
+                                    function_call_parts.append(part)
+                            finish_reason = candidate.get("finishReason", finish_reason)
+                        # usageMetadata在每个chunk中都是累计值，取最后一个
+                        usage_metadata = chunk.get("usageMetadata", usage_metadata)
+
+                aggregated_response = {
+                    "candidates": [{
+                        "content": {"parts": [{"text": "".join(text_parts)}] + function_call_parts},
+                        "finishReason": finish_reason,
+                    }],
+                    "usageMetadata": usage_metadata,
+                }
+                result = self._convert_to_autogen_format(aggregated_response, tools)
+                call.set_response(aggregated_response)
+                call.set_usage(result.usage.prompt_tokens, result.usage.completion_tokens)
+                call.fields["chunks"] = len(text_parts)
+
             yield result
 
         except Exception as e:
@@ -112,19 +181,17 @@ class NativeGeminiClient:
 
         for message in messages:
             # 处理AutoGen的消息对象和字典两种格式
-            logger.info(f"🔍 Message type: {type(message)}, message: {message}")
+            logger.debug("🔍 Message type: %s", type(message).__name__)
 
             # 使用try-except更安全地处理不同格式
             try:
                 # 先尝试字典格式
                 if hasattr(message, 'get') and callable(getattr(message, 'get')):
                     # 普通字典格式
-                    logger.info(f"✅ Using dict format")
                     role = message.get("role", "")
                     content = message.get("content", "")
                 else:
                     # AutoGen消息对象（SystemMessage, UserMessage, AssistantMessage等）
-                    logger.info(f"✅ Using AutoGen message object format")
                     # AutoGen对象使用type属性而不是role
                     message_type = getattr(message, 'type', '')
                     content = getattr(message, 'content', '')
@@ -144,7 +211,7 @@ class NativeGeminiClient:
                         else:
                             role = 'assistant'
             except Exception as e:
-                logger.error(f"❌ Error processing message {message}: {e}")
+                logger.error(f"❌ Error processing message of type {type(message).__name__}: {e}")
                 # 回退到对象属性访问
                 message_type = getattr(message, 'type', '')
                 content = getattr(message, 'content', '')
@@ -234,32 +301,50 @@ class NativeGeminiClient:
 
         return request_data
 
-    async def _call_gemini_api(self, request_data: Dict[str, Any], model: str) -> Dict[str, Any]:
+    async def _call_gemini_api(self, request_data: Union[Dict[str, Any], bytes], model: str) -> Dict[str, Any]:
         """
-        调用Gemini原生API
+        调用Gemini原生API；request_data可以是已序列化的JSON请求体
         """
         url = f"{self.base_url}/models/{model}:generateContent"
 
         params = {"key": self.api_key}
         headers = {"Content-Type": "application/json"}
 
-        logger.info(f"🌐 Calling Gemini API: {url}")
-        logger.info(f"📤 Request data: {json.dumps(request_data, indent=2, ensure_ascii=False)}")
-
-        response = await self.client.post(
-            url,
-            json=request_data,
-            params=params,
-            headers=headers
-        )
+        if isinstance(request_data, bytes):
+            response = await self.client.post(url, content=request_data, params=params, headers=headers)
+        else:
+            response = await self.client.post(url, json=request_data, params=params, headers=headers)
 
         if response.status_code != 200:
             error_text = response.text
             logger.error(f"❌ Gemini API error {response.status_code}: {error_text}")
-            raise Exception(f"Gemini API error {response.status_code}: {error_text}")
+            raise GeminiAPIError.from_response(response, error_text)
 
         return response.json()
 
+    async def _stream_gemini_api(self, request_data: Dict[str, Any], model: str) -> AsyncGenerator[Dict[str, Any], None]:
+        """
+        调用Gemini流式API (streamGenerateContent, alt=sse)，逐个返回解析后的JSON chunk
+        """
+        url = f"{self.base_url}/models/{model}:streamGenerateContent"
+
+        params = {"key": self.api_key, "alt": "sse"}
+        headers = {"Content-Type": "application/json"}
+
+        async with self.client.stream("POST", url, json=request_data, params=params, headers=headers) as response:
+            if response.status_code != 200:
+                error_text = (await response.aread()).decode("utf-8", errors="replace")
+                logger.error(f"❌ Gemini API error {response.status_code}: {error_text}")
+                raise GeminiAPIError.from_response(response, error_text)
+
+            async for line in response.aiter_lines():
+                # SSE格式: 每个事件一行 "data: {...}"，事件之间以空行分隔
+                if not line.startswith("data:"):
+                    continue
+                data = line[len("data:"):].strip()
+                if data:
+                    yield json.loads(data)
+
     def _convert_to_autogen_format(self, gemini_response: Dict[str, Any], tools: Optional[List[Dict[str, Any]]] = None) -> CreateResult:
         """
         将Gemini响应转换为AutoGen CreateResult格式
@@ -0,0 +1,190 @@
+"""
+Shared async Perplexity client
+所有Perplexity调用共用一个连接池（HTTP/2 keep-alive），429/5xx自动退避重试
+"""
+
+import asyncio
+import importlib.util
+import logging
+import random
+import time
+import weakref
+from collections import deque
+from typing import Any, Dict, List, Optional
+
+import httpx
+
+from src.model_client.llm_logging import LLMCall
+from src.settings import settings
+
+logger = logging.getLogger(__name__)
+
+PERPLEXITY_BASE_URL = "https://api.perplexity.ai"
+RETRYABLE_STATUS_CODES = {429, 500, 502, 503, 504}
+
+# HTTP/2 needs the optional h2 package (httpx[http2]); fall back to HTTP/1.1 keep-alive without it
+HTTP2_AVAILABLE = importlib.util.find_spec("h2") is not None
+
+
+class PerplexityAPIError(Exception):
+    """Non-retryable error or retries exhausted"""
+
+    def __init__(self, message: str, status_code: Optional[int] = None, body: Any = None):
+        super().__init__(message)
+        self.status_code = status_code
+        self.body = body
+
+
+class PerplexityClient:
+    """
+    Pooled async client for the Perplexity chat completions API.
+    每个事件循环一个连接池（连接不能跨循环复用）：同一循环始终复用同一个httpx客户端，
+    循环被回收时其客户端随之释放；脚本里每次asyncio.run()结束前应调用aclose()
+    """
+
+    def __init__(
+        self,
+        api_key: Optional[str] = None,
+        base_url: str = PERPLEXITY_BASE_URL,
+        timeout: float = 30.0,
+        max_connections: int = 20,
+        max_keepalive_connections: int = 10,
+        max_retries: int = 3,
+        backoff_base: float = 0.5,
+        backoff_max: float = 8.0,
+    ):
+        self.api_key = api_key or settings.PERPLEXITY_API_KEY
+        self.base_url = base_url.rstrip("/")
+        self.timeout = httpx.Timeout(timeout, connect=10.0)
+        self.limits = httpx.Limits(
+            max_connections=max_connections,
+            max_keepalive_connections=max_keepalive_connections,
+            keepalive_expiry=60.0,
+        )
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+
+        self._clients: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, httpx.AsyncClient]" = (
+            weakref.WeakKeyDictionary()
+        )
+
+        self.stats = {"requests": 0, "retries": 0, "errors": 0}
+        self._latencies_ms = deque(maxlen=1000)
+
+    @property
+    def client(self) -> httpx.AsyncClient:
+        loop = asyncio.get_running_loop()
+        client = self._clients.get(loop)
+        if client is None or client.is_closed:
+            # Loops that were closed without aclose() can no longer close their client; drop them
+            for stale in [other for other in self._clients if other.is_closed()]:
+                del self._clients[stale]
+            client = httpx.AsyncClient(
+                base_url=self.base_url,
+                http2=HTTP2_AVAILABLE,
+                timeout=self.timeout,
+                limits=self.limits,
+                headers={
+                    "Authorization": f"Bearer {self.api_key}",
+                    "Content-Type": "application/json",
+                },
+            )
+            self._clients[loop] = client
+        return client
+
+    def _backoff_delay(self, attempt: int, response: Optional[httpx.Response]) -> float:
+        """Honor Retry-After when the server sends one, otherwise exponential backoff with full jitter"""
+        if response is not None:
+            retry_after = response.headers.get("retry-after")
+            if retry_after:
+                try:
+                    return min(float(retry_after), self.backoff_max)
+                except ValueError:
+                    pass
+        return random.uniform(0, min(self.backoff_max, self.backoff_base * (2 ** attempt)))
+
+    async def chat_completions(self, payload: Dict[str, Any]) -> Dict[str, Any]:
+        """POST /chat/completions with retries on 429/5xx and transport errors; returns the JSON body"""
+        with LLMCall("perplexity", payload.get("model"), request=payload,
+                     messages=len(payload.get("messages", []))) as call:
+            result = await self._post_with_retries(payload, call)
+            call.set_response(result)
+            usage = result.get("usage") or {}
+            call.set_usage(usage.get("prompt_tokens"), usage.get("completion_tokens"), usage.get("total_tokens"))
+            return result
+
+    async def _post_with_retries(self, payload: Dict[str, Any], call: LLMCall) -> Dict[str, Any]:
+        start = time.perf_counter()
+
+        for attempt in range(self.max_retries + 1):
+            response = None
+            try:
+                response = await self.client.post("/chat/completions", json=payload)
+            except (httpx.TimeoutException, httpx.TransportError) as e:
+                if attempt == self.max_retries:
+                    self._record(start, call, attempt, error=True)
+                    raise PerplexityAPIError(f"Perplexity request failed: {e}") from e
+                logger.warning(f"⚠️ Perplexity transport error (attempt {attempt + 1}): {e}")
+            else:
+                if response.status_code == 200:
+                    self._record(start, call, attempt)
+                    return response.json()
+
+                if response.status_code not in RETRYABLE_STATUS_CODES or attempt == self.max_retries:
+                    self._record(start, call, attempt, error=True)
+                    try:
+                        body = response.json()
+                    except ValueError:
+                        body = response.text
+                    raise PerplexityAPIError(
+                        f"Perplexity API returned {response.status_code}",
+                        status_code=response.status_code,
+                        body=body,
+                    )
+                logger.warning(f"⚠️ Perplexity returned {response.status_code} (attempt {attempt + 1}), retrying")
+
+            self.stats["retries"] += 1
+            await asyncio.sleep(self._backoff_delay(attempt, response))
+
+    async def chat(self, messages: List[Dict[str, str]], model: str = "sonar", **params) -> Dict[str, Any]:
+        """Convenience wrapper: build the payload from messages + extra request params"""
+        return await self.chat_completions({"model": model, "messages": messages, **params})
+
+    def _record(self, start: float, call: LLMCall, attempt: int, error: bool = False):
+        """Aggregate stats; the per-call log line is written by LLMCall"""
+        self.stats["requests"] += 1
+        if error:
+            self.stats["errors"] += 1
+        self._latencies_ms.append((time.perf_counter() - start) * 1000)
+        call.fields["retries"] = attempt
+
+    def get_stats(self) -> Dict[str, Any]:
+        latencies = sorted(self._latencies_ms)
+        n = len(latencies)
+        return {
+            **self.stats,
+            "http2": HTTP2_AVAILABLE,
+            "avg_latency_ms": (sum(latencies) / n) if n else 0.0,
+            "p50_latency_ms": latencies[n // 2] if n else 0.0,
+            "p95_latency_ms": latencies[min(n - 1, int(n * 0.95))] if n else 0.0,
+        }
+
+    async def aclose(self):
+        """Close the running loop's connection pool"""
+        client = self._clients.pop(asyncio.get_running_loop(), None)
+        if client is not None and not client.is_closed:
+            await client.aclose()
+
+
+_client: Optional[PerplexityClient] = None
+
+def get_perplexity_client() -> PerplexityClient:
+    """
+    获取共享的Perplexity客户端实例
+    """
+    global _client
+    if _client is None:
+        _client = PerplexityClient()
+        logger.info(f"✅ Created shared Perplexity client (http2={HTTP2_AVAILABLE})")
+    return _client
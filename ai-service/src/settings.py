@@ -18,4 +18,76 @@ class Settings(BaseSettings):
     DATABASE_NAME: str = "ioffer_agent"
     MONGODB_URL: str | None = None
 
+    # Connectors opened by the API lifespan hook; everything else connects on first use.
+    # JSON list in the environment, e.g. STARTUP_CONNECTORS='["postgres", "mongo"]'
+    STARTUP_CONNECTORS: list[str] = ["postgres_async"]
+
+    # GENERAL_QA semantic answer cache
+    QA_CACHE_ENABLED: bool = True
+    QA_CACHE_SIMILARITY_THRESHOLD: float = 0.95
+    QA_CACHE_TTL_SECONDS: int = 86400
+    QA_CACHE_MAX_ENTRIES: int = 5000
+
+    # Perplexity admission-lookup cache (answers change on a timescale of months); relative paths are under ai-service/
+    ADMISSION_CACHE_PATH: str = "data/cache/admission_responses.sqlite3"
+    ADMISSION_CACHE_TTL_SECONDS: int = 30 * 86400
+    ADMISSION_CACHE_STALE_SECONDS: int = 30 * 86400
+
+    # LLM call logging: one structured line per call; payload samples are size-capped,
+    # full request/response dumps only when LLM_LOG_LEVEL is DEBUG
+    LLM_LOG_LEVEL: str = "INFO"
+    LLM_LOG_SAMPLE_RATE: float = 0.0
+    LLM_LOG_MAX_PAYLOAD_CHARS: int = 2000
+
+    # Model gateway limits (per model); 0 disables the requests-per-minute bucket
+    LLM_MAX_CONCURRENCY_PER_MODEL: int = 8
+    LLM_RPM_LIMIT_PER_MODEL: int = 0
+    LLM_MAX_RETRIES: int = 4
+
+    # Content-addressed LLM response cache for workflow stages:
+    # off | readwrite | replay (offline tests from recorded fixtures; misses raise)
+    LLM_CACHE_MODE: str = "readwrite"
+    LLM_CACHE_PATH: str = "data/cache/llm_responses.sqlite3"
+    LLM_CACHE_TTL_SECONDS: int = 7 * 86400
+
+    # Loaded StudentDocuments kept in memory across connections (LRU)
+    SESSION_MAX_PROFILES: int = 1000
+
+    # Prebuilt AutoGen teams per team type: built at startup, held by a WebSocket connection
+    # until it closes, then reset and reused (teams past MAX_SIZE are built and dropped)
+    TEAM_POOL_MAX_SIZE: int = 16
+    TEAM_POOL_WARM_SIZE: int = 1
+
+    # How often the shared RAG index checks its files for a new version (0 disables reloads)
+    RAG_RELOAD_CHECK_SECONDS: float = 60.0
+
+    # Async (asyncpg) pool used by the API handlers for profile reads/writes
+    PG_POOL_SIZE: int = 10
+    PG_MAX_OVERFLOW: int = 20
+    PG_POOL_TIMEOUT_SECONDS: float = 30.0
+
+    # Read-through profile cache (size: SESSION_MAX_PROFILES). Entries expire after the TTL
+    # (bounds staleness for writes made by other services); PROFILE_CACHE_SHARED_PATH
+    # enables a SQLite tier shared by all workers on the host
+    PROFILE_CACHE_TTL_SECONDS: float = 300.0
+    PROFILE_CACHE_SHARED_PATH: str = ""
+
+    # MySQL (question bank used by the GENERAL_QA crawler scripts)
+    MYSQL_HOST: str = "localhost"
+    MYSQL_PORT: int = 3306
+    MYSQL_USER: str = "root"
+    MYSQL_PASSWORD: str = ""
+    MYSQL_DATABASE: str = "ioffer_db"
+    MYSQL_CHARSET: str = "utf8mb4"
+
+    # MySQL connection pool: connections idle longer than PING_AFTER_IDLE are pinged on
+    # checkout (0 = always), ones older than MAX_LIFETIME are reopened; execute_many()
+    # sends batches in chunks of MYSQL_EXECUTE_MANY_CHUNK_SIZE rows
+    MYSQL_POOL_MIN_SIZE: int = 1
+    MYSQL_POOL_MAX_SIZE: int = 10
+    MYSQL_POOL_MAX_LIFETIME_SECONDS: float = 3600.0
+    MYSQL_POOL_WAIT_TIMEOUT_SECONDS: float = 10.0
+    MYSQL_POOL_PING_AFTER_IDLE_SECONDS: float = 0.0
+    MYSQL_EXECUTE_MANY_CHUNK_SIZE: int = 1000
+
 settings = Settings()
@@ -21,9 +21,9 @@ class HybridQAAssistantAgent(AssistantAgent):
     """
     
     def __init__(self, *args, **kwargs):
-        # Initialize the hybrid QA agent first
+        # Share the process-wide hybrid QA agent (FAISS index, pickles) instead of loading a copy per team
         try:
-            self.hybrid_qa = HybridQAAgent()
+            self.hybrid_qa = get_hybrid_qa_agent()
             print("✅ Hybrid QA Agent integrated successfully")
         except Exception as e:
             print(f"❌ Failed to initialize Hybrid QA Agent: {e}")
@@ -46,16 +46,21 @@ When a user asks a question:
 # Global hybrid QA agent instance
 _global_hybrid_qa = None
 
+def get_hybrid_qa_agent() -> HybridQAAgent:
+    """Shared HybridQAAgent; loading its retriever is the expensive part of building a QA team"""
+    global _global_hybrid_qa
+    if _global_hybrid_qa is None:
+        _global_hybrid_qa = HybridQAAgent()
+        print("✅ Global Hybrid QA Agent initialized")
+    return _global_hybrid_qa
+
 async def hybrid_qa_query(question: str) -> str:
     """Query the hybrid QA system with a question"""
-    global _global_hybrid_qa
-    
     try:
         # Initialize the global hybrid QA agent if not already done
         if _global_hybrid_qa is None:
             try:
-                _global_hybrid_qa = HybridQAAgent()
-                print("✅ Global Hybrid QA Agent initialized")
+                get_hybrid_qa_agent()
             except Exception as e:
                 print(f"❌ Failed to initialize Global Hybrid QA Agent: {e}")
                 error_result = {
@@ -0,0 +1,199 @@
+"""
+Shared pool of prebuilt AutoGen teams
+重量级组件（模型客户端、HybridQAAgent的检索器、工具）在进程内只构建一次；团队本身有会话状态，
+不能被并发运行，所以按团队类型池化：借出 -> 运行 -> reset() -> 归还，连接之间复用。
+WebSocket连接通过ConnectionTeams在整个连接期间持有团队，多轮对话上下文（STUDENT_INFO信息提取）
+在消息之间保留，断开时才reset并归还
+"""
+
+import asyncio
+import time
+from collections import deque
+from contextlib import asynccontextmanager
+from typing import Any, Callable, Dict, Optional, Set
+
+from loguru import logger
+
+from src.settings import settings
+
+
+class TeamPool:
+    """Bounded pool of one team type; callers wait when all max_size teams are busy"""
+
+    def __init__(self, name: str, factory: Callable[[], Any], max_size: int):
+        self.name = name
+        self.factory = factory
+        self.max_size = max_size
+        self._idle: deque = deque()
+        self._size = 0  # pooled teams alive (idle + in use)
+        self._overflow: Set[int] = set()  # id() of leased teams built past max_size
+        self._condition: Optional[asyncio.Condition] = None
+        self.stats = {"created": 0, "reused": 0, "waits": 0, "discarded": 0, "overflow": 0, "wait_ms_total": 0.0}
+
+    @property
+    def condition(self) -> asyncio.Condition:
+        if self._condition is None:
+            self._condition = asyncio.Condition()
+        return self._condition
+
+    def _create(self) -> Any:
+        team = self.factory()
+        self._size += 1
+        self.stats["created"] += 1
+        return team
+
+    async def warm(self, count: int):
+        """
+        Prebuild idle teams (at startup) so the first requests do not pay construction cost.
+        Teams are built in a worker thread so the event loop keeps serving while the pool fills
+        """
+        while self._size < min(count, self.max_size):
+            # Reserve the slot first so lease()/_checkout() calls meanwhile stay within max_size
+            self._size += 1
+            try:
+                team = await asyncio.to_thread(self.factory)
+            except BaseException:
+                self._size -= 1
+                raise
+            self.stats["created"] += 1
+            async with self.condition:
+                self._idle.append(team)
+                self.condition.notify()
+
+    async def _checkout(self) -> Any:
+        async with self.condition:
+            if not self._idle and self._size >= self.max_size:
+                self.stats["waits"] += 1
+                queued_at = time.perf_counter()
+                await self.condition.wait_for(lambda: self._idle or self._size < self.max_size)
+                self.stats["wait_ms_total"] += (time.perf_counter() - queued_at) * 1000
+            if self._idle:
+                self.stats["reused"] += 1
+                return self._idle.popleft()
+            return self._create()
+
+    async def lease(self) -> Any:
+        """
+        Check out a team for a long-lived holder (one connection). Never waits: when all
+        max_size teams are held, an overflow team is built and dropped again on check-in
+        """
+        async with self.condition:
+            if self._idle:
+                self.stats["reused"] += 1
+                return self._idle.popleft()
+            if self._size < self.max_size:
+                return self._create()
+            team = self.factory()
+            self._overflow.add(id(team))
+            self.stats["overflow"] += 1
+            return team
+
+    async def _checkin(self, team: Any):
+        # Clear the conversation so the next borrower starts fresh; a team that cannot be
+        # reset (e.g. cancelled mid-run) is dropped and rebuilt on demand
+        try:
+            await team.reset()
+            reusable = True
+        except Exception as e:
+            logger.warning(f"Discarding {self.name} team that failed to reset: {type(e).__name__}: {e}")
+            reusable = False
+
+        async with self.condition:
+            if id(team) in self._overflow:
+                self._overflow.discard(id(team))
+                return
+            if reusable:
+                self._idle.append(team)
+            else:
+                self._size -= 1
+                self.stats["discarded"] += 1
+            self.condition.notify()
+
+    @asynccontextmanager
+    async def acquire(self):
+        team = await self._checkout()
+        try:
+            yield team
+        finally:
+            # Shielded so a cancelled request still returns its team to the pool
+            await asyncio.shield(self._checkin(team))
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            **self.stats,
+            "size": self._size,
+            "idle": len(self._idle),
+            "in_use": self._size - len(self._idle),
+            "overflow_in_use": len(self._overflow),
+            "max_size": self.max_size,
+        }
+
+
+class ConnectionTeams:
+    """
+    Teams held by one WebSocket connection: each team type is leased on first use and kept
+    for the whole connection, so the conversation carries over between messages
+    """
+
+    def __init__(self, registry: "TeamPoolRegistry"):
+        self.registry = registry
+        self._teams: Dict[str, Any] = {}
+
+    async def get(self, team_key: str) -> Any:
+        team = self._teams.get(team_key)
+        if team is None:
+            team = await self.registry.pools[team_key].lease()
+            self._teams[team_key] = team
+        return team
+
+    async def reset(self, team_key: str):
+        """Return the team (e.g. after a failed or cancelled run); the next get() starts a fresh conversation"""
+        team = self._teams.pop(team_key, None)
+        if team is not None:
+            await self.registry.pools[team_key]._checkin(team)
+
+    async def release(self):
+        """Reset and return every held team (on disconnect)"""
+        for team_key in list(self._teams):
+            await self.reset(team_key)
+
+
+class TeamPoolRegistry:
+    def __init__(self, factories: Dict[str, Callable[[], Any]], max_size: int):
+        self.pools = {name: TeamPool(name, factory, max_size) for name, factory in factories.items()}
+
+    def acquire(self, team_key: str):
+        return self.pools[team_key].acquire()
+
+    def for_connection(self) -> ConnectionTeams:
+        return ConnectionTeams(self)
+
+    async def warm(self, count: int):
+        for pool in self.pools.values():
+            await pool.warm(count)
+
+    def get_stats(self) -> Dict[str, Dict[str, Any]]:
+        return {name: pool.get_stats() for name, pool in self.pools.items()}
+
+
+_registry: Optional[TeamPoolRegistry] = None
+
+def get_team_pool() -> TeamPoolRegistry:
+    """
+    获取共享的团队池（STUDENT_INFO / SCHOOL_RECOMMENDATION / GENERAL_QA）
+    """
+    global _registry
+    if _registry is None:
+        from src.teams.hybrid_qa_team import create_hybrid_qa_team
+        from src.teams.school_rec_teams import create_school_rec_team
+        from src.teams.student_info_team import create_student_info_team
+
+        _registry = TeamPoolRegistry(
+            {
+                "STUDENT_INFO": create_student_info_team,
+                "SCHOOL_RECOMMENDATION": create_school_rec_team,
+                "GENERAL_QA": create_hybrid_qa_team,
+            },
+            max_size=settings.TEAM_POOL_MAX_SIZE,
+        )
+    return _registry
@@ -0,0 +1,162 @@
+"""
+Persistent cache for Perplexity admission lookups
+Admission pages change on a timescale of months, so answers are kept in a local
+SQLite file keyed by the normalized (university, program, degree_type, model,
+prompt version). Stale entries are served immediately while a background task
+refreshes them.
+"""
+
+import asyncio
+import hashlib
+import os
+import re
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Awaitable, Callable, Dict, Optional, Tuple
+
+from loguru import logger
+
+from src.settings import settings
+
+# Bump whenever the admission / program-check prompts change so old answers are not reused
+ADMISSION_PROMPT_VERSION = 1
+
+_NON_WORD = re.compile(r"[^\w]+")
+
+# ai-service/; relative ADMISSION_CACHE_PATH values resolve here so the server and scripts share one file
+PROJECT_ROOT = Path(__file__).resolve().parents[2]
+
+
+def normalize_field(value: Optional[str]) -> str:
+    """Case-fold and collapse punctuation/whitespace ("Univ. of  Oxford" == "univ of oxford")"""
+    return _NON_WORD.sub(" ", (value or "").casefold()).strip()
+
+
+class AdmissionResponseCache:
+    def __init__(self, path: str, ttl_seconds: float, stale_seconds: float):
+        self.path = path
+        self.ttl_seconds = ttl_seconds
+        self.stale_seconds = stale_seconds
+        # False -> stale entries are re-fetched inline (warm-up jobs, where background tasks would not outlive the run)
+        self.serve_stale = True
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS responses (
+                key TEXT PRIMARY KEY,
+                kind TEXT NOT NULL,
+                university TEXT NOT NULL,
+                program TEXT NOT NULL,
+                degree_type TEXT NOT NULL,
+                model TEXT NOT NULL,
+                prompt_version INTEGER NOT NULL,
+                response TEXT NOT NULL,
+                fetched_at REAL NOT NULL
+            )
+            """
+        )
+        self._conn.commit()
+        self._lock = threading.Lock()
+        self._refreshing: Dict[str, asyncio.Task] = {}
+        self.stats = {"hits": 0, "stale_hits": 0, "misses": 0, "refreshes": 0, "refresh_errors": 0}
+
+    @staticmethod
+    def make_key(kind: str, university: str, program: str, degree_type: str = "", model: str = "",
+                 extra: str = "") -> str:
+        parts = [kind, normalize_field(university), normalize_field(program), normalize_field(degree_type),
+                 model, str(ADMISSION_PROMPT_VERSION), extra]
+        return hashlib.sha256("\x1f".join(parts).encode("utf-8")).hexdigest()
+
+    def get(self, key: str) -> Optional[Tuple[str, float]]:
+        """Return (response, age_seconds) or None"""
+        with self._lock:
+            row = self._conn.execute("SELECT response, fetched_at FROM responses WHERE key = ?", (key,)).fetchone()
+        if row is None:
+            return None
+        return row[0], time.time() - row[1]
+
+    def set(self, key: str, response: str, kind: str, university: str, program: str,
+            degree_type: str = "", model: str = ""):
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (key, kind, normalize_field(university), normalize_field(program), normalize_field(degree_type),
+                 model, ADMISSION_PROMPT_VERSION, response, time.time()),
+            )
+            self._conn.commit()
+
+    def invalidate(self, university: Optional[str] = None) -> int:
+        """Drop cached answers for one university, or everything when no university is given"""
+        with self._lock:
+            if university:
+                cursor = self._conn.execute("DELETE FROM responses WHERE university = ?", (normalize_field(university),))
+            else:
+                cursor = self._conn.execute("DELETE FROM responses")
+            self._conn.commit()
+            return cursor.rowcount
+
+    async def get_or_fetch(self, key: str, fetch: Callable[[], Awaitable[str]], kind: str, university: str,
+                           program: str, degree_type: str = "", model: str = "") -> str:
+        """
+        Fresh entry -> cached answer. Stale (within the stale window) -> cached answer now,
+        refreshed in the background, or re-fetched inline when serve_stale is off.
+        Missing/expired -> fetch and store.
+        SQLite reads/writes (fsync on commit) run in a worker thread so the event loop is not blocked.
+        """
+        cached = await asyncio.to_thread(self.get, key)
+        if cached is not None:
+            response, age = cached
+            if age < self.ttl_seconds:
+                self.stats["hits"] += 1
+                return response
+            if self.serve_stale and age < self.ttl_seconds + self.stale_seconds:
+                self.stats["stale_hits"] += 1
+                self._schedule_refresh(key, fetch, kind, university, program, degree_type, model)
+                return response
+
+        self.stats["misses"] += 1
+        response = await fetch()
+        await asyncio.to_thread(self.set, key, response, kind, university, program, degree_type, model)
+        return response
+
+    def _schedule_refresh(self, key: str, fetch: Callable[[], Awaitable[str]], *meta):
+        if key in self._refreshing:
+            return
+
+        async def refresh():
+            try:
+                response = await fetch()
+                await asyncio.to_thread(self.set, key, response, *meta)
+                self.stats["refreshes"] += 1
+                logger.info(f"Refreshed stale admission cache entry: {meta[1]} / {meta[2]}")
+            except Exception as e:
+                self.stats["refresh_errors"] += 1
+                logger.warning(f"Admission cache refresh failed for {meta[1]} / {meta[2]}: {e}")
+            finally:
+                self._refreshing.pop(key, None)
+
+        self._refreshing[key] = asyncio.create_task(refresh())
+
+    def get_stats(self) -> Dict[str, int]:
+        with self._lock:
+            entries = self._conn.execute("SELECT COUNT(*) FROM responses").fetchone()[0]
+        return {**self.stats, "entries": entries, "refreshing": len(self._refreshing)}
+
+
+_cache: Optional[AdmissionResponseCache] = None
+
+def get_admission_cache() -> AdmissionResponseCache:
+    global _cache
+    if _cache is None:
+        _cache = AdmissionResponseCache(
+            str(PROJECT_ROOT / settings.ADMISSION_CACHE_PATH),
+            ttl_seconds=settings.ADMISSION_CACHE_TTL_SECONDS,
+            stale_seconds=settings.ADMISSION_CACHE_STALE_SECONDS,
+        )
+    return _cache
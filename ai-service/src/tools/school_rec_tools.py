@@ -1,10 +1,10 @@
-import requests
-from src.settings import settings
-import pandas as pd
+from src.model_client.perplexity_client import get_perplexity_client
+from src.tools.admission_cache import get_admission_cache
 from autogen_core.tools import FunctionTool
 from src.domain.sql_models import QSRanking
 from src.infrastructure.db.sql import SQLDatabaseConnector
-from src.utils.session_manager import get_current_profile, init_session
+from src.utils.session_manager import get_current_profile, init_session, session_tool
+from src.utils.cancellation import OperationCancelled, run_cancellable_subprocess
 from src.domain.students_prediction import (
     StudentTagInfo, GPALevel, PaperLevel, LanguageLevel, GRELevel,
     ResearchLevel, CollegeLevel, RecommendationLevel, NetworkingLevel, InterestField
@@ -14,17 +14,17 @@ from sqlalchemy.orm import sessionmaker
 from sqlalchemy import select
 from src.domain.qs_models import QSSubjectQuery
 import sys
+import functools
 import json
-import joblib
-import numpy as np
+import hashlib
 
+PERPLEXITY_TOOL_MODEL = "sonar-pro"
 
-def perplexity_search(prompt: list[dict[str, str]]):
 
-    url = "https://api.perplexity.ai/chat/completions"
+async def perplexity_search(prompt: list[dict[str, str]]):
 
     payload = {
-        "model": "sonar-pro",
+        "model": PERPLEXITY_TOOL_MODEL,
         "messages": prompt,
         "web_search_options": {
             "search_context_size": "high"
@@ -32,16 +32,12 @@ def perplexity_search(prompt: list[dict[str, str]]):
         "search_recency_filter": "month",
         "temperature": 0.0
     }
-    headers = {
-        "Authorization": f"Bearer {settings.PERPLEXITY_API_KEY}",
-        "Content-Type": "application/json"
-    }
 
-    response = requests.request("POST", url, json=payload, headers=headers)
+    response = await get_perplexity_client().chat_completions(payload)
     
-    return response.json()["choices"][0]["message"]["content"]
+    return response["choices"][0]["message"]["content"]
 
-def check_addmission_requirement(university: str, program: str):
+async def check_addmission_requirement(university: str, program: str):
     """
     Get the admission requirement for a program in a university
     """
@@ -50,10 +46,15 @@ def check_addmission_requirement(university: str, program: str):
         {"role": "user", "content": f"What are the admission requirements for {program} at {university}?"}
     ]
 
-    return perplexity_search(prompt)
+    cache = get_admission_cache()
+    key = cache.make_key("admission_requirement", university, program, model=PERPLEXITY_TOOL_MODEL)
+    return await cache.get_or_fetch(
+        key, lambda: perplexity_search(prompt),
+        "admission_requirement", university, program, model=PERPLEXITY_TOOL_MODEL
+    )
 
 
-def check_program_in_university(university: str, program: str, student_addmission_info: str, degree_type: str):
+async def check_program_in_university(university: str, program: str, student_addmission_info: str, degree_type: str):
     """
     Check if the program is offered in the university that the student can apply to
     """
@@ -63,7 +64,14 @@ def check_program_in_university(university: str, program: str, student_addmissio
         {"role": "user", "content": f"{content} {student_addmission_info}"}
     ]
 
-    return perplexity_search(prompt)
+    # The answer depends on the student's profile, so it is part of the key
+    profile_digest = hashlib.sha256((student_addmission_info or "").encode("utf-8")).hexdigest()
+    cache = get_admission_cache()
+    key = cache.make_key("program_check", university, program, degree_type, PERPLEXITY_TOOL_MODEL, profile_digest)
+    return await cache.get_or_fetch(
+        key, lambda: perplexity_search(prompt),
+        "program_check", university, program, degree_type, PERPLEXITY_TOOL_MODEL
+    )
 
 
 def get_qs_ranking(query: QSSubjectQuery):
@@ -79,6 +87,21 @@ def get_qs_ranking(query: QSSubjectQuery):
     qs_ranking = result.scalars().all()
     return [q.institution for q in qs_ranking]
 
+def get_top_qs_institutions(subject: str, top_n: int) -> list[str]:
+    """
+    Get the top-N institutions for a QS subject, best rank first
+    """
+    connector = SQLDatabaseConnector()
+    Session = sessionmaker(bind=connector)
+    with Session() as session:
+        stmt = (
+            select(QSRanking.institution)
+            .where(QSRanking.subject == subject, QSRanking.rank_2025_start.is_not(None))
+            .order_by(QSRanking.rank_2025_start)
+            .limit(top_n)
+        )
+        return list(session.execute(stmt).scalars().all())
+
 def get_user_application_details():
     """
     Get the user's program interest
@@ -147,6 +170,8 @@ def extract_test_scores_from_profile(profile):
     """
     Extract numerical test scores from user profile
     """
+    import numpy as np
+
     scores = {
         "gpa": np.nan,
         "gre": np.nan, 
@@ -197,6 +222,10 @@ def extract_test_scores_from_profile(profile):
     return scores
 
 def get_prediction(student_info: StudentTagInfo):
+    # pandas/numpy are only needed here; importing them lazily keeps module import cheap
+    import numpy as np
+    import pandas as pd
+
     print("Getting prediction", flush=True)
     profile = get_current_profile()
     print("[pred] loading features csv", flush=True)
@@ -298,7 +327,6 @@ def get_prediction(student_info: StudentTagInfo):
     # Offload predict to isolated subprocess to avoid native segfaults
     print("[pred] spawning predict worker", flush=True)
     import tempfile
-    import subprocess
     from pathlib import Path
     with tempfile.TemporaryDirectory() as tmpdir:
         features_path = Path(tmpdir) / "features.csv"
@@ -310,7 +338,10 @@ def get_prediction(student_info: StudentTagInfo):
             "--features-csv", str(features_path),
         ]
         try:
-            proc = subprocess.run(cmd, capture_output=True, text=True, timeout=60)
+            # Killed early if the requesting client disconnects
+            proc = run_cancellable_subprocess(cmd, timeout=60)
+        except OperationCancelled:
+            raise
         except Exception as e:
             raise RuntimeError(f"Predict subprocess failed to start: {type(e).__name__}: {e}")
         if proc.returncode != 0:
@@ -333,33 +364,47 @@ def get_prediction(student_info: StudentTagInfo):
 
 
 
+# Tools are stateless, so each FunctionTool is built once and shared by every team.
+# Profile tools are sync and read the per-connection session; session_tool runs them in a
+# worker thread that still sees it
+
+@functools.lru_cache(maxsize=None)
 def get_prediction_tool():
-    return FunctionTool(get_prediction, description="Get the prediction for the user's profile")
+    return FunctionTool(session_tool(get_prediction), description="Get the prediction for the user's profile")
 
+@functools.lru_cache(maxsize=None)
 def get_user_work_experience_tool():
-    return FunctionTool(get_user_work_experience, description="Get the user's work experience")
+    return FunctionTool(session_tool(get_user_work_experience), description="Get the user's work experience")
 
+@functools.lru_cache(maxsize=None)
 def get_user_target_country_tool():
-    return FunctionTool(get_user_target_country, description="Get the user's target country")
+    return FunctionTool(session_tool(get_user_target_country), description="Get the user's target country")
 
+@functools.lru_cache(maxsize=None)
 def get_user_application_details_tool():
-    return FunctionTool(get_user_application_details, description="Get the user's program interest")
+    return FunctionTool(session_tool(get_user_application_details), description="Get the user's program interest")
 
+@functools.lru_cache(maxsize=None)
 def get_complete_user_profile_tool():
-    return FunctionTool(get_complete_user_profile, name="get_complete_user_profile", description="Get the complete user profile as JSON format")
+    return FunctionTool(session_tool(get_complete_user_profile), name="get_complete_user_profile", description="Get the complete user profile as JSON format")
 
+@functools.lru_cache(maxsize=None)
 def get_user_basic_information_tool():
-    return FunctionTool(get_user_basic_information, description="Get the user's basic information (name, contact, nationality)")
+    return FunctionTool(session_tool(get_user_basic_information), description="Get the user's basic information (name, contact, nationality)")
 
+@functools.lru_cache(maxsize=None)
 def get_user_education_background_tool():
-    return FunctionTool(get_user_education_background, description="Get the user's education background and academic history")
+    return FunctionTool(session_tool(get_user_education_background), description="Get the user's education background and academic history")
 
+@functools.lru_cache(maxsize=None)
 def get_user_language_proficiency_tool():
-    return FunctionTool(get_user_language_proficiency, description="Get the user's language proficiency test scores")
+    return FunctionTool(session_tool(get_user_language_proficiency), description="Get the user's language proficiency test scores")
 
+@functools.lru_cache(maxsize=None)
 def get_preplexity_tool():
     return FunctionTool(check_addmission_requirement, description="Get the admission requirement for a program in a university")
 
+@functools.lru_cache(maxsize=None)
 def get_qs_ranking_tool():
     return FunctionTool(get_qs_ranking, description="Get the QS ranking for a program in a university")
 
@@ -469,6 +514,7 @@ def create_sample_student_tag_info() -> StudentTagInfo:
     return student_tag_info
 
 
+@functools.lru_cache(maxsize=None)
 def get_program_in_university_tool():
     return FunctionTool(check_program_in_university, description="Check if the program is offered in the university that the student can apply to")
 
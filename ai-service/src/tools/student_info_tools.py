@@ -14,8 +14,9 @@ from src.domain.students import (
     LanguageProficiencyItem,
     StandardizedTest,
 )
-from src.utils.session_manager import get_current_profile
+from src.utils.session_manager import get_current_profile, session_tool
 from pydantic import BaseModel
+import functools
 import json
 from google import genai
 
@@ -145,13 +146,15 @@ def extract_info_from_source(source:str) -> dict:
     extracted_info = InfoExtractionTool(source).run()
     return extracted_info
 
+@functools.lru_cache(maxsize=None)
 def get_update_student_information_tool():
     return FunctionTool(
         name="update_student_information",
-        func=update_student_information,
+        func=session_tool(update_student_information),
         description="Updates the student information in the database."
     )
 
+@functools.lru_cache(maxsize=None)
 def get_extract_student_information_tool():
     return FunctionTool(
         name="extract_student_information",
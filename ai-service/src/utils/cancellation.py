@@ -0,0 +1,89 @@
+"""
+Cooperative cancellation for work that asyncio cannot cancel
+asyncio的取消无法传递到线程池中的阻塞调用（如预测子进程），这里用contextvar携带一个取消令牌，
+线程中的代码通过 current_cancellation() 轮询；同时统计因取消而节省的工作量
+"""
+
+import subprocess
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Dict, List, Optional
+
+
+class OperationCancelled(Exception):
+    """Raised by blocking helpers when the current request has been cancelled"""
+
+
+class CancellationToken:
+    def __init__(self):
+        self._event = threading.Event()
+
+    def cancel(self):
+        self._event.set()
+
+    @property
+    def cancelled(self) -> bool:
+        return self._event.is_set()
+
+    def raise_if_cancelled(self):
+        if self.cancelled:
+            raise OperationCancelled("operation cancelled")
+
+
+_current_token: ContextVar[Optional[CancellationToken]] = ContextVar("cancellation_token", default=None)
+
+
+def current_cancellation() -> Optional[CancellationToken]:
+    return _current_token.get()
+
+
+@contextmanager
+def cancellation_scope(token: CancellationToken):
+    """Tasks created (and executor calls made with a copied context) inside the block see this token"""
+    reset = _current_token.set(token)
+    try:
+        yield token
+    finally:
+        _current_token.reset(reset)
+
+
+# 进程级计数：断开连接时取消的运行、DAG阶段、被终止的子进程等
+_stats: Counter = Counter()
+_stats_lock = threading.Lock()
+
+
+def record_cancellation(metric: str, amount: float = 1):
+    with _stats_lock:
+        _stats[metric] += amount
+
+
+def get_cancellation_stats() -> Dict[str, float]:
+    with _stats_lock:
+        return {key: round(value, 3) if isinstance(value, float) else value for key, value in _stats.items()}
+
+
+def run_cancellable_subprocess(cmd: List[str], timeout: float, poll_interval: float = 0.25) -> subprocess.CompletedProcess:
+    """
+    subprocess.run(capture_output=True, text=True, timeout=...) that also kills the child
+    as soon as the current cancellation token fires
+    """
+    token = current_cancellation()
+    deadline = time.monotonic() + timeout
+    proc = subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True)
+    while True:
+        try:
+            stdout, stderr = proc.communicate(timeout=poll_interval)
+            return subprocess.CompletedProcess(cmd, proc.returncode, stdout, stderr)
+        except subprocess.TimeoutExpired:
+            if token is not None and token.cancelled:
+                proc.kill()
+                proc.communicate()
+                record_cancellation("subprocesses_killed")
+                raise OperationCancelled(f"subprocess cancelled: {cmd[1] if len(cmd) > 1 else cmd[0]}")
+            if time.monotonic() >= deadline:
+                proc.kill()
+                proc.communicate()
+                raise subprocess.TimeoutExpired(cmd, timeout)
@@ -1,21 +1,36 @@
 """
-Simple Session Manager for User Profile Management
-Global variable approach for storing user profile across agents
+Session Manager for User Profile Management
+Each connection/request has its own session in a ContextVar, so concurrent users never see
+each other's profile. Loaded profiles are kept in the process-wide profile_cache
+(namespace "mongo"), which StudentDocument writes invalidate.
 """
 
-from typing import Optional
+import asyncio
+import functools
+from contextvars import ContextVar
+from dataclasses import dataclass
+from typing import Callable, Optional
 from loguru import logger
+from src.domain.profile_cache import get_profile_cache, version_stamp
 from src.domain.students import StudentDocument
 
-# Simple session store using global variable
-current_session = {
-    "user_profile": None,
-    "user_id": None
-}
+
+@dataclass
+class Session:
+    user_id: str
+    user_profile: StudentDocument
+
+
+# The session of the current connection/request. asyncio tasks inherit it when created;
+# sync tools running in a thread pool need session_tool() to carry it over.
+_current_session: ContextVar[Optional[Session]] = ContextVar("current_session", default=None)
+
 
 def init_session(user_id: str) -> StudentDocument:
     """
-    Initialize a session with user profile.
+    Initialize the session of the current connection/request with the user's profile.
+    Call it from the connection's own task (e.g. the WebSocket handler) so that
+    everything started from there sees this session.
     
     Args:
         user_id: The user ID for the session
@@ -24,12 +39,20 @@ def init_session(user_id: str) -> StudentDocument:
         StudentDocument instance for the session
     """
     logger.info(f"Initializing session for user: {user_id}")
-    
-    current_session["user_id"] = user_id
-    current_session["user_profile"] = StudentDocument.create_session_profile(user_id)
-    
+
+    def load():
+        profile = StudentDocument.create_session_profile(user_id)
+        return profile, version_stamp(profile.updatedAt)
+
+    profile = get_profile_cache().load(StudentDocument.CACHE_NAMESPACE, user_id, StudentDocument, load)
+
+    _current_session.set(Session(user_id=user_id, user_profile=profile))
+
     logger.info(f"Session initialized successfully for user: {user_id}")
-    return current_session["user_profile"]
+    return profile
+
+def get_current_session() -> Optional[Session]:
+    return _current_session.get()
 
 def get_current_profile() -> Optional[StudentDocument]:
     """
@@ -38,7 +61,8 @@ def get_current_profile() -> Optional[StudentDocument]:
     Returns:
         StudentDocument instance or None if no session active
     """
-    return current_session["user_profile"]
+    session = _current_session.get()
+    return session.user_profile if session else None
 
 def get_current_user_id() -> Optional[str]:
     """
@@ -47,7 +71,19 @@ def get_current_user_id() -> Optional[str]:
     Returns:
         User ID string or None if no session active
     """
-    return current_session["user_id"]
+    session = _current_session.get()
+    return session.user_id if session else None
+
+def session_tool(func: Callable) -> Callable:
+    """
+    Wrap a sync tool function for FunctionTool so it runs in a worker thread *with* the
+    caller's session. AutoGen runs sync tools via run_in_executor, which does not copy
+    contextvars; asyncio.to_thread does.
+    """
+    @functools.wraps(func)
+    async def wrapper(*args, **kwargs):
+        return await asyncio.to_thread(func, *args, **kwargs)
+    return wrapper
 
 def update_profile(**updates) -> bool:
     """
@@ -88,20 +124,9 @@ def update_basic_info(**basic_info_updates) -> bool:
         return False
     
     try:
-        # Update basic information fields
-        for key, value in basic_info_updates.items():
-            if hasattr(profile.basicInformation, key):
-                setattr(profile.basicInformation, key, value)
-        
-        # Save to database
-        from src.infrastructure.db.mongo import connection
-        from src.settings import settings
-        _database = connection.get_database(settings.DATABASE_NAME)
-        collection = _database[profile.get_collection_name()]
-        collection.replace_one(
-            {"user_id": profile.user_id}, 
-            profile.to_mongo()
-        )
+        # Update basic information fields and save to database
+        if profile.update_basic_info(**basic_info_updates) is None:
+            return False
         
         logger.info("Basic information updated successfully")
         return True
@@ -109,11 +134,13 @@ def update_basic_info(**basic_info_updates) -> bool:
         logger.error(f"Failed to update basic information: {e}")
         return False
 
-def clear_session() -> None:
-    """Clear the current session."""
+def clear_session(evict: bool = False) -> None:
+    """Clear the current session; evict=True also drops the cached profile."""
     logger.info("Clearing session")
-    current_session["user_profile"] = None
-    current_session["user_id"] = None
+    session = _current_session.get()
+    if evict and session:
+        get_profile_cache().invalidate(StudentDocument.CACHE_NAMESPACE, session.user_id)
+    _current_session.set(None)
 
 def is_session_active() -> bool:
     """
@@ -122,7 +149,7 @@ def is_session_active() -> bool:
     Returns:
         True if session is active, False otherwise
     """
-    return current_session["user_profile"] is not None
+    return get_current_profile() is not None
 
 # Convenience functions for common operations
 def get_user_name() -> str:
@@ -1,4 +1,3 @@
-import xgboost
 from src.agents.orchestrating_agent import get_orchestrating_agent
 from src.teams.student_info_team import create_student_info_team
 from src.teams.school_rec_teams import create_school_rec_team
@@ -0,0 +1,202 @@
+"""
+轻量DAG执行器
+节点在依赖完成后立即启动，无依赖关系的节点并发执行；阻塞型节点放到线程池；
+每个节点独立超时，并记录状态与耗时；可选on_event回调实时接收节点开始/结束事件
+"""
+import asyncio
+import contextvars
+import time
+from concurrent.futures import Executor
+from dataclasses import dataclass, field
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple, Type
+
+from src.utils.cancellation import record_cancellation
+
+
+@dataclass
+class DAGNode:
+    """
+    func(results) 接收已完成依赖的结果 {节点名: 值}。
+    blocking=True 时 func 是普通函数，在线程池中执行；否则为协程函数。
+    fallback(error) 在失败/超时时提供替代值，使下游节点继续执行。
+    condition(results) 返回False时跳过该节点（如本科生跳过项目匹配），下游照常执行。
+    """
+    name: str
+    func: Callable[[Dict[str, Any]], Any]
+    deps: Tuple[str, ...] = ()
+    timeout: Optional[float] = None
+    blocking: bool = False
+    fallback: Optional[Callable[[BaseException], Any]] = None
+    condition: Optional[Callable[[Dict[str, Any]], bool]] = None
+
+
+@dataclass
+class NodeResult:
+    name: str
+    status: str = "pending"  # ok / error / timeout / skipped / blocked / cancelled
+    value: Any = None
+    error: Optional[str] = None
+    fallback_used: bool = False
+    started_ms: float = 0.0  # 相对于DAG开始的时间
+    latency_ms: float = 0.0
+
+    @property
+    def usable(self) -> bool:
+        """下游节点能否继续：成功、按条件跳过，或失败但已使用fallback"""
+        return self.status in ("ok", "skipped") or self.fallback_used
+
+
+@dataclass
+class DAGRun:
+    results: Dict[str, NodeResult] = field(default_factory=dict)
+    total_ms: float = 0.0
+
+    def value(self, name: str, default: Any = None) -> Any:
+        result = self.results.get(name)
+        return result.value if result is not None and result.value is not None else default
+
+    def report(self) -> str:
+        lines = [f"{'节点':<24}{'状态':<10}{'开始(ms)':>10}{'耗时(ms)':>10}"]
+        for result in sorted(self.results.values(), key=lambda r: r.started_ms):
+            lines.append(f"{result.name:<24}{result.status:<10}{result.started_ms:>10.0f}{result.latency_ms:>10.0f}")
+        lines.append(f"{'total':<24}{'':<10}{'':>10}{self.total_ms:>10.0f}")
+        return "\n".join(lines)
+
+
+# on_event({"event": "stage_started" | "stage_finished", "stage": ..., ...})
+# 回调抛出的异常（如WebSocket已断开）会取消整个DAG
+EventCallback = Callable[[Dict[str, Any]], Awaitable[None]]
+
+
+class DAGExecutor:
+    def __init__(self, nodes: List[DAGNode], executor: Optional[Executor] = None,
+                 on_event: Optional[EventCallback] = None,
+                 fatal_errors: Tuple[Type[BaseException], ...] = ()):
+        self.nodes = {node.name: node for node in nodes}
+        self.executor = executor  # None -> 事件循环默认线程池
+        self.on_event = on_event
+        # 这些异常不走fallback，直接取消其余节点并由run()抛出（如replay模式的LLMCacheMiss）
+        self.fatal_errors = fatal_errors
+        self._validate()
+
+    def _validate(self):
+        for node in self.nodes.values():
+            for dep in node.deps:
+                if dep not in self.nodes:
+                    raise ValueError(f"Node '{node.name}' depends on unknown node '{dep}'")
+        # 检测环
+        visiting, done = set(), set()
+
+        def visit(name: str):
+            if name in done:
+                return
+            if name in visiting:
+                raise ValueError(f"Cycle detected at node '{name}'")
+            visiting.add(name)
+            for dep in self.nodes[name].deps:
+                visit(dep)
+            visiting.discard(name)
+            done.add(name)
+
+        for name in self.nodes:
+            visit(name)
+
+    async def run(self) -> DAGRun:
+        run = DAGRun(results={name: NodeResult(name) for name in self.nodes})
+        start = time.perf_counter()
+        tasks: Dict[str, asyncio.Task] = {}
+
+        def get_task(name: str) -> asyncio.Task:
+            if name not in tasks:
+                tasks[name] = asyncio.ensure_future(self._run_node(self.nodes[name], run, start, get_task))
+            return tasks[name]
+
+        for name in self.nodes:
+            get_task(name)
+
+        try:
+            await asyncio.gather(*tasks.values())
+        except BaseException as e:
+            # 取消（如客户端断开）或致命错误时，停止所有尚未完成的节点
+            for task in tasks.values():
+                task.cancel()
+            if isinstance(e, self.fatal_errors):
+                raise
+            record_cancellation("dag_runs_cancelled")
+            record_cancellation("dag_stages_cancelled", sum(
+                1 for result in run.results.values() if result.status in ("pending", "cancelled")
+            ))
+            raise
+        finally:
+            run.total_ms = (time.perf_counter() - start) * 1000
+
+        return run
+
+    async def _run_node(self, node: DAGNode, run: DAGRun, dag_start: float, get_task) -> None:
+        result = run.results[node.name]
+        if node.deps:
+            await asyncio.gather(*(get_task(dep) for dep in node.deps))
+
+        failed_deps = [dep for dep in node.deps if not run.results[dep].usable]
+        values = {dep: run.results[dep].value for dep in node.deps}
+        if failed_deps:
+            result.status = "blocked"
+            result.error = f"upstream failed: {', '.join(failed_deps)}"
+            await self._emit_finished(result)
+            return
+        if node.condition is not None and not node.condition(values):
+            result.status = "skipped"
+            await self._emit_finished(result)
+            return
+
+        node_start = time.perf_counter()
+        result.started_ms = (node_start - dag_start) * 1000
+        await self._emit({"event": "stage_started", "stage": node.name})
+        try:
+            if node.blocking:
+                # 复制contextvars，线程中的代码仍能看到当前请求的上下文
+                loop = asyncio.get_running_loop()
+                context = contextvars.copy_context()
+                coro = loop.run_in_executor(self.executor, context.run, node.func, values)
+            else:
+                coro = node.func(values)
+            result.value = await asyncio.wait_for(coro, timeout=node.timeout)
+            result.status = "ok"
+        except asyncio.TimeoutError as e:
+            result.status = "timeout"
+            result.error = f"timed out after {node.timeout}s"
+            self._apply_fallback(node, result, e)
+        except asyncio.CancelledError:
+            result.status = "cancelled"
+            raise
+        except self.fatal_errors as e:
+            result.status = "error"
+            result.error = f"{type(e).__name__}: {e}"
+            raise
+        except Exception as e:
+            result.status = "error"
+            result.error = f"{type(e).__name__}: {e}"
+            self._apply_fallback(node, result, e)
+        finally:
+            result.latency_ms = (time.perf_counter() - node_start) * 1000
+        await self._emit_finished(result)
+
+    async def _emit(self, event: Dict[str, Any]):
+        if self.on_event is not None:
+            await self.on_event(event)
+
+    async def _emit_finished(self, result: NodeResult):
+        await self._emit({
+            "event": "stage_finished",
+            "stage": result.name,
+            "status": result.status,
+            "error": result.error,
+            "fallback_used": result.fallback_used,
+            "latency_ms": round(result.latency_ms, 1),
+        })
+
+    @staticmethod
+    def _apply_fallback(node: DAGNode, result: NodeResult, error: BaseException):
+        if node.fallback is not None:
+            result.value = node.fallback(error)
+            result.fallback_used = True
@@ -3,6 +3,7 @@
 改进：状态管理、错误处理、减少重复、工具调用支持
 """
 import asyncio
+import re
 import time
 from typing import Dict, Any, Optional, List
 from dataclasses import dataclass
@@ -10,6 +11,8 @@ from datetime import datetime
 from enum import Enum
 
 from src.domain.students_prediction import StudentTagInfo
+from src.model_client.llm_cache import LLMCacheMiss, LLMResponseCache, get_llm_cache
+from src.workflows.dag_executor import DAGExecutor, DAGNode, DAGRun, EventCallback
 
 
 class DegreeType(Enum):
@@ -32,13 +35,12 @@ class WorkflowState:
     final_recommendation: str = ""
     program_result: str = ""
     final_analysis: str = ""
+    run: Optional[DAGRun] = None  # 各节点状态与耗时
 
-    def __post_init__(self):
-        """初始化时加载用户数据"""
-        self._load_user_data()
+    # 以下加载方法都是阻塞调用（数据库 / 预测子进程），由工作流DAG放到线程池执行
 
-    def _load_user_data(self):
-        """一次性加载所有用户数据"""
+    def load_profile(self):
+        """加载用户档案和申请详情"""
         try:
             from src.tools.school_rec_tools import (
                 get_complete_user_profile,
@@ -48,20 +50,26 @@ class WorkflowState:
             self.user_profile = get_complete_user_profile()
             self.application_details = get_user_application_details()
 
-            # 如果有档案，尝试获取ML预测
-            if self.user_profile:
-                try:
-                    from src.tools.school_rec_tools import get_prediction
-                    student_tags = ProfileConverter.convert(self.user_profile)
-                    if student_tags:
-                        self.ml_predictions = get_prediction(student_tags)
-                        print("✅ ML预测数据已加载")
-                except Exception as e:
-                    print(f"⚠️ ML预测失败: {e}")
-
         except Exception as e:
             print(f"⚠️ 用户数据加载失败: {e}")
 
+    def load_ml_predictions(self):
+        """如果有档案，尝试获取ML预测"""
+        if not self.user_profile:
+            return
+        try:
+            from src.tools.school_rec_tools import get_prediction
+            student_tags = ProfileConverter.convert(self.user_profile)
+            if student_tags:
+                self.ml_predictions = get_prediction(student_tags)
+                print("✅ ML预测数据已加载")
+        except Exception as e:
+            print(f"⚠️ ML预测失败: {e}")
+
+
+class WorkflowCancelled(Exception):
+    """进度事件无法送达（客户端已断开），剩余阶段已取消"""
+
 
 class ProfileConverter:
     """用户档案转换器 - 独立模块"""
@@ -238,16 +246,19 @@ class ProfileConverter:
 class GeminiAPIClient:
     """Gemini API客户端 - 统一调用接口"""
 
-    def __init__(self):
+    def __init__(self, cache: Optional[LLMResponseCache] = None, model: str = "gemini-2.5-pro"):
         self.timeout = 60.0
+        self.model = model
         self._client = None
+        # 内容寻址缓存：相同模型+提示词+用户内容直接重放（LLM_CACHE_MODE=off时为None）
+        self.cache = cache if cache is not None else get_llm_cache()
 
     @property
     def client(self):
-        """延迟加载Gemini客户端"""
+        """延迟加载Gemini客户端（缓存命中时不会创建）"""
         if self._client is None:
             from src.model_client.gemini_client import get_gemini_model_client
-            self._client = get_gemini_model_client()
+            self._client = get_gemini_model_client(self.model)
         return self._client
 
     async def call(self, system_message: str, user_content: str,
@@ -261,6 +272,15 @@ class GeminiAPIClient:
             tools: 工具定义（用于function calling）
         """
         try:
+            cache_key = None
+            if self.cache:
+                cache_key = self.cache.make_key(self.model, system_message, user_content)
+                # SQLite读写放到线程中，避免阻塞事件循环
+                cached = await asyncio.to_thread(self.cache.get, cache_key)
+                if cached is not None:
+                    print(f"⚡ LLM缓存命中: {cache_key[:12]}")
+                    return cached
+
             messages = [{
                 "role": "user",
                 "content": f"{system_message}\n\n{user_content}"
@@ -275,10 +295,15 @@ class GeminiAPIClient:
             )
 
             if response and hasattr(response, 'content'):
+                if cache_key and isinstance(response.content, str):
+                    await asyncio.to_thread(self.cache.set, cache_key, self.model, response.content)
                 return response.content
             else:
                 raise Exception("Gemini返回空响应")
 
+        except LLMCacheMiss:
+            # replay模式缺少录制结果：原样抛出，不能被当作普通失败走fallback
+            raise
         except asyncio.TimeoutError:
             raise Exception(f"Gemini API超时 ({self.timeout}s)")
         except Exception as e:
@@ -299,9 +324,13 @@ class MultiAgentSchoolRecommendationWorkflow:
     async def run_complete_recommendation(
         self,
         user_message: str,
-        user_id: str = "default"
+        user_id: str = "default",
+        on_event: Optional[EventCallback] = None
     ) -> str:
-        """运行完整的推荐流程"""
+        """
+        运行完整的推荐流程
+        on_event: 可选的进度回调，接收阶段开始/结束事件及部分结果（档案摘要、ML候选、初始学校列表等）
+        """
         try:
             print(f"🚀 开始多Agent推荐流程")
             print(f"📝 用户请求: {user_message}")
@@ -312,31 +341,127 @@ class MultiAgentSchoolRecommendationWorkflow:
                 user_id=user_id
             )
 
-            # Agent 1: 档案分析
-            state = await self._agent_1_profile_analysis(state)
-
-            # Agent 2: 学校研究（根据学位类型分支）
-            state = await self._agent_2_school_research(state)
-
-            # Agent 3: 最终推荐
-            state = await self._agent_3_final_recommendation(state)
-
-            # Agent 4: 项目匹配（仅研究生）
-            if state.degree_type == DegreeType.GRADUATE:
-                state = await self._agent_4_program_matching(state)
-
-            # Agent 5: 最终分析
-            state = await self._agent_5_final_analysis(state)
+            # 按依赖关系并发执行各阶段（档案分析与ML预测并行）
+            sink = self._event_sink(state, on_event) if on_event else None
+            state.run = await DAGExecutor(self._build_dag(state), on_event=sink,
+                                          fatal_errors=(LLMCacheMiss,)).run()
+            print(f"⏱️ 各阶段耗时:\n{state.run.report()}")
 
             print(f"🎉 推荐流程完成!")
-            return state.final_analysis
+            return state.final_analysis or state.program_result or state.final_recommendation
 
+        except WorkflowCancelled:
+            print("🛑 客户端已断开，剩余阶段已取消")
+            raise
+        except LLMCacheMiss:
+            raise
         except Exception as e:
             print(f"❌ 工作流错误: {e}")
             import traceback
             traceback.print_exc()
             return self._get_error_fallback(str(e))
 
+    def _event_sink(self, state: WorkflowState, on_event: EventCallback) -> EventCallback:
+        """为阶段结束事件附加该阶段的部分结果；回调失败时转换为WorkflowCancelled"""
+        async def sink(event: Dict[str, Any]):
+            if event["event"] == "stage_finished" and event["status"] in ("ok", "timeout", "error"):
+                partial = self._stage_partial(event["stage"], state)
+                if partial:
+                    event["partial"] = partial
+            try:
+                await on_event(event)
+            except Exception as e:
+                raise WorkflowCancelled(f"progress event delivery failed: {type(e).__name__}: {e}") from e
+        return sink
+
+    def _stage_partial(self, stage: str, state: WorkflowState) -> Optional[Dict[str, Any]]:
+        """各阶段可提前展示给用户的部分结果"""
+        if stage == "profile_analysis":
+            return {"summary": state.summary,
+                    "degree_type": state.degree_type.value if state.degree_type else None}
+        if stage == "ml_prediction" and state.ml_predictions is not None:
+            try:
+                shortlist = [str(school) for school in list(state.ml_predictions)]
+            except TypeError:
+                shortlist = [str(state.ml_predictions)]
+            return {"ml_shortlist": shortlist[:20]}
+        if stage == "school_research":
+            return {"research_result": state.research_result}
+        if stage == "final_recommendation":
+            return {"final_recommendation": state.final_recommendation,
+                    "schools": self._extract_school_names(state.final_recommendation)}
+        if stage == "program_matching":
+            return {"program_result": state.program_result}
+        return None
+
+    def _build_dag(self, state: WorkflowState) -> List[DAGNode]:
+        """
+        工作流依赖图:
+
+            load_profile ─┬─ ml_prediction ─────┐
+                          └─ profile_analysis ──┴─ school_research ─ final_recommendation
+                                                   ─ program_matching(仅研究生) ─ final_analysis
+
+        每个Agent节点的fallback与其内部异常处理一致，超时后下游仍可继续；
+        LLMCacheMiss（replay模式缺少录制结果）不走fallback，直接使整个流程失败
+        """
+        def agent_node(name, agent, deps, timeout, fallback, condition=None):
+            async def func(_):
+                await agent(state)
+                return state
+            return DAGNode(name, func, deps=deps, timeout=timeout,
+                           fallback=lambda e: fallback(state, e), condition=condition)
+
+        return [
+            DAGNode("load_profile", lambda _: state.load_profile(), timeout=30, blocking=True),
+            DAGNode("ml_prediction", lambda _: state.load_ml_predictions(), deps=("load_profile",),
+                    timeout=120, blocking=True, fallback=lambda e: None),
+            agent_node("profile_analysis", self._agent_1_profile_analysis, ("load_profile",),
+                       90, self._profile_analysis_fallback),
+            agent_node("school_research", self._agent_2_school_research, ("profile_analysis", "ml_prediction"),
+                       180, self._school_research_fallback),
+            agent_node("final_recommendation", self._agent_3_final_recommendation, ("school_research",),
+                       180, self._final_recommendation_fallback),
+            agent_node("program_matching", self._agent_4_program_matching, ("final_recommendation",),
+                       180, self._program_matching_fallback,
+                       condition=lambda _: state.degree_type == DegreeType.GRADUATE),
+            agent_node("final_analysis", self._agent_5_final_analysis, ("final_recommendation", "program_matching"),
+                       180, self._final_analysis_fallback),
+        ]
+
+    # 超时时的状态回退，与各Agent内部的except分支保持一致
+
+    @staticmethod
+    def _profile_analysis_fallback(state: WorkflowState, error: BaseException):
+        print(f"⚠️ Agent 1超时/失败: {error!r}")
+        state.summary = "基于用户请求，假设申请研究生项目。"
+        state.degree_type = DegreeType.GRADUATE
+        return state
+
+    @staticmethod
+    def _school_research_fallback(state: WorkflowState, error: BaseException):
+        print(f"⚠️ Agent 2超时/失败: {error!r}")
+        state.research_result = "学校研究完成，生成基础推荐列表。"
+        return state
+
+    @staticmethod
+    def _final_recommendation_fallback(state: WorkflowState, error: BaseException):
+        print(f"⚠️ Agent 3超时/失败: {error!r}")
+        state.final_recommendation = state.research_result
+        return state
+
+    @staticmethod
+    def _program_matching_fallback(state: WorkflowState, error: BaseException):
+        print(f"⚠️ Agent 4超时/失败: {error!r}")
+        state.program_result = state.final_recommendation
+        return state
+
+    @staticmethod
+    def _final_analysis_fallback(state: WorkflowState, error: BaseException):
+        print(f"⚠️ Agent 5超时/失败: {error!r}")
+        state.final_analysis = state.program_result or state.final_recommendation
+        return state
+
     async def _agent_1_profile_analysis(self, state: WorkflowState) -> WorkflowState:
         """Agent 1: 档案分析"""
         print("\n🔍 Agent 1: 档案分析...")
@@ -357,7 +482,6 @@ Format: "Profile summary. Applying for [graduate/undergraduate] programs."
             user_context = f"""
 用户档案: {state.user_profile or '无档案'}
 用户请求: {state.user_message}
-ML预测: {state.ml_predictions or '无'}
 """
 
             state.summary = await self.api_client.call(system_prompt, user_context)
@@ -366,6 +490,8 @@ ML预测: {state.ml_predictions or '无'}
             state.degree_type = self._determine_degree_type(state.summary)
             print(f"✅ 学位类型: {state.degree_type.value}")
 
+        except LLMCacheMiss:
+            raise
         except Exception as e:
             print(f"⚠️ Agent 1错误: {e}")
             state.summary = f"基于用户请求，假设申请研究生项目。"
@@ -397,6 +523,8 @@ ML预测: {state.ml_predictions or '无'}
             )
             print("✅ 学校研究完成")
 
+        except LLMCacheMiss:
+            raise
         except Exception as e:
             print(f"⚠️ Agent 2错误: {e}")
             state.research_result = "学校研究完成，生成基础推荐列表。"
@@ -433,6 +561,8 @@ For each school provide:
             )
             print("✅ 最终推荐完成")
 
+        except LLMCacheMiss:
+            raise
         except Exception as e:
             print(f"⚠️ Agent 3错误: {e}")
             state.final_recommendation = state.research_result
@@ -444,9 +574,43 @@ For each school provide:
         print("\n📚 Agent 4: 项目匹配...")
 
         try:
-            system_prompt = """You are a program matching expert.
+            schools = self._extract_school_names(state.final_recommendation)
+
+            if len(schools) < 2:
+                # 解析不出学校列表时，整体一次调用
+                state.program_result = await self._match_programs(
+                    "For each of the 10 universities", state.final_recommendation, state
+                )
+            else:
+                # 每所学校互不依赖，并发匹配
+                results = await asyncio.gather(*(
+                    self._match_programs(f"For {school}", school, state) for school in schools
+                ), return_exceptions=True)
+                sections = [
+                    f"### {school}\n{result}" for school, result in zip(schools, results)
+                    if not isinstance(result, BaseException)
+                ]
+                misses = [result for result in results if isinstance(result, LLMCacheMiss)]
+                if misses:
+                    raise misses[0]
+                if not sections:
+                    raise results[0]
+                state.program_result = "\n\n".join(sections)
+            print(f"✅ 项目匹配完成 ({max(len(schools), 1)} 组)")
+
+        except LLMCacheMiss:
+            raise
+        except Exception as e:
+            print(f"⚠️ Agent 4错误: {e}")
+            state.program_result = state.final_recommendation
 
-For each of the 10 universities, find:
+        return state
+
+    async def _match_programs(self, scope: str, schools: str, state: WorkflowState) -> str:
+        """项目匹配的单次调用：scope为全部学校或单所学校"""
+        system_prompt = f"""You are a program matching expert.
+
+{scope}, find:
 - Exact master's program name
 - Program requirements
 - Admission criteria
@@ -454,21 +618,27 @@ For each of the 10 universities, find:
 Exclude certificates and diplomas. Focus on degree programs only.
 """
 
-            user_context = f"""
-推荐学校: {state.final_recommendation}
+        user_context = f"""
+推荐学校: {schools}
 申请详情: {state.application_details or '无'}
 """
 
-            state.program_result = await self.api_client.call(
-                system_prompt, user_context
-            )
-            print("✅ 项目匹配完成")
+        return await self.api_client.call(system_prompt, user_context)
 
-        except Exception as e:
-            print(f"⚠️ Agent 4错误: {e}")
-            state.program_result = state.final_recommendation
-
-        return state
+    @staticmethod
+    def _extract_school_names(recommendation: str, limit: int = 10) -> List[str]:
+        """从最终推荐文本中解析学校名（编号/列表项中包含University/College/Institute等的行）"""
+        pattern = re.compile(
+            r"^\s*(?:\d+[.)、]|[-*•])\s*(?:\*\*)?([^\n*:：(（]*?"
+            r"(?:University|College|Institute|School|大学|学院)[^\n*:：(（]*?)(?:\*\*)?\s*(?:[:：(（\-–]|$)",
+            re.MULTILINE,
+        )
+        schools = []
+        for match in pattern.finditer(recommendation or ""):
+            name = match.group(1).strip()
+            if name and name not in schools:
+                schools.append(name)
+        return schools[:limit]
 
     async def _agent_5_final_analysis(self, state: WorkflowState) -> WorkflowState:
         """Agent 5: 最终分析"""
@@ -490,7 +660,7 @@ Include:
 """
 
             user_context = f"""
-项目匹配结果: {state.program_result}
+项目匹配结果: {state.program_result or state.final_recommendation}
 用户档案: {state.user_profile or '无'}
 """
 
@@ -499,9 +669,11 @@ Include:
             )
             print("✅ 最终分析完成")
 
+        except LLMCacheMiss:
+            raise
         except Exception as e:
             print(f"⚠️ Agent 5错误: {e}")
-            state.final_analysis = state.program_result
+            state.final_analysis = state.program_result or state.final_recommendation
 
         return state
 
@@ -570,16 +742,21 @@ def get_multi_agent_workflow() -> MultiAgentSchoolRecommendationWorkflow:
     return _workflow_instance
 
 
-async def run_multi_agent_recommendation(user_message: str, user_id: str = "default") -> str:
+async def run_multi_agent_recommendation(
+    user_message: str,
+    user_id: str = "default",
+    on_event: Optional[EventCallback] = None
+) -> str:
     """
     运行多Agent学校推荐流程的便捷函数
 
     Args:
         user_message: 用户请求
         user_id: 用户ID
+        on_event: 可选的进度事件回调
 
     Returns:
         推荐结果
     """
     workflow = get_multi_agent_workflow()
-    return await workflow.run_complete_recommendation(user_message, user_id)
\ No newline at end of file
+    return await workflow.run_complete_recommendation(user_message, user_id, on_event=on_event)
\ No newline at end of file
@@ -0,0 +1,61 @@
+#!/usr/bin/env python3
+"""
+AdmissionResponseCache: fresh hits, stale-while-revalidate, inline refresh for warm-up jobs and the shared path
+"""
+
+import asyncio
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from src.tools import admission_cache  # noqa: E402
+from src.tools.admission_cache import AdmissionResponseCache  # noqa: E402
+
+
+def make_cache(tmp_path, age):
+    cache = AdmissionResponseCache(str(tmp_path / "admission.sqlite3"), ttl_seconds=10, stale_seconds=10)
+    key = cache.make_key("admission_requirement", "Univ. of Oxford", "CS")
+    cache.set(key, "old answer", "admission_requirement", "Univ. of Oxford", "CS")
+    cache._conn.execute("UPDATE responses SET fetched_at = fetched_at - ?", (age,))
+    return cache, key
+
+
+async def new_answer():
+    await asyncio.sleep(0)
+    return "new answer"
+
+
+def test_fresh_entry_is_a_hit(tmp_path):
+    cache, key = make_cache(tmp_path, age=0)
+    assert asyncio.run(cache.get_or_fetch(key, new_answer, "admission_requirement", "Oxford", "CS")) == "old answer"
+    assert cache.stats["hits"] == 1
+
+
+def test_stale_entry_is_served_then_refreshed_in_background(tmp_path):
+    cache, key = make_cache(tmp_path, age=15)
+
+    async def scenario():
+        response = await cache.get_or_fetch(key, new_answer, "admission_requirement", "Oxford", "CS")
+        await asyncio.gather(*cache._refreshing.values())
+        return response
+
+    assert asyncio.run(scenario()) == "old answer"
+    assert cache.stats["stale_hits"] == cache.stats["refreshes"] == 1
+    assert cache.get(key)[0] == "new answer"
+
+
+def test_warm_up_mode_refetches_stale_entries_inline(tmp_path):
+    cache, key = make_cache(tmp_path, age=15)
+    cache.serve_stale = False
+    assert asyncio.run(cache.get_or_fetch(key, new_answer, "admission_requirement", "Oxford", "CS")) == "new answer"
+    assert (cache.stats["stale_hits"], cache.stats["misses"]) == (0, 1)
+    assert not cache._refreshing
+
+
+def test_relative_path_resolves_against_project_root(monkeypatch, tmp_path):
+    monkeypatch.setattr(admission_cache, "PROJECT_ROOT", tmp_path)
+    monkeypatch.setattr(admission_cache, "_cache", None)
+    monkeypatch.setattr(admission_cache.settings, "ADMISSION_CACHE_PATH", "data/cache/admission.sqlite3")
+    monkeypatch.chdir(tmp_path / "..")
+    assert admission_cache.get_admission_cache().path == str(tmp_path / "data/cache/admission.sqlite3")
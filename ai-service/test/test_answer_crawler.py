@@ -0,0 +1,96 @@
+#!/usr/bin/env python3
+"""
+Answer crawler: bounded concurrency, per-question retry, JSONL checkpoint/resume and batched DB writes
+"""
+
+import asyncio
+import json
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from src.agents.general_qa_agent.answer_crawler import AnswerCheckpoint, crawl_answers  # noqa: E402
+
+
+def make_rows(n: int):
+    return [{"id": f"q{i}", "question": f"question {i}"} for i in range(n)]
+
+
+def test_concurrency_is_bounded():
+    in_flight = peak = 0
+
+    async def ask(question):
+        nonlocal in_flight, peak
+        in_flight += 1
+        peak = max(peak, in_flight)
+        await asyncio.sleep(0.01)
+        in_flight -= 1
+        return f"answer to {question}"
+
+    stats = asyncio.run(crawl_answers(make_rows(20), ask, concurrency=4))
+    assert peak == 4
+    assert (stats["answered"], stats["failed"]) == (20, 0)
+
+
+def test_retry_then_give_up(tmp_path):
+    attempts = {}
+
+    async def ask(question):
+        attempts[question] = attempts.get(question, 0) + 1
+        if question == "question 0" and attempts[question] == 1:
+            raise TimeoutError("slow")
+        if question == "question 1":
+            raise RuntimeError("always fails")
+        return "ok"
+
+    checkpoint = AnswerCheckpoint(str(tmp_path / "answers.jsonl"))
+    stats = asyncio.run(crawl_answers(make_rows(3), ask, checkpoint=checkpoint, retries=2, backoff_base=0))
+    checkpoint.close()
+    assert attempts == {"question 0": 2, "question 1": 3, "question 2": 1}
+    assert (stats["answered"], stats["failed"], stats["retries"]) == (2, 1, 3)
+    # Failed questions are not checkpointed, so the next run asks them again
+    assert set(checkpoint.done) == {"q0", "q2"}
+
+
+def test_resume_skips_checkpointed_and_streams_batches(tmp_path):
+    path = tmp_path / "answers.jsonl"
+    path.write_text(json.dumps({"id": "q0", "question": "question 0", "answer": "saved"}) + "\n"
+                    + '{"id": "q1", "quest')  # torn line from an interrupted run
+    asked, batches = [], []
+
+    async def ask(question):
+        asked.append(question)
+        return "new"
+
+    checkpoint = AnswerCheckpoint(str(path))
+    stats = asyncio.run(crawl_answers(make_rows(5), ask, checkpoint=checkpoint,
+                                      write_batch=batches.append, concurrency=1, db_batch_size=2))
+    checkpoint.close()
+
+    assert "question 0" not in asked and len(asked) == 4
+    assert stats["resumed"] == 1 and stats["db_rows"] == 5
+    assert [len(batch) for batch in batches] == [1, 2, 2]
+    assert batches[0][0]["answer"] == "saved"
+    assert set(AnswerCheckpoint(str(path)).done) == {"q0", "q1", "q2", "q3", "q4"}
+
+
+def test_db_write_errors_do_not_abort_the_crawl(tmp_path):
+    calls = []
+
+    def write_batch(batch):
+        calls.append(len(batch))
+        if len(calls) == 1:
+            raise ConnectionError("MySQL server has gone away")
+
+    async def ask(question):
+        return "ok"
+
+    checkpoint = AnswerCheckpoint(str(tmp_path / "answers.jsonl"))
+    stats = asyncio.run(crawl_answers(make_rows(5), ask, checkpoint=checkpoint, write_batch=write_batch,
+                                      concurrency=2, db_batch_size=2))
+    checkpoint.close()
+    assert stats["answered"] == 5
+    assert (stats["db_failed_rows"], stats["db_rows"]) == (2, 3)
+    # Every answer is checkpointed, so a later run re-sends the failed batch
+    assert len(checkpoint.done) == 5
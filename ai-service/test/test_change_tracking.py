@@ -0,0 +1,49 @@
+#!/usr/bin/env python3
+"""
+Change tracking: dotted-path diffs for partial profile writes and write-amplification stats
+"""
+
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from src.domain.change_tracking import WriteStats, diff_documents, payload_size  # noqa: E402
+
+
+def test_unchanged_document_has_no_diff():
+    doc = {"user_id": "u1", "basicInformation": {"name": {"firstName": "A"}}, "tests": [1, 2]}
+    assert diff_documents(doc, {**doc}) == ({}, [])
+
+
+def test_nested_change_becomes_dotted_path():
+    old = {"basicInformation": {"name": {"firstName": "A", "lastName": "B"}, "nationality": ""}}
+    new = {"basicInformation": {"name": {"firstName": "A", "lastName": "C"}, "nationality": "CN"}}
+    set_fields, unset_fields = diff_documents(old, new)
+    assert set_fields == {"basicInformation.name.lastName": "C", "basicInformation.nationality": "CN"}
+    assert unset_fields == []
+
+
+def test_lists_are_replaced_whole_and_removed_keys_unset():
+    old = {"standardizedTests": [{"type": "GRE"}], "legacy": 1}
+    new = {"standardizedTests": [{"type": "GRE"}, {"type": "GMAT"}]}
+    set_fields, unset_fields = diff_documents(old, new)
+    assert set_fields == {"standardizedTests": [{"type": "GRE"}, {"type": "GMAT"}]}
+    assert unset_fields == ["legacy"]
+
+
+def test_new_keys_are_set():
+    set_fields, _ = diff_documents({"a": {}}, {"a": {"b": 1}, "c": "x"})
+    assert set_fields == {"a.b": 1, "c": "x"}
+
+
+def test_write_amplification_stats():
+    stats = WriteStats()
+    full = payload_size({"a": "x" * 100, "b": "y"})
+    stats.record("mongo", "full", full, full, 2)
+    stats.record("mongo", "partial", payload_size({"b": "z"}), full, 1)
+    stats.record("mongo", "noop", 0, full)
+    mongo = stats.get_stats()["mongo"]
+    assert (mongo["writes"], mongo["full"], mongo["partial"], mongo["noop"]) == (2, 1, 1, 1)
+    assert mongo["fields_written"] == 3
+    assert 0 < mongo["write_amplification"] < 1
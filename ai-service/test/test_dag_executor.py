@@ -0,0 +1,181 @@
+#!/usr/bin/env python3
+"""
+DAGExecutor: parallel independent nodes, timeouts with fallbacks, conditions, blocked upstreams,
+fatal errors and cancellation; plus the cooperative cancellation helpers it records into
+"""
+
+import asyncio
+import subprocess
+import sys
+import threading
+import time
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from src.utils.cancellation import (  # noqa: E402
+    CancellationToken, OperationCancelled, cancellation_scope, current_cancellation,
+    get_cancellation_stats, run_cancellable_subprocess,
+)
+from src.workflows.dag_executor import DAGExecutor, DAGNode  # noqa: E402
+
+
+def sleeper(value, delay=0.05):
+    async def func(results):
+        await asyncio.sleep(delay)
+        return value
+    return func
+
+
+def test_independent_nodes_run_in_parallel():
+    async def merge(results):
+        return results["a"] + results["b"]
+
+    nodes = [
+        DAGNode("a", sleeper(1, 0.1)),
+        DAGNode("b", sleeper(2, 0.1)),
+        DAGNode("merge", merge, deps=("a", "b")),
+    ]
+    start = time.perf_counter()
+    run = asyncio.run(DAGExecutor(nodes).run())
+    elapsed = time.perf_counter() - start
+
+    assert run.value("merge") == 3
+    assert elapsed < 0.18  # a and b overlap instead of taking 0.2s back to back
+    assert abs(run.results["a"].started_ms - run.results["b"].started_ms) < 20
+
+
+def test_timeout_uses_fallback_and_downstream_still_runs():
+    seen = {}
+
+    async def downstream(results):
+        seen.update(results)
+        return "done"
+
+    nodes = [
+        DAGNode("slow", sleeper("late", 1.0), timeout=0.05, fallback=lambda error: "fallback"),
+        DAGNode("downstream", downstream, deps=("slow",)),
+    ]
+    run = asyncio.run(DAGExecutor(nodes).run())
+
+    slow = run.results["slow"]
+    assert (slow.status, slow.fallback_used, slow.value) == ("timeout", True, "fallback")
+    assert run.results["downstream"].status == "ok"
+    assert seen == {"slow": "fallback"}
+
+
+def test_skipped_condition_lets_downstream_run_but_failure_blocks_it():
+    async def broken(results):
+        raise RuntimeError("boom")
+
+    async def after_optional(results):
+        return results["optional"] is None
+
+    nodes = [
+        DAGNode("optional", sleeper("unused", 0), condition=lambda results: False),
+        DAGNode("after_optional", after_optional, deps=("optional",)),
+        DAGNode("broken", broken),
+        DAGNode("after_broken", sleeper("never", 0), deps=("broken",)),
+        DAGNode("after_after_broken", sleeper("never", 0), deps=("after_broken",)),
+    ]
+    events = []
+
+    async def on_event(event):
+        events.append((event["event"], event["stage"]))
+
+    run = asyncio.run(DAGExecutor(nodes, on_event=on_event).run())
+
+    assert run.results["optional"].status == "skipped"
+    assert (run.results["after_optional"].status, run.value("after_optional")) == ("ok", True)
+    assert run.results["broken"].status == "error"
+    assert run.results["after_broken"].status == "blocked"
+    assert run.results["after_after_broken"].status == "blocked"
+    assert ("stage_started", "optional") not in events
+    assert ("stage_finished", "after_after_broken") in events
+
+
+def test_blocking_node_runs_in_thread_and_sees_cancellation_scope():
+    def blocking(results):
+        return threading.current_thread() is not threading.main_thread(), current_cancellation()
+
+    async def scenario():
+        token = CancellationToken()
+        with cancellation_scope(token):
+            run = await DAGExecutor([DAGNode("blocking", blocking, blocking=True)]).run()
+        return token, run.value("blocking")
+
+    token, (in_thread, seen_token) = asyncio.run(scenario())
+    assert in_thread and seen_token is token
+
+
+def test_fatal_error_skips_fallback_and_cancels_the_rest():
+    class Fatal(Exception):
+        pass
+
+    async def fatal(results):
+        raise Fatal("replay miss")
+
+    async def scenario():
+        nodes = [
+            DAGNode("fatal", fatal, fallback=lambda error: "fallback"),
+            DAGNode("slow", sleeper("late", 1.0)),
+        ]
+        executor = DAGExecutor(nodes, fatal_errors=(Fatal,))
+        before = get_cancellation_stats().get("dag_runs_cancelled", 0)
+        with pytest.raises(Fatal):
+            await executor.run()
+        return before
+
+    before = asyncio.run(scenario())
+    # A fatal error is not a client disconnect
+    assert get_cancellation_stats().get("dag_runs_cancelled", 0) == before
+
+
+def test_cancelling_run_cancels_pending_nodes():
+    async def scenario():
+        started = asyncio.Event()
+
+        async def slow(results):
+            started.set()
+            await asyncio.sleep(10)
+
+        nodes = [DAGNode("slow", slow), DAGNode("after", sleeper("never", 0), deps=("slow",))]
+        before = get_cancellation_stats()
+        task = asyncio.ensure_future(DAGExecutor(nodes).run())
+        await started.wait()
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+        return before, get_cancellation_stats()
+
+    before, after = asyncio.run(scenario())
+    assert after["dag_runs_cancelled"] == before.get("dag_runs_cancelled", 0) + 1
+    assert after["dag_stages_cancelled"] == before.get("dag_stages_cancelled", 0) + 2
+
+
+def test_rejects_unknown_dependencies_and_cycles():
+    with pytest.raises(ValueError):
+        DAGExecutor([DAGNode("a", sleeper(1), deps=("missing",))])
+    with pytest.raises(ValueError):
+        DAGExecutor([DAGNode("a", sleeper(1), deps=("b",)), DAGNode("b", sleeper(1), deps=("a",))])
+
+
+def test_cancellable_subprocess_is_killed_when_token_fires():
+    token = CancellationToken()
+    before = get_cancellation_stats().get("subprocesses_killed", 0)
+    threading.Timer(0.1, token.cancel).start()
+    start = time.monotonic()
+    with cancellation_scope(token), pytest.raises(OperationCancelled):
+        run_cancellable_subprocess([sys.executable, "-c", "import time; time.sleep(10)"], timeout=5, poll_interval=0.05)
+    assert time.monotonic() - start < 3
+    assert get_cancellation_stats()["subprocesses_killed"] == before + 1
+
+
+def test_cancellable_subprocess_returns_output_and_honours_timeout():
+    done = run_cancellable_subprocess([sys.executable, "-c", "print('ok')"], timeout=10)
+    assert (done.returncode, done.stdout.strip()) == (0, "ok")
+    assert current_cancellation() is None
+    with pytest.raises(subprocess.TimeoutExpired):
+        run_cancellable_subprocess([sys.executable, "-c", "import time; time.sleep(10)"], timeout=0.2, poll_interval=0.05)
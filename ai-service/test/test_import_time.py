@@ -0,0 +1,39 @@
+#!/usr/bin/env python3
+"""
+Import-time regression checks: importing the API server and the session/tool modules
+must not connect to a database or pull in heavy ML/agent packages
+"""
+
+import subprocess
+import sys
+from pathlib import Path
+
+import pytest
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT / "scripts"))
+
+from import_time_benchmark import heavy_imports, measure  # noqa: E402
+
+# Generous budget; the point is to catch eager connections (timeouts) and heavy imports
+IMPORT_BUDGET_MS = 5000
+
+
+@pytest.mark.parametrize("module", ["api_server", "src.utils.session_manager", "src.tools.school_rec_tools"])
+def test_import_does_not_connect_to_mongo(module):
+    # Point Mongo at an unroutable address: an eager ping at import time would fail the import
+    env_code = (
+        "import os; os.environ['DATABASE_HOST'] = 'mongodb://10.255.255.1:27017/?serverSelectionTimeoutMS=500';"
+        f"import {module}; import sys; "
+        "mongo = sys.modules.get('src.infrastructure.db.mongo'); "
+        "assert mongo is None or not mongo.connection.initialized"
+    )
+    proc = subprocess.run([sys.executable, "-c", env_code], capture_output=True, text=True, cwd=ROOT)
+    assert proc.returncode == 0, proc.stderr[-2000:]
+
+
+def test_api_server_import_time_and_heavy_packages():
+    returncode, _, modules, total_us = measure("api_server")
+    assert returncode == 0
+    assert heavy_imports(modules) == []
+    assert total_us / 1000 < IMPORT_BUDGET_MS
@@ -0,0 +1,77 @@
+#!/usr/bin/env python3
+"""
+Lexical index: tokenization (latin words, CJK bigrams), entity extraction, BM25 ranking and RRF
+"""
+
+import sys
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from src.agents.general_qa_agent.lexical_index import (  # noqa: E402
+    BM25Index, extract_entities, reciprocal_rank_fusion, tokenize,
+)
+
+QA_PAIRS = [
+    {"question": "What is the GPA requirement for Stanford?", "answer": "Stanford expects a GPA above 3.8."},
+    {"question": "Does MIT require the TOEFL?", "answer": "International applicants submit TOEFL scores."},
+    {"question": "斯坦福大学的申请截止日期是什么时候？", "answer": "一般在十二月初。"},
+]
+
+
+def test_tokenize_latin_drops_stopwords_and_keeps_compounds():
+    assert tokenize("What is the U.S. master's GPA?") == ["u.s", "master's", "gpa"]
+
+
+def test_tokenize_cjk_bigrams():
+    assert tokenize("申请截止") == ["申请", "请截", "截止"]
+    assert tokenize("GPA 和 托福") == ["gpa", "和", "托福"]
+
+
+def test_extract_entities_latin_and_chinese():
+    assert extract_entities("how hard is Stanford University compared to MIT?") == {"Stanford University", "MIT"}
+    assert "斯坦福大学" in extract_entities("斯坦福大学的截止日期")
+    assert extract_entities("What is the deadline?") == frozenset()
+
+
+def test_chinese_names_do_not_yield_shared_suffixes():
+    assert extract_entities("上海交通大学") == {"上海交通大学"}
+    assert not extract_entities("上海交通大学的录取要求") & extract_entities("西安交通大学的录取要求")
+    assert extract_entities("香港科技大学和南方科技大学") == {"香港科技大学", "南方科技大学"}
+    # Text before the name is cut at particles/verbs; a second suffix extends the name
+    assert extract_entities("我想申请北京大学") == {"北京大学"}
+    assert extract_entities("伦敦大学学院和伦敦商学院") == {"伦敦大学学院", "伦敦商学院"}
+
+
+def test_bm25_ranks_matching_document_first():
+    index = BM25Index.build(QA_PAIRS)
+    assert index.total_docs == 3
+    assert index.search("TOEFL requirement", 3)[0][0] == 1
+    assert index.search("截止日期", 3)[0][0] == 2
+    assert index.search("unrelated words", 3) == []
+    assert index.entities[0] == {"GPA", "Stanford"}
+
+
+def test_bm25_empty_index_and_roundtrip(tmp_path):
+    assert BM25Index.build([]).search("gpa", 5) == []
+    path = str(tmp_path / "lexical.pkl")
+    BM25Index.build(QA_PAIRS).save(path)
+    assert BM25Index.load(path).search("Stanford GPA", 1)[0][0] == 0
+
+
+def test_load_rejects_other_versions(tmp_path):
+    index = BM25Index.build(QA_PAIRS)
+    index.version = -1
+    path = str(tmp_path / "lexical.pkl")
+    index.save(path)
+    with pytest.raises(ValueError):
+        BM25Index.load(path)
+
+
+def test_reciprocal_rank_fusion():
+    fused = reciprocal_rank_fusion([[1, 2, 3], [3, 1]], k=60)
+    assert fused[1] == pytest.approx(1 / 61 + 1 / 62)
+    assert fused[2] == pytest.approx(1 / 62)
+    assert max(fused, key=fused.get) == 1
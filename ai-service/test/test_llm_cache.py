@@ -0,0 +1,48 @@
+#!/usr/bin/env python3
+"""
+GeminiAPIClient + LLMResponseCache: hits are served without creating the Gemini client, misses store the answer
+"""
+
+import asyncio
+import os
+import sys
+from pathlib import Path
+from types import SimpleNamespace
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+os.environ.setdefault("OPENAI_API_KEY", "test-key")
+
+from src.model_client.llm_cache import LLMResponseCache  # noqa: E402
+from src.workflows.multi_agent_workflow import GeminiAPIClient  # noqa: E402
+
+
+class FakeGemini:
+    model = "gemini-2.5-pro"
+
+    def __init__(self):
+        self.calls = 0
+
+    async def create(self, messages):
+        self.calls += 1
+        return SimpleNamespace(content="fresh answer")
+
+
+def make_client(tmp_path):
+    return GeminiAPIClient(cache=LLMResponseCache(str(tmp_path / "llm.sqlite3"), ttl_seconds=3600))
+
+
+def test_cache_hit_does_not_create_the_gemini_client(tmp_path):
+    api = make_client(tmp_path)
+    api.cache.set(api.cache.make_key(api.model, "system", "user"), api.model, "cached answer")
+
+    assert asyncio.run(api.call("system", "user")) == "cached answer"
+    assert api._client is None
+
+
+def test_cache_miss_calls_gemini_and_stores_the_answer(tmp_path):
+    api = make_client(tmp_path)
+    api._client = fake = FakeGemini()
+
+    assert asyncio.run(api.call("system", "user")) == "fresh answer"
+    assert asyncio.run(api.call("system", "user")) == "fresh answer"
+    assert fake.calls == 1
@@ -0,0 +1,156 @@
+#!/usr/bin/env python3
+"""
+ModelGateway: priority ordering, request coalescing, cancellation of shared calls and retry backoff
+"""
+
+import asyncio
+import sys
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from src.model_client.model_gateway import ModelGateway, Priority  # noqa: E402
+
+
+class RateLimited(Exception):
+    status_code = 429
+
+    def __init__(self, retry_after=None):
+        super().__init__("429 Too Many Requests")
+        self.retry_after = retry_after
+
+
+def test_interactive_waiters_served_before_background():
+    async def scenario():
+        gateway = ModelGateway(max_concurrency=1)
+        release, order = asyncio.Event(), []
+
+        async def hold():
+            await release.wait()
+
+        async def record(name):
+            order.append(name)
+
+        holder = asyncio.ensure_future(gateway.run("m", hold))
+        await asyncio.sleep(0)
+        waiters = [
+            asyncio.ensure_future(gateway.run("m", lambda: record("bg-1"), priority=Priority.BACKGROUND)),
+            asyncio.ensure_future(gateway.run("m", lambda: record("bg-2"), priority=Priority.BACKGROUND)),
+            asyncio.ensure_future(gateway.run("m", lambda: record("interactive"), priority=Priority.INTERACTIVE)),
+        ]
+        await asyncio.sleep(0)
+        assert gateway.get_stats()["m"]["queue_depth"] == 3
+        release.set()
+        await asyncio.gather(holder, *waiters)
+        return order
+
+    assert asyncio.run(scenario()) == ["interactive", "bg-1", "bg-2"]
+
+
+def test_same_key_shares_one_call():
+    async def scenario():
+        gateway, calls = ModelGateway(max_concurrency=4), []
+
+        async def call():
+            calls.append(1)
+            await asyncio.sleep(0.01)
+            return "answer"
+
+        results = await asyncio.gather(*(gateway.run("m", call, key="k") for _ in range(3)))
+        return results, calls, gateway.get_stats()["m"]
+
+    results, calls, stats = asyncio.run(scenario())
+    assert results == ["answer"] * 3
+    assert len(calls) == 1
+    assert (stats["coalesced"], stats["requests"]) == (2, 1)
+
+
+def test_cancelling_one_waiter_keeps_shared_call():
+    async def scenario():
+        gateway, done = ModelGateway(max_concurrency=1), asyncio.Event()
+
+        async def call():
+            await done.wait()
+            return "answer"
+
+        first = asyncio.ensure_future(gateway.run("m", call, key="k"))
+        second = asyncio.ensure_future(gateway.run("m", call, key="k"))
+        await asyncio.sleep(0)
+        first.cancel()
+        await asyncio.sleep(0)
+        done.set()
+        with pytest.raises(asyncio.CancelledError):
+            await first
+        return await second
+
+    assert asyncio.run(scenario()) == "answer"
+
+
+def test_cancelling_last_waiter_cancels_shared_call():
+    async def scenario():
+        gateway, started, cancelled = ModelGateway(max_concurrency=1), asyncio.Event(), []
+
+        async def call():
+            started.set()
+            try:
+                await asyncio.sleep(10)
+            except asyncio.CancelledError:
+                cancelled.append(True)
+                raise
+
+        waiters = [asyncio.ensure_future(gateway.run("m", call, key="k")) for _ in range(2)]
+        await started.wait()
+        for waiter in waiters:
+            waiter.cancel()
+        await asyncio.gather(*waiters, return_exceptions=True)
+        await asyncio.sleep(0)
+        return cancelled, gateway.get_stats()["m"]["active"]
+
+    cancelled, active = asyncio.run(scenario())
+    assert cancelled == [True]
+    assert active == 0
+
+
+def test_retry_backoff_releases_slot():
+    async def scenario():
+        gateway, attempts, order = ModelGateway(max_concurrency=1, max_retries=2), [], []
+
+        async def flaky():
+            attempts.append(1)
+            if len(attempts) == 1:
+                raise RateLimited(retry_after=0.05)
+            order.append("flaky")
+            return "ok"
+
+        async def quick():
+            order.append("quick")
+            return "quick"
+
+        flaky_run = asyncio.ensure_future(gateway.run("m", flaky))
+        await asyncio.sleep(0.01)  # flaky is backing off now
+        assert await asyncio.wait_for(gateway.run("m", quick), timeout=0.04) == "quick"
+        assert await flaky_run == "ok"
+        return order, gateway.get_stats()["m"]
+
+    order, stats = asyncio.run(scenario())
+    assert order == ["quick", "flaky"]
+    assert (stats["retries"], stats["rate_limited"], stats["errors"], stats["active"]) == (1, 1, 0, 0)
+
+
+def test_non_retryable_error_raises_immediately():
+    async def scenario():
+        gateway, attempts = ModelGateway(max_concurrency=1, max_retries=3), []
+
+        async def broken():
+            attempts.append(1)
+            raise ValueError("bad request")
+
+        with pytest.raises(ValueError):
+            await gateway.run("m", broken)
+        return attempts, gateway.get_stats()["m"]
+
+    attempts, stats = asyncio.run(scenario())
+    assert len(attempts) == 1
+    assert (stats["errors"], stats["retries"]) == (1, 0)
@@ -0,0 +1,137 @@
+#!/usr/bin/env python3
+"""
+MySQLConnectionPool: bounded size, wait timeout, ping-on-checkout, lifetime recycling,
+discard on connection errors, and chunked execute_many
+"""
+
+import sys
+import threading
+import time
+from pathlib import Path
+
+import pytest
+from pymysql.err import OperationalError
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from src.infrastructure.db.mysql import MySQLConnectionPool, MySQLDatabaseConnector, PoolTimeout  # noqa: E402
+
+
+class FakeConnection:
+    def __init__(self, alive: bool = True):
+        self.alive = alive
+        self.closed = False
+        self.pings = 0
+        self.batches = []
+
+    def ping(self, reconnect=True):
+        self.pings += 1
+        if not self.alive:
+            raise OperationalError(2006, "MySQL server has gone away")
+
+    def close(self):
+        self.closed = True
+
+    def cursor(self):
+        return FakeCursor(self)
+
+
+class FakeCursor:
+    def __init__(self, connection):
+        self.connection = connection
+        self.rowcount = 0
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def executemany(self, query, params):
+        self.connection.batches.append(list(params))
+        self.rowcount = len(params)
+
+
+def make_pool(**kwargs):
+    created = []
+
+    def connect():
+        created.append(FakeConnection())
+        return created[-1]
+
+    return MySQLConnectionPool(connect, **kwargs), created
+
+
+def test_min_size_opened_up_front_and_reused():
+    pool, created = make_pool(min_size=2, max_size=4)
+    assert len(created) == 2
+    with pool.connection() as conn:
+        assert conn in created
+    with pool.connection():
+        pass
+    stats = pool.get_stats()
+    assert (stats["created"], stats["size"], stats["idle"], stats["in_use"]) == (2, 2, 2, 0)
+
+
+def test_max_size_blocks_then_times_out():
+    pool, created = make_pool(min_size=0, max_size=1, wait_timeout=0.05)
+    conn = pool.acquire()
+    with pytest.raises(PoolTimeout):
+        pool.acquire()
+    pool.release(conn)
+    assert pool.acquire() is conn
+    assert len(created) == 1
+    assert pool.get_stats()["wait_timeouts"] == 1
+
+
+def test_waiter_gets_released_connection():
+    pool, _ = make_pool(min_size=0, max_size=1, wait_timeout=2)
+    conn = pool.acquire()
+    threading.Timer(0.05, pool.release, args=(conn,)).start()
+    assert pool.acquire() is conn
+    assert pool.get_stats()["waits"] == 1
+
+
+def test_stale_connection_is_replaced_on_checkout():
+    pool, created = make_pool(min_size=1, max_size=2)
+    created[0].alive = False
+    with pool.connection() as conn:
+        assert conn is created[1]
+    assert created[0].closed
+    assert pool.get_stats()["stale_replaced"] == 1
+
+
+def test_ping_skipped_for_recently_used_connection():
+    pool, created = make_pool(min_size=1, max_size=1, ping_after_idle=60)
+    with pool.connection():
+        pass
+    assert created[0].pings == 0
+
+
+def test_connection_past_max_lifetime_is_recycled():
+    pool, created = make_pool(min_size=1, max_size=1, max_lifetime=0.01)
+    time.sleep(0.02)
+    with pool.connection() as conn:
+        assert conn is created[1]
+    assert created[0].closed
+    assert pool.get_stats()["recycled"] == 1
+
+
+def test_connection_error_discards_connection():
+    pool, created = make_pool(min_size=1, max_size=1)
+    with pytest.raises(OperationalError):
+        with pool.connection():
+            raise OperationalError(2013, "Lost connection")
+    assert created[0].closed
+    stats = pool.get_stats()
+    assert (stats["discarded"], stats["size"]) == (1, 0)
+    with pool.connection() as conn:
+        assert conn is created[1]
+
+
+def test_execute_many_sends_chunks():
+    pool, created = make_pool(min_size=1, max_size=1)
+    connector = object.__new__(MySQLDatabaseConnector)
+    connector._pool = pool
+    assert connector.execute_many("INSERT ...", [(i,) for i in range(5)], chunk_size=2) == 5
+    assert [len(batch) for batch in created[0].batches] == [2, 2, 1]
@@ -0,0 +1,150 @@
+#!/usr/bin/env python3
+"""
+Test the shared Perplexity client against a local mock server
+(no API key or network needed)
+"""
+
+import asyncio
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from src.model_client.perplexity_client import PerplexityAPIError, PerplexityClient
+
+
+class MockPerplexityHandler(BaseHTTPRequestHandler):
+    """Replies with the next scripted status code, then 200 with a canned completion"""
+    protocol_version = "HTTP/1.1"  # keep-alive, so connection reuse is observable
+
+    def do_POST(self):
+        server = self.server
+        body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+        server.requests.append(body)
+        server.client_ports.add(self.client_address[1])
+
+        status = server.script.pop(0) if server.script else 200
+        if status == 200:
+            payload = {"choices": [{"message": {"content": f"answer for {body['model']}"}}]}
+        else:
+            payload = {"error": {"message": f"mock error {status}"}}
+        data = json.dumps(payload).encode()
+
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        if status == 429:
+            self.send_header("Retry-After", "0")
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, format, *args):
+        pass
+
+
+@pytest.fixture
+def mock_perplexity():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), MockPerplexityHandler)
+    server.script = []
+    server.requests = []
+    server.client_ports = set()
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+def make_client(server, **kwargs) -> PerplexityClient:
+    host, port = server.server_address
+    return PerplexityClient(api_key="test-key", base_url=f"http://{host}:{port}", backoff_base=0.01, **kwargs)
+
+
+def test_success_reuses_connection(mock_perplexity):
+    client = make_client(mock_perplexity)
+
+    async def run():
+        results = [await client.chat([{"role": "user", "content": "hi"}], model="sonar") for _ in range(3)]
+        await client.aclose()
+        return results
+
+    results = asyncio.run(run())
+    assert [r["choices"][0]["message"]["content"] for r in results] == ["answer for sonar"] * 3
+    assert len(mock_perplexity.client_ports) == 1
+    assert client.get_stats()["requests"] == 3
+
+
+def test_retries_on_429_and_5xx(mock_perplexity):
+    mock_perplexity.script = [429, 503]
+    client = make_client(mock_perplexity, max_retries=3)
+
+    async def run():
+        result = await client.chat([{"role": "user", "content": "hi"}])
+        await client.aclose()
+        return result
+
+    result = asyncio.run(run())
+    assert result["choices"][0]["message"]["content"] == "answer for sonar"
+    assert len(mock_perplexity.requests) == 3
+    assert client.get_stats()["retries"] == 2
+
+
+def test_gives_up_after_max_retries(mock_perplexity):
+    mock_perplexity.script = [502, 502, 502]
+    client = make_client(mock_perplexity, max_retries=2)
+
+    async def run():
+        try:
+            await client.chat([{"role": "user", "content": "hi"}])
+        finally:
+            await client.aclose()
+
+    with pytest.raises(PerplexityAPIError) as exc_info:
+        asyncio.run(run())
+    assert exc_info.value.status_code == 502
+    assert client.get_stats()["errors"] == 1
+
+
+def test_client_errors_are_not_retried(mock_perplexity):
+    mock_perplexity.script = [400]
+    client = make_client(mock_perplexity)
+
+    async def run():
+        try:
+            await client.chat([{"role": "user", "content": "hi"}])
+        finally:
+            await client.aclose()
+
+    with pytest.raises(PerplexityAPIError) as exc_info:
+        asyncio.run(run())
+    assert exc_info.value.status_code == 400
+    assert len(mock_perplexity.requests) == 1
+
+
+def test_one_pool_per_event_loop(mock_perplexity):
+    client = make_client(mock_perplexity)
+
+    async def pools():
+        return client.client, client.client
+
+    first, again = asyncio.run(pools())
+    assert first is again
+    second, _ = asyncio.run(pools())
+    assert second is not first
+    # Pools of finished loops are dropped instead of accumulating
+    for _ in range(5):
+        asyncio.run(pools())
+    assert len(client._clients) <= 1
+
+    async def close():
+        pool = client.client
+        await client.aclose()
+        return pool
+
+    assert asyncio.run(close()).is_closed
+    assert len(client._clients) == 0
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
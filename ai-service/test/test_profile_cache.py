@@ -0,0 +1,127 @@
+#!/usr/bin/env python3
+"""
+ProfileCache: read-through fills, write invalidation, version stamps and the shared SQLite tier
+"""
+
+import asyncio
+import sys
+import time
+from pathlib import Path
+
+from pydantic import BaseModel
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from src.domain.profile_cache import ProfileCache, SQLiteProfileBackend  # noqa: E402
+
+
+class Profile(BaseModel):
+    user_id: str
+    major: str = ""
+
+
+def loader(user_id: str, major: str, version: float, calls: list):
+    def load():
+        calls.append(user_id)
+        return Profile(user_id=user_id, major=major), version
+    return load
+
+
+def test_read_through_hits_after_first_load():
+    cache, calls = ProfileCache(10), []
+    assert cache.load("pg", "u1", Profile, loader("u1", "CS", 1.0, calls)).major == "CS"
+    assert cache.load("pg", "u1", Profile, loader("u1", "EE", 2.0, calls)).major == "CS"
+    assert calls == ["u1"]
+    stats = cache.get_stats()
+    assert (stats["hits"], stats["misses"]) == (1, 1)
+
+
+def test_missing_profile_is_not_cached():
+    cache, calls = ProfileCache(10), []
+    assert cache.load("pg", "u1", Profile, lambda: calls.append("u1")) is None
+    assert cache.load("pg", "u1", Profile, lambda: calls.append("u1")) is None
+    assert calls == ["u1", "u1"]
+
+
+def test_invalidate_forces_reload():
+    cache, calls = ProfileCache(10), []
+    cache.load("pg", "u1", Profile, loader("u1", "CS", 1.0, calls))
+    cache.invalidate("pg", "u1")
+    assert cache.load("pg", "u1", Profile, loader("u1", "EE", 2.0, calls)).major == "EE"
+    assert calls == ["u1", "u1"]
+
+
+def test_load_racing_with_write_does_not_refill_old_version():
+    cache = ProfileCache(10)
+    generation = cache.generation("pg", "u1")
+    cache.invalidate("pg", "u1")  # a write committed while the load was in flight
+    cache.put("pg", "u1", Profile(user_id="u1", major="old"), 1.0, generation)
+    assert cache.get("pg", "u1") is None
+
+
+def test_older_version_never_replaces_newer():
+    cache = ProfileCache(10)
+    cache.put("pg", "u1", Profile(user_id="u1", major="new"), 2.0)
+    cache.put("pg", "u1", Profile(user_id="u1", major="old"), 1.0)
+    assert cache.get("pg", "u1").major == "new"
+
+
+def test_lru_eviction_and_namespaces():
+    cache = ProfileCache(2)
+    cache.put("pg", "u1", Profile(user_id="u1"), 1.0)
+    cache.put("mongo", "u1", Profile(user_id="u1", major="mongo"), 1.0)
+    cache.put("pg", "u2", Profile(user_id="u2"), 1.0)
+    assert cache.get("pg", "u1") is None
+    assert cache.get("mongo", "u1").major == "mongo"
+    assert cache.get_stats()["evictions"] == 1
+
+
+def test_ttl_expiry():
+    cache = ProfileCache(10, ttl_seconds=0.01)
+    cache.put("pg", "u1", Profile(user_id="u1"), 1.0)
+    time.sleep(0.02)
+    assert cache.get("pg", "u1") is None
+    assert cache.get_stats()["expired"] == 1
+
+
+def test_async_loader():
+    cache = ProfileCache(10)
+
+    async def load():
+        return Profile(user_id="u1", major="CS"), 1.0
+
+    assert asyncio.run(cache.aload("pg", "u1", Profile, load)).major == "CS"
+    assert cache.get("pg", "u1").major == "CS"
+
+
+def test_shared_tier_between_processes(tmp_path):
+    path = str(tmp_path / "profiles.sqlite3")
+    writer = ProfileCache(10, shared=SQLiteProfileBackend(path))
+    reader = ProfileCache(10, shared=SQLiteProfileBackend(path))
+
+    writer.put("pg", "u1", Profile(user_id="u1", major="CS"), 2.0)
+    assert reader.get("pg", "u1", Profile).major == "CS"
+    assert reader.get_stats()["shared_hits"] == 1
+
+    # Shared tier keeps the newest version
+    writer.shared.set("pg:u1", Profile(user_id="u1", major="old").model_dump_json(), 1.0)
+    assert ProfileCache(10, shared=writer.shared).get("pg", "u1", Profile).major == "CS"
+
+    writer.invalidate("pg", "u1")
+    assert ProfileCache(10, shared=writer.shared).get("pg", "u1", Profile) is None
+
+
+def test_shared_hit_racing_with_invalidate_is_a_miss(tmp_path):
+    cache = ProfileCache(10, shared=SQLiteProfileBackend(str(tmp_path / "profiles.sqlite3")))
+    cache.shared.set("pg:u1", Profile(user_id="u1", major="old").model_dump_json(), 1.0)
+    read = cache.shared.get
+
+    def read_then_write(key):
+        row = read(key)
+        cache.invalidate("pg", "u1")  # a write lands between the shared read and the generation check
+        return row
+
+    cache.shared.get = read_then_write
+    assert cache.get("pg", "u1", Profile) is None
+    stats = cache.get_stats()
+    assert (stats["shared_hits"], stats["misses"], stats["stale_fills_skipped"]) == (0, 1, 1)
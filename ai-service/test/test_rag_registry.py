@@ -0,0 +1,88 @@
+#!/usr/bin/env python3
+"""
+RAGArtifactRegistry: reloads swap in consistent snapshots only; half-rewritten data keeps the old one
+"""
+
+import os
+import pickle
+import sys
+import types
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from src.agents.general_qa_agent.rag_registry import InconsistentArtifacts, RAGArtifactRegistry  # noqa: E402
+
+
+class FakeIndex:
+    def __init__(self, ntotal):
+        self.ntotal = ntotal
+
+
+def _load_pickle(path, *_):
+    with open(path, "rb") as f:
+        return pickle.load(f)
+
+
+@pytest.fixture
+def loaders(monkeypatch):
+    """Pickle-backed stand-ins for the FAISS/pickle loaders in rag_agent"""
+    module = types.ModuleType("src.agents.general_qa_agent.rag_agent")
+    module.load_qa_pairs = _load_pickle
+    module.load_mapping = _load_pickle
+    module.load_faiss_index = lambda path: FakeIndex(_load_pickle(path))
+    module.load_lexical_index = lambda path, qa_pairs: None
+    monkeypatch.setitem(sys.modules, module.__name__, module)
+    return module
+
+
+def write(paths, qa_pairs, ntotal, mapping, bump=0):
+    for name, value in (("qa_pairs", qa_pairs), ("index", ntotal), ("mapping", mapping)):
+        with open(paths[name], "wb") as f:
+            pickle.dump(value, f)
+        if bump:
+            stat = os.stat(paths[name])
+            os.utime(paths[name], ns=(stat.st_atime_ns, stat.st_mtime_ns + bump))
+
+
+def make_registry(tmp_path):
+    paths = {name: str(tmp_path / f"{name}.pkl") for name in ("qa_pairs", "index", "mapping", "lexical_index")}
+    return RAGArtifactRegistry(paths, check_interval=0), paths
+
+
+def test_reload_swaps_consistent_snapshot(tmp_path, loaders):
+    registry, paths = make_registry(tmp_path)
+    write(paths, ["a"], 1, ["a"])
+    assert registry.get().qa_pairs == ["a"]
+
+    write(paths, ["a", "b"], 2, ["a", "b"], bump=10**9)
+    registry.reload()
+    assert registry.get().qa_pairs == ["a", "b"]
+    assert registry.stats["reloads"] == 1
+
+
+def test_reload_keeps_old_snapshot_when_sizes_disagree(tmp_path, loaders):
+    registry, paths = make_registry(tmp_path)
+    write(paths, ["a"], 1, ["a"])
+    old = registry.get()
+
+    # New qa_pairs already written, index and mapping still the old ones
+    write(paths, ["a", "b"], 1, ["a"], bump=10**9)
+    registry.reload()
+    assert registry.get() is old
+    assert (registry.stats["reload_failures"], registry.stats["inconsistent_loads"]) == (1, 1)
+
+
+def test_files_changing_during_load_are_rejected(tmp_path, loaders):
+    registry, paths = make_registry(tmp_path)
+    write(paths, ["a"], 1, ["a"])
+
+    def load_mapping_while_rewritten(path):
+        write(paths, ["a"], 1, ["a"], bump=10**9)
+        return _load_pickle(path)
+
+    loaders.load_mapping = load_mapping_while_rewritten
+    with pytest.raises(InconsistentArtifacts):
+        registry.get()
@@ -0,0 +1,42 @@
+#!/usr/bin/env python3
+"""
+RAGRetriever fusion: distance threshold, entity hard filter and result ranks
+"""
+
+import os
+import sys
+from pathlib import Path
+from types import SimpleNamespace
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+os.environ.setdefault("OPENAI_API_KEY", "test")  # rag_agent creates an OpenAI client on import
+
+from src.agents.general_qa_agent.lexical_index import BM25Index  # noqa: E402
+from src.agents.general_qa_agent.rag_agent import RAGRetriever  # noqa: E402
+
+QA_PAIRS = [
+    {"question": "西安交通大学的录取要求是多少？", "answer": "一般要求均分85以上。"},
+    {"question": "上海交通大学的录取要求是多少？", "answer": "一般要求均分88以上。"},
+    {"question": "录取要求一般是多少？", "answer": "因学校而异。"},
+    {"question": "上海交通大学的托福要求？", "answer": "一般要求100分。"},
+]
+
+
+def fuse(question, vector_hits):
+    artifacts = SimpleNamespace(mapping=QA_PAIRS, lexical_index=BM25Index.build(QA_PAIRS))
+    retriever = SimpleNamespace(similarity_threshold=1.0)
+    return RAGRetriever._fuse_and_filter(retriever, artifacts, question, np.zeros(2), vector_hits, {}, top_k=5)
+
+
+def test_entity_filter_keeps_only_the_named_school_and_ranks_are_contiguous():
+    results = fuse("上海交通大学的录取要求", {0: 0.1, 1: 0.2, 2: 0.3, 3: 0.4})
+    assert [pair["question"] for pair in results] == [QA_PAIRS[1]["question"], QA_PAIRS[3]["question"]]
+    assert [pair["rank"] for pair in results] == [1, 2]
+
+
+def test_without_entity_match_all_results_are_kept_in_order():
+    results = fuse("录取要求", {2: 0.1, 0: 0.2, 1: 2.0})
+    assert [pair["question"] for pair in results] == [QA_PAIRS[2]["question"], QA_PAIRS[0]["question"]]
+    assert [pair["rank"] for pair in results] == [1, 2]
@@ -0,0 +1,78 @@
+#!/usr/bin/env python3
+"""
+SemanticAnswerCache: similarity hits, institution tags, TTL and targeted invalidation
+"""
+
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from src.agents.general_qa_agent.semantic_cache import SemanticAnswerCache  # noqa: E402
+
+BASE = np.array([1.0, 0.0, 0.0], dtype=np.float32)
+NEAR = np.array([1.0, 0.05, 0.0], dtype=np.float32)  # cosine ~0.999 with BASE
+
+
+def result(answer: str):
+    return {'answer': answer, 'strategy': 'rag', 'reference_links': []}
+
+
+def test_similar_question_hits():
+    cache = SemanticAnswerCache()
+    cache.store("What is the GPA requirement for Stanford CS?", BASE, result("3.9"))
+    hit = cache.lookup("What's the GPA requirement for Stanford CS?", NEAR)
+    assert hit['answer'] == "3.9"
+    assert hit['cache']['hit'] and hit['cache']['similarity'] > 0.95
+
+
+def test_dissimilar_question_misses():
+    cache = SemanticAnswerCache()
+    cache.store("What is the GPA requirement for Stanford CS?", BASE, result("3.9"))
+    assert cache.lookup("What is the GPA requirement for Stanford CS?", np.array([0.0, 1.0, 0.0])) is None
+
+
+def test_different_school_misses_despite_similar_embedding():
+    cache = SemanticAnswerCache()
+    cache.store("What is the GPA requirement for Stanford CS?", BASE, result("stanford"))
+    assert cache.lookup("What is the GPA requirement for Berkeley CS?", NEAR) is None
+    stats = cache.get_stats()
+    assert (stats['misses'], stats['tag_mismatches']) == (1, 1)
+
+
+def test_matching_school_found_behind_closer_mismatch():
+    cache = SemanticAnswerCache()
+    cache.store("What is the GPA requirement for Berkeley CS?", NEAR, result("berkeley"))
+    cache.store("What is the GPA requirement for Stanford CS?", BASE, result("stanford"))
+    assert cache.lookup("GPA requirement for Stanford CS?", NEAR)['answer'] == "stanford"
+
+
+def test_topic_is_part_of_the_tags():
+    cache = SemanticAnswerCache()
+    cache.store("What is the GPA requirement for Stanford CS?", BASE, result("3.9"), topic="Admissions")
+    assert cache.lookup("What is the GPA requirement for Stanford CS?", BASE) is None
+    assert cache.lookup("What is the GPA requirement for Stanford CS?", BASE, topic="Admissions")['answer'] == "3.9"
+
+
+def test_expired_entries_miss():
+    cache = SemanticAnswerCache(ttl_seconds=0.01)
+    cache.store("Does MIT require the SAT?", BASE, result("yes"))
+    time.sleep(0.02)
+    assert cache.lookup("Does MIT require the SAT?", BASE) is None
+    assert cache.get_stats()['expired'] == 1
+
+
+def test_invalidate_one_school_keeps_others():
+    cache = SemanticAnswerCache()
+    cache.store("What is the GPA requirement for Stanford University?", BASE, result("stanford"))
+    cache.store("What is the GPA requirement for Berkeley?", BASE, result("berkeley"))
+    cache.store("Does MIT require the SAT?", BASE, result("mit"))
+
+    assert cache.invalidate(institution="Stanford") == 1
+    assert cache.lookup("What is the GPA requirement for Berkeley?", BASE)['answer'] == "berkeley"
+    # Whole words only: "MIT" does not match inside another tag
+    assert cache.invalidate(institution="IT") == 0
+    assert cache.invalidate() == 2
@@ -0,0 +1,62 @@
+#!/usr/bin/env python3
+"""
+StudentDocument (PostgreSQL): promoted columns on read and partial-write planning for targetCountries
+"""
+
+import json
+import sys
+from pathlib import Path
+from types import SimpleNamespace
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from src.domain.students_pg import ApplicationDetails, StudentDocument  # noqa: E402
+
+
+def make_row(target_countries, experiences_country="", **overrides):
+    row = {
+        "profile_id": "p1", "email": "a@example.com", "name": "Ada Lovelace", "phone": None,
+        "nationality": None, "currentEducation": None, "gpa": None, "major": None, "goals": None,
+        "targetDegreeType": None, "intendedMajor": None, "applicationYear": None, "applicationTerm": None,
+        "targetCountries": json.dumps(target_countries) if target_countries is not None else None,
+        "experiences": json.dumps({"targetCountry": experiences_country}),
+    }
+    row.update(overrides)
+    return SimpleNamespace(**row)
+
+
+def plan_country_write(existing, country):
+    _, profile_params = StudentDocument._upsert_params(
+        "u1", None, ApplicationDetails(targetCountry=country), None, None, None, None,
+    )
+    # Only the country is under test; keep the other experiences keys as already stored
+    profile_params["experiences"] = {**existing._persisted["experiences"], "targetCountry": country}
+    return StudentDocument._plan_write("u1", existing, None, profile_params)
+
+
+def test_target_country_reads_promoted_column_first():
+    assert StudentDocument._from_row("u1", make_row(["UK", "US"], "US")).applicationDetails.targetCountry == "UK"
+    # Rows written before the column existed fall back to experiences
+    assert StudentDocument._from_row("u1", make_row(None, "US")).applicationDetails.targetCountry == "US"
+
+
+def test_changing_target_country_moves_it_to_the_front():
+    existing = StudentDocument._from_row("u1", make_row(["US"], "US"))
+    plan = plan_country_write(existing, "UK")
+
+    assert plan.mode == "partial"
+    statement, params = plan.statements[-1]
+    assert "- CAST(:targetCountry AS text)" in str(statement)
+    assert (json.loads(params["targetCountries"]), params["targetCountry"]) == (["UK"], "UK")
+
+    # Row as returned by the UPDATE: UK prepended, US kept for the frontend
+    updated = StudentDocument._from_row("u1", make_row(["UK", "US"], "UK"))
+    assert updated.applicationDetails.targetCountry == "UK"
+    assert plan_country_write(updated, "UK").mode == "noop"
+
+
+def test_country_already_listed_but_not_first_is_still_written():
+    # e.g. the frontend added UK after US; the agent now picks UK
+    existing = StudentDocument._from_row("u1", make_row(["US", "UK"], "UK"))
+    assert existing.applicationDetails.targetCountry == "US"
+    assert plan_country_write(existing, "UK").mode == "partial"
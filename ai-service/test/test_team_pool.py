@@ -0,0 +1,136 @@
+#!/usr/bin/env python3
+"""
+TeamPool: bounded checkout, connection leases that keep a team across messages, overflow and reset
+"""
+
+import asyncio
+import sys
+import time
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from src.teams.team_pool import TeamPool, TeamPoolRegistry  # noqa: E402
+
+
+class FakeTeam:
+    def __init__(self, fail_reset: bool = False):
+        self.history = []
+        self.resets = 0
+        self.fail_reset = fail_reset
+
+    async def reset(self):
+        if self.fail_reset:
+            raise RuntimeError("team is running")
+        self.resets += 1
+        self.history.clear()
+
+
+def test_acquire_reuses_and_resets():
+    async def scenario():
+        pool = TeamPool("QA", FakeTeam, max_size=2)
+        async with pool.acquire() as first:
+            first.history.append("hi")
+        async with pool.acquire() as second:
+            assert second is first and second.history == []
+        return pool.get_stats()
+
+    stats = asyncio.run(scenario())
+    assert (stats["created"], stats["reused"], stats["idle"]) == (1, 1, 1)
+
+
+def test_acquire_waits_when_exhausted():
+    async def scenario():
+        pool = TeamPool("QA", FakeTeam, max_size=1)
+        async with pool.acquire() as team:
+            waiter = asyncio.ensure_future(pool.acquire().__aenter__())
+            await asyncio.sleep(0.01)
+            assert not waiter.done()
+        assert await waiter is team
+        return pool.get_stats()
+
+    assert asyncio.run(scenario())["waits"] == 1
+
+
+def test_connection_keeps_team_between_messages():
+    async def scenario():
+        registry = TeamPoolRegistry({"STUDENT_INFO": FakeTeam}, max_size=2)
+        connection = registry.for_connection()
+        team = await connection.get("STUDENT_INFO")
+        team.history.append("my GPA is 3.8")
+        again = await connection.get("STUDENT_INFO")
+        assert again is team and again.history == ["my GPA is 3.8"]
+
+        await connection.release()
+        assert team.resets == 1
+        assert registry.get_stats()["STUDENT_INFO"]["idle"] == 1
+        # The next connection gets the reset team
+        assert await registry.for_connection().get("STUDENT_INFO") is team
+
+    asyncio.run(scenario())
+
+
+def test_connection_reset_starts_fresh_conversation():
+    async def scenario():
+        registry = TeamPoolRegistry({"QA": lambda: FakeTeam(fail_reset=True)}, max_size=2)
+        connection = registry.for_connection()
+        broken = await connection.get("QA")
+        await connection.reset("QA")
+        fresh = await connection.get("QA")
+        assert fresh is not broken
+        return registry.get_stats()["QA"]
+
+    stats = asyncio.run(scenario())
+    assert (stats["discarded"], stats["size"]) == (1, 1)
+
+
+def test_leases_past_max_size_overflow():
+    async def scenario():
+        pool = TeamPool("QA", FakeTeam, max_size=1)
+        held = await pool.lease()
+        extra = await pool.lease()
+        assert extra is not held
+        assert pool.get_stats()["overflow_in_use"] == 1
+        await pool._checkin(extra)
+        await pool._checkin(held)
+        return pool.get_stats()
+
+    stats = asyncio.run(scenario())
+    assert (stats["overflow"], stats["overflow_in_use"], stats["size"], stats["idle"]) == (1, 0, 1, 1)
+
+
+@pytest.mark.parametrize("max_size", [1, 3])
+def test_warm_is_bounded(max_size):
+    pool = TeamPool("QA", FakeTeam, max_size=max_size)
+    asyncio.run(pool.warm(5))
+    assert pool.get_stats()["idle"] == max_size
+
+
+def test_warm_builds_off_the_event_loop():
+    def slow_team():
+        time.sleep(0.05)
+        return FakeTeam()
+
+    async def scenario():
+        pool, ticks = TeamPool("QA", slow_team, max_size=2), []
+
+        async def heartbeat():
+            while True:
+                ticks.append(time.perf_counter())
+                await asyncio.sleep(0.005)
+
+        beat = asyncio.ensure_future(heartbeat())
+        warming = asyncio.ensure_future(pool.warm(2))
+        await asyncio.sleep(0.01)
+        # The team being built already counts towards max_size
+        during = pool.get_stats()
+        await warming
+        beat.cancel()
+        return during, pool.get_stats(), ticks
+
+    during, after, ticks = asyncio.run(scenario())
+    assert (during["size"], during["idle"]) == (1, 0)
+    assert (after["size"], after["idle"], after["created"]) == (2, 2, 2)
+    assert max(b - a for a, b in zip(ticks, ticks[1:])) < 0.04
@@ -0,0 +1,30 @@
+-- AlterTable: make sure experiences is JSONB (databases created from older schemas stored it as TEXT)
+DO $$
+BEGIN
+    IF (SELECT "data_type" FROM "information_schema"."columns"
+        WHERE "table_name" = 'user_profiles' AND "column_name" = 'experiences') = 'text' THEN
+        ALTER TABLE "user_profiles" ALTER COLUMN "experiences" TYPE JSONB USING NULLIF("experiences", '')::jsonb;
+    END IF;
+END $$;
+
+-- Backfill: promote hot fields the AI service kept only inside experiences
+UPDATE "user_profiles" SET
+    "targetDegreeType" = COALESCE("targetDegreeType", NULLIF("experiences"->>'degreeType', '')),
+    "applicationYear" = COALESCE("applicationYear", NULLIF("experiences"->>'applicationYear', '')),
+    "applicationTerm" = COALESCE("applicationTerm", NULLIF("experiences"->>'applicationTerm', '')),
+    "intendedMajor" = COALESCE("intendedMajor", "major"),
+    "targetCountries" = COALESCE(
+        "targetCountries",
+        CASE WHEN NULLIF("experiences"->>'targetCountry', '') IS NOT NULL
+            THEN jsonb_build_array("experiences"->>'targetCountry') END
+    )
+WHERE jsonb_typeof("experiences") = 'object';
+
+-- CreateIndex
+CREATE INDEX "user_profiles_experiences_idx" ON "user_profiles" USING GIN ("experiences" jsonb_path_ops);
+
+-- CreateIndex
+CREATE INDEX "user_profiles_targetCountries_idx" ON "user_profiles" USING GIN ("targetCountries" jsonb_path_ops);
+
+-- CreateIndex
+CREATE INDEX "user_profiles_targetDegreeType_intendedMajor_idx" ON "user_profiles"("targetDegreeType", "intendedMajor");